@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+
+"""
+|==========================================|
+| Mesures de performance de la simulation. |
+|==========================================|
+
+* python3 benchmark.py <nom> lance une mesure, sans argument elles sont toutes lancees.
+"""
+
+import csv
+import gc
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import genetic as gen
+import parallel
+import render
+import results
+import simulation
+import store
+
+
+def batch_state(nbr_individus=200, portion_duration=2, nbr_portions=2):
+    """
+    Compare Individual.move_simulation (une voiture a la fois)
+    et Generation.move_simulation (simulation.BatchState).
+    """
+    generation = gen.Generation(nbr_individus, 0.05,
+                                portion_duration=portion_duration,
+                                nbr_portions=nbr_portions)
+
+    t_debut = time.perf_counter()
+    generation.move_simulation()
+    t_batch = time.perf_counter() - t_debut
+    batch_scores = np.array([ind.score for ind in generation.individuals])
+
+    nbr_serie = min(nbr_individus, 10) # La version serie est lente, on extrapole.
+    t_debut = time.perf_counter()
+    erreur = 0
+    for ind, samples in zip(generation.individuals[:nbr_serie], generation.samples):
+        erreur = max(erreur, np.abs(samples - ind.move_simulation().states).max())
+    t_serie = (time.perf_counter() - t_debut) * nbr_individus / nbr_serie
+    erreur_score = np.abs(batch_scores[:nbr_serie]
+        - [ind.score for ind in generation.individuals[:nbr_serie]]).max()
+
+    print(f"batch_state : {nbr_individus} individus, {nbr_portions*portion_duration} s")
+    print(f"\tserie (extrapole) : {t_serie:.3f} s")
+    print(f"\tbatch             : {t_batch:.3f} s")
+    print(f"\tacceleration      : x{t_serie/t_batch:.1f}")
+    print(f"\terreur etats      : {erreur:.2e}")
+    print(f"\terreur score      : {erreur_score:.2e}")
+
+
+def integrators(nbr_individus=10, portion_duration=2, nbr_portions=10):
+    """
+    Compare le pas fixe de 1 ms et simulation.DormandPrince pour plusieurs tolerances.
+    La reference est le pas fixe de 10 us.
+    """
+    np.random.seed(0)
+    generation = gen.Generation(nbr_individus, 0.05,
+                                portion_duration=portion_duration,
+                                nbr_portions=nbr_portions)
+
+    def final_states(integrate):
+        """Etat final (x, y, theta) de chaque individu et duree totale."""
+        etats = []
+        t_debut = time.perf_counter()
+        for ind in generation.individuals:
+            state = simulation.State()
+            for start, end, commands in ind.schedule():
+                integrate(state, commands.tolist(), end - start)
+            etats.append((state.x, state.y, state.theta))
+        return np.array(etats), time.perf_counter() - t_debut
+
+    def fixed_step(dt):
+        """Integration par le schema de State.update."""
+        def integrate(state, commands, duration):
+            for _ in range(round(duration / dt)):
+                state.update(*commands, dt=dt)
+        return integrate
+
+    reference, _ = final_states(fixed_step(1e-5))
+    print(f"integrators : {nbr_individus} individus, {nbr_portions*portion_duration} s")
+    print("\tmethode           | erreur max (m) | duree (s) | pas    | rejets")
+
+    etats, duree = final_states(fixed_step(1e-3))
+    erreur = np.abs(etats[:, :2] - reference[:, :2]).max()
+    print(f"\tpas fixe 1 ms     | {erreur:.2e}       | {duree:9.3f} | {round(nbr_portions*portion_duration/1e-3)*nbr_individus:6d} | 0")
+
+    for rtol in (1e-3, 1e-5, 1e-7):
+        solver = simulation.DormandPrince(rtol=rtol, atol=rtol*1e-3)
+        etats, duree = final_states(solver.advance)
+        erreur = np.abs(etats[:, :2] - reference[:, :2]).max()
+        print(f"\trk45 rtol={rtol:.0e}   | {erreur:.2e}       | {duree:9.3f} | {solver.nbr_steps:6d} | {solver.nbr_rejected}")
+
+
+def copy_regression(nbr_generations=500, nbr_individus=50):
+    """
+    Duree, classes et memoire quand la population est reproduite par l'API objet:
+    (parent1 + parent2).mute(facteur). Les classes et la memoire sont verifiees
+    par test_genetic.test_copy_does_not_create_classes.
+    """
+    individus = [gen.Individual(2, 10) for _ in range(nbr_individus)]
+
+    def nbr_classes():
+        """Nombre de classes vivantes."""
+        gc.collect()
+        return sum(isinstance(o, type) for o in gc.get_objects())
+
+    tracemalloc.start()
+    t_debut = time.perf_counter()
+    for numero in range(nbr_generations):
+        for ind in individus:
+            ind.score = random.random()
+        weights = [ind.score for ind in individus]
+        individus = [(random.choices(individus, weights=weights)[0]
+                      + random.choices(individus, weights=weights)[0]).mute(0.05)
+                     for _ in range(nbr_individus)]
+        if numero == 10: # Apres la mise en route.
+            classes_debut = nbr_classes()
+            memoire_debut = tracemalloc.get_traced_memory()[0]
+    classes_fin = nbr_classes()
+    memoire_fin = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"copy_regression : {nbr_generations} generations de {nbr_individus} individus")
+    print(f"\tduree   : {time.perf_counter() - t_debut:.3f} s")
+    print(f"\tclasses : {classes_debut} -> {classes_fin}")
+    print(f"\tmemoire : {memoire_debut/1e3:.1f} ko -> {memoire_fin/1e3:.1f} ko")
+
+
+def parallel_scaling(nbr_individus=1000, portion_duration=1, nbr_portions=4, nbr_generations=3):
+    """
+    Duree d'evaluation d'une generation avec parallel.EvaluationPool, de 1 a N processus.
+    """
+    generation = gen.Generation(nbr_individus, 0.05,
+                                portion_duration=portion_duration,
+                                nbr_portions=nbr_portions,
+                                cache_size=0, boundary_cache_bytes=0) # On veut tout simuler a chaque fois.
+
+    t_debut = time.perf_counter()
+    for _ in range(nbr_generations):
+        generation.move_simulation()
+    t_reference = (time.perf_counter() - t_debut) / nbr_generations
+    reference = generation.scores.copy()
+
+    print(f"parallel_scaling : {nbr_individus} individus, {nbr_portions*portion_duration} s")
+    print(f"\tsans pool : {t_reference:.3f} s par generation")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with parallel.EvaluationPool(generation, workers) as pool:
+            generation.move_simulation(pool=pool) # Demarrage des processus.
+            t_debut = time.perf_counter()
+            for _ in range(nbr_generations):
+                generation.move_simulation(pool=pool)
+            duree = (time.perf_counter() - t_debut) / nbr_generations
+        assert np.array_equal(generation.scores, reference), "Les scores dependent du nombre de processus."
+        print(f"\t{workers:3d} processus : {duree:.3f} s par generation, acceleration x{t_reference/duree:.2f}")
+        workers *= 2
+
+    # Les processus lances par 'spawn' (Windows, macOS) recoivent le modele d'individu par pickle.
+    with parallel.EvaluationPool(generation, 1, start_method="spawn") as pool:
+        generation.move_simulation(pool=pool)
+    assert np.array_equal(generation.scores, reference), "Les scores dependent du lancement des processus."
+    print("\tspawn : memes scores")
+
+
+def boundary_resume(tailles=(200, 2000), portion_duration=1, nbr_portions=10, nbr_generations=4):
+    """
+    Pas de simulation economises par cache.BoundaryCache selon le facteur de mutation.
+    La population part d'un seul genome, comme une population qui a converge,
+    et le cache des scores est coupe pour que tous les enfants soient simules.
+    Un pas du lot coute presque autant pour 200 voitures que pour une seule:
+    les pas economises ne font gagner du temps qu'aux grandes populations.
+    """
+    print(f"boundary_resume : {nbr_generations} generations, {nbr_portions} portions de {portion_duration} s")
+    print("\tindividus | mutation | pas economises | reprises | duree sans cache (s) | duree avec cache (s) | Mo du cache")
+    for nbr_individus, mutation_factor in itertools.product(tailles, (0.001, 0.01, 0.05)):
+        steps = nbr_generations*nbr_individus*nbr_portions*round(portion_duration / 1e-3)
+        durees, scores = [], []
+        for boundary_cache_bytes in (0, 64 << 20):
+            np.random.seed(0)
+            generation = gen.Generation(nbr_individus, mutation_factor,
+                                        portion_duration=portion_duration,
+                                        nbr_portions=nbr_portions,
+                                        cache_size=0, boundary_cache_bytes=boundary_cache_bytes)
+            generation.set_biases(slice(None), np.random.uniform(0, 1, size=generation.biases.shape[1:]))
+            t_debut = time.perf_counter()
+            for _ in range(nbr_generations):
+                generation.move_simulation()
+                scores.append(generation.scores.copy())
+                generation.reproduce()
+            durees.append(time.perf_counter() - t_debut)
+        assert all(np.array_equal(a, b) for a, b in zip(scores[:nbr_generations], scores[nbr_generations:])), \
+            "La reprise change les scores."
+        cache = generation.boundary_cache
+        reprises = sum(hits for hits, _ in cache.history)
+        print(f"\t{nbr_individus:9d} | {mutation_factor:8.3f} | {sum(cache.saved_steps_history)/steps:14.1%} "
+              f"| {reprises:8d} | {durees[0]:20.3f} | {durees[1]:20.3f} | {cache.nbytes/2**20:.1f}")
+
+
+def results_writer(nbr_individus=1000, nbr_generations=50, nbr_portions=10):
+    """
+    Ecriture de data_simu.csv: un open par ligne, comme l'ancien save_score,
+    puis results.ResultsWriter qui garde le fichier ouvert.
+    """
+    generation = gen.Generation(nbr_individus, 0.05, portion_duration=1, nbr_portions=nbr_portions)
+    generation.scores = np.random.uniform(0, 10, nbr_individus)
+
+    with tempfile.TemporaryDirectory() as repertoire:
+        chemin = os.path.join(repertoire, "par_ligne.csv")
+        t_debut = time.perf_counter()
+        for gen_number in range(nbr_generations):
+            for ind_number, ind in enumerate(generation.individuals):
+                with open(chemin, "a") as file:
+                    csv.writer(file).writerow(
+                        [gen_number, ind_number, ind.score] + ind.compile().ravel().tolist())
+        t_ligne = time.perf_counter() - t_debut
+
+        t_debut = time.perf_counter()
+        with results.ResultsWriter(os.path.join(repertoire, "tampon.csv")) as writer:
+            for gen_number in range(nbr_generations):
+                generation.save_score(gen_number, writer)
+        t_tampon = time.perf_counter() - t_debut
+        with open(chemin) as par_ligne, open(writer.path) as tampon:
+            assert par_ligne.read() == tampon.read(), "Les deux fichiers different."
+
+    print(f"results_writer : {nbr_generations} generations de {nbr_individus} individus")
+    print(f"\tun open par ligne : {t_ligne:.3f} s")
+    print(f"\tResultsWriter     : {t_tampon:.3f} s, {writer.nbr_flushes} ecritures")
+    print(f"\tacceleration      : x{t_ligne/t_tampon:.1f}")
+
+
+def run_store(nbr_individus=1000, nbr_generations=50, nbr_portions=10):
+    """
+    Lecture d'une generation au milieu d'une evolution: data_simu.csv
+    relu en entier, puis store.RunReader qui projette les fichiers en memoire.
+    """
+    generation = gen.Generation(nbr_individus, 0.05, portion_duration=1, nbr_portions=nbr_portions)
+    generation.scores = np.random.uniform(0, 10, nbr_individus)
+    trajectories = [(np.arange(10.), np.arange(10.))]*nbr_individus
+    milieu = nbr_generations // 2
+
+    with tempfile.TemporaryDirectory() as repertoire:
+        with results.ResultsWriter(os.path.join(repertoire, "data_simu.csv"), ["Génération", "Individu", "Score"]
+                + [f"Gene_{p}roue_{s}" for p in range(nbr_portions) for s in range(4)]) as writer, \
+                store.RunStore(os.path.join(repertoire, "run_store")) as run_store:
+            for gen_number in range(nbr_generations):
+                generation.save(gen_number, writer, run_store, trajectories)
+
+        t_debut = time.perf_counter()
+        with open(writer.path, newline="") as file:
+            scores_csv = [float(row[2]) for row in csv.reader(file) if row[0] == str(milieu)]
+        t_csv = time.perf_counter() - t_debut
+
+        t_debut = time.perf_counter()
+        scores_npy = store.RunReader(run_store.directory).generation(milieu)["scores"]
+        t_npy = time.perf_counter() - t_debut
+        assert np.array_equal(scores_csv, scores_npy), "Les deux formats different."
+
+        taille_csv = os.path.getsize(writer.path)
+        taille_npy = sum(os.path.getsize(os.path.join(run_store.directory, fname))
+                         for fname in os.listdir(run_store.directory))
+
+    print(f"run_store : generation {milieu} sur {nbr_generations} de {nbr_individus} individus")
+    print(f"\tdata_simu.csv : {t_csv*1e3:8.2f} ms ({taille_csv/1e6:.1f} Mo)")
+    print(f"\tRunReader     : {t_npy*1e3:8.2f} ms ({taille_npy/1e6:.1f} Mo, trajectoires et capacite reservee comprises)")
+
+
+def rendering(nbr_individus=1000, nbr_points=200, nbr_images=5):
+    """
+    Duree d'une image de generation: un plt.plot par individu comme avant,
+    puis render.Renderer (une LineCollection) en mode sync et async.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    t = np.linspace(0, 1, nbr_points)
+    trajectories = [(t*np.cos(a), t*np.sin(a)) for a in np.random.uniform(0, np.pi, nbr_individus)]
+
+    with tempfile.TemporaryDirectory() as repertoire:
+        t_debut = time.perf_counter()
+        for numero in range(nbr_images):
+            plt.axis("equal")
+            plt.title("generation : %d" % numero)
+            for x, y in trajectories:
+                plt.plot(x, y)
+            plt.savefig(os.path.join(repertoire, "plot_%02d.png" % numero))
+            plt.clf()
+        t_plot = (time.perf_counter() - t_debut) / nbr_images
+        print(f"rendering : {nbr_individus} trajectoires de {nbr_points} points")
+        print(f"\tplt.plot par individu : {t_plot:.3f} s par image")
+
+        for mode in ("sync", "async"):
+            t_debut = time.perf_counter()
+            with render.Renderer(mode) as renderer:
+                for numero in range(nbr_images):
+                    renderer.submit(trajectories, "generation : %d" % numero,
+                                    os.path.join(repertoire, f"{mode}_{numero:02d}.png"))
+                t_boucle = (time.perf_counter() - t_debut) / nbr_images
+            t_total = (time.perf_counter() - t_debut) / nbr_images
+            print(f"\tRenderer {mode:5s}        : {t_boucle:.3f} s par image pour l'evolution, "
+                  f"{t_total:.3f} s en tout")
+
+
+def recording(portion_duration=1, nbr_portions=5):
+    """
+    Duree et memoire de Individual.move_simulation selon simulation.Recording.
+    Le score ne depend pas de ce qui est enregistre.
+    """
+    ind = gen.Generation(2, 0.05, portion_duration=portion_duration, nbr_portions=nbr_portions).individuals[0]
+    print(f"recording : 1 individu, {nbr_portions*portion_duration} s")
+    print("\tpolitique                                     | echantillons | duree (s) | pic memoire (ko)")
+    scores = []
+    for politique in (simulation.Recording("none"), simulation.Recording("final"),
+                      simulation.Recording(), simulation.Recording("count", count=500),
+                      simulation.Recording("stride", stride=1)):
+        ind.move_simulation(recording=politique) # Mise en route.
+        tracemalloc.start()
+        t_debut = time.perf_counter()
+        trajectory = ind.move_simulation(recording=politique)
+        duree = time.perf_counter() - t_debut
+        pic = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        scores.append(ind.score)
+        print(f"\t{politique!r:45s} | {len(trajectory):12d} | {duree:9.3f} | {pic/1e3:.1f}")
+    assert len(set(scores)) == 1, "Le score depend de l'enregistrement."
+
+
+def early_stopping(tailles=(200, 2000), portion_duration=1, nbr_portions=6, nbr_generations=8, unreachable_rank=5):
+    """
+    Arret 'unreachable' des voitures qui ne peuvent plus battre le unreachable_rank-ieme score
+    de la generation precedente, avec la selection 'truncation' parmi les unreachable_rank meilleurs.
+    Les deux populations sont identiques a chaque generation: les scores des voitures
+    non arretees et les unreachable_rank meilleurs doivent etre ceux de la simulation complete.
+    La borne de simulation.Unreachable n'arrete guere les voitures avant la derniere
+    seconde, la part des echantillons non simules le montre.
+    """
+    import collections
+
+    import selection
+    import simulation
+
+    print(f"early_stopping : {nbr_generations} generations, rang {unreachable_rank}, {nbr_portions*portion_duration} s")
+    for nbr_individus in tailles:
+        reglages = dict(portion_duration=portion_duration, nbr_portions=nbr_portions, cache_size=0,
+                        boundary_cache_bytes=0, selection="truncation", nbr_elites=unreachable_rank,
+                        unreachable_rank=unreachable_rank,
+                        recording=simulation.Recording(stride=100)) # Pour voir quand les voitures s'arretent.
+        complete = gen.Generation(nbr_individus, 0.05, **reglages)
+        elagage = gen.Generation(nbr_individus, 0.05, early_stopping=("unreachable",), **reglages)
+        durees = [0, 0]
+        raisons = collections.Counter()
+        non_simules = 0
+        for _ in range(nbr_generations):
+            elagage.biases = complete.biases.copy()
+            a_battre = elagage.unreachable_score
+            for numero, generation in enumerate((complete, elagage)):
+                t_debut = time.perf_counter()
+                generation.move_simulation()
+                durees[numero] += time.perf_counter() - t_debut
+            arretes = np.array(elagage.stop_reasons) == "unreachable"
+            assert np.array_equal(complete.scores[~arretes], elagage.scores[~arretes]), \
+                "Une simulation complete a change de score."
+            assert a_battre is None or np.all(complete.scores[arretes] < a_battre), \
+                "Une voiture arretee pouvait battre l'elite."
+            assert np.array_equal(complete.scores[selection.elites(complete.scores, unreachable_rank)],
+                                  elagage.scores[selection.elites(elagage.scores, unreachable_rank)]), \
+                "Les meilleurs ne sont pas ceux de la simulation complete."
+            raisons.update(elagage.stop_reasons)
+            non_simules += np.isnan(elagage.samples[:, :, 0]).mean()
+            complete.reproduce()
+
+        print(f"\t{nbr_individus} individus : complete {durees[0]:.3f} s, avec arrets {durees[1]:.3f} s "
+              f"(x{durees[0]/durees[1]:.2f}), echantillons non simules {non_simules/nbr_generations:.1%}, "
+              f"raisons {dict(raisons)}")
+
+
+def selection_methods(tailles=(1000, 10000), nbr_repetitions=3):
+    """
+    Tirage des 2N parents d'une generation: deux random.choices par enfant
+    (la table cumulee est refaite a chaque appel) contre un seul tirage vectorise.
+    """
+    import selection
+
+    print("selection_methods : duree d'un tirage de 2N parents")
+    for taille in tailles:
+        scores = np.random.uniform(0.01, 1, taille)
+        individus = list(range(taille))
+        weights = scores.tolist()
+
+        t_debut = time.perf_counter()
+        for _ in range(nbr_repetitions):
+            [(random.choices(individus, weights=weights, k=1)[0], random.choices(individus, weights=weights, k=1)[0])
+             for _ in range(taille)]
+        print(f"\tN = {taille:5d}, random.choices : {(time.perf_counter() - t_debut)/nbr_repetitions*1e3:9.3f} ms")
+
+        for nom, methode in selection.METHODS.items():
+            options = {"size": taille} if nom in selection.TOP_ONLY else {} # Tirage parmi toute la population.
+            t_debut = time.perf_counter()
+            for _ in range(nbr_repetitions):
+                parents = methode(scores, 2*taille, **options)
+            duree = (time.perf_counter() - t_debut)/nbr_repetitions
+            assert parents.shape == (2*taille,) and 0 <= parents.min() and parents.max() < taille
+            print(f"\tN = {taille:5d}, {nom:14s} : {duree*1e3:9.3f} ms")
+
+
+def islands(nbr_islands=4, nbr_individus=25, portion_duration=1, nbr_portions=6, nbr_generations=20, seuil=3.0):
+    """
+    Une population de nbr_islands*nbr_individus individus contre nbr_islands iles
+    de nbr_individus individus (migration en anneau toutes les 5 generations):
+    duree et nombre de simulations avant qu'un individu depasse seuil.
+    """
+    import island
+
+    parametres = dict(portion_duration=portion_duration, nbr_portions=nbr_portions, nbr_elites=1)
+    print(f"islands : {nbr_generations} generations, {os.cpu_count()} coeurs")
+    for nom, nbr, taille in (("une population", 1, nbr_islands*nbr_individus),
+                             (f"{nbr_islands} iles", nbr_islands, nbr_individus)):
+        with tempfile.TemporaryDirectory() as repertoire: # Les iles ecrivent leurs resultats.
+            dossier = os.getcwd()
+            os.chdir(repertoire)
+            try:
+                t_debut = time.perf_counter()
+                history = island.run_islands(nbr, taille, 0.05, nbr_generations=nbr_generations, migration_interval=5,
+                                             settings=dict(plot="none"), **parametres)
+                duree = time.perf_counter() - t_debut
+            finally:
+                os.chdir(dossier)
+        evaluations = history[:, :, 1].sum(axis=0) # Toutes les iles, a chaque generation.
+        atteint = np.flatnonzero(history[:, :, 0].max(axis=0) > seuil)
+        print(f"\t{nom:15s} : {duree:7.3f} s, meilleur score {np.nanmax(history[:, :, 0]):.3f}, "
+              f"simulations avant {seuil} : {int(evaluations[atteint[0]]) if len(atteint) else '-'}")
+
+
+def control_loop(duree=2.0, latence_roue=0.002, latence_camera=0.033, frequence=50):
+    """
+    Boucle de move_car avec une voiture et une camera factices: l'ancienne boucle
+    (quatre consignes puis une pose attendue a chaque tour) contre control.ControlLoop
+    (un message pour les quatre roues). latence_roue est la duree d'un message.
+    """
+    import control
+
+    individu = gen.Individual(duree/4, 4)
+    envois = [0]
+
+    def move_wheel(roue, vitesse):
+        envois[0] += 1
+        time.sleep(latence_roue)
+
+    def set_wheels(*vitesses):
+        envois[0] += 1
+        time.sleep(latence_roue)
+
+    def get_position():
+        time.sleep(latence_camera)
+        return ((0, 0), 0.0), time.monotonic() - latence_camera # Image prise au debut de l'attente.
+
+    envois[0], tours, t_debut = 0, 0, time.monotonic()
+    while time.monotonic() - t_debut < duree:
+        for numero_roue, vitesse in enumerate(individu(time.monotonic() - t_debut)):
+            move_wheel(numero_roue+1, vitesse)
+        get_position()
+        tours += 1
+    ancien = (tours / (time.monotonic() - t_debut), envois[0])
+
+    envois[0] = 0
+    _, _, stats = control.ControlLoop(frequence, set_wheels, get_position).run(individu, duree)
+
+    print(f"control_loop : {duree} s, roue {latence_roue*1e3:g} ms, camera {latence_camera*1e3:g} ms")
+    print(f"\tancienne boucle : {ancien[0]:.1f} Hz, {ancien[1]} messages")
+    print(f"\tControlLoop     : {stats}")
+
+
+def detection(nbr_images=200, nbr_taches=300):
+    """
+    Recherche de la voiture dans des images 640x480 factices (une voiture qui avance
+    et des taches blanches): toute l'image a chaque fois contre la fenetre de suivi,
+    pour chaque detecteur.
+    """
+    import cv2
+    import detect
+
+    rng = np.random.default_rng(0)
+    fond = np.zeros((480, 640, 3), np.uint8)
+    for _ in range(nbr_taches):
+        cv2.circle(fond, (int(rng.integers(0, 640)), int(rng.integers(0, 480))),
+                   int(rng.integers(1, 6)), (255, 255, 255), -1)
+    images = []
+    for numero in range(nbr_images):
+        x, y = 100 + 2*numero, 240 + int(80*np.sin(numero/20))
+        image = fond.copy()
+        image[y-30:y+30, x-35:x+35] = 0 # Les taches ne touchent pas la voiture.
+        cv2.rectangle(image, (x-25, y-20), (x+25, y+20), (255, 255, 255), -1)
+        cv2.circle(image, (x-9, y), 13, (0, 0, 0), -1)
+        cv2.circle(image, (x+14, y), 8, (0, 0, 0), -1)
+        images.append(image)
+
+    def threshold(image):
+        return cv2.threshold(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), 128, 255, 0)[1]
+
+    print(f"detection : {nbr_images} images 640x480, {nbr_taches} taches")
+    for detecteur in detect.DETECTORS:
+        for suivi in (False, True):
+            tracker = detect.Tracker(threshold, detecteur, suivi)
+            trouvees = sum(tracker(image, numero/30) is not None for numero, image in enumerate(images))
+            print(f"\t{detecteur:10s} {'suivi' if suivi else 'image entiere':13s} : "
+                  f"{tracker.process_ms():.3f} ms par image, {trouvees} trouvees, "
+                  f"{tracker.nbr_tracked} dans la fenetre")
+
+
+def estimation(duree=4.0, image_par_s=30, latence=0.04, bruit=1.0, ecart_modele=0.8, taille_pixel=0.001):
+    """
+    Pose de la voiture tous les 5 ms entre des images bruitees et en retard: la derniere
+    pose de la camera contre estimator.Estimator, avec une voiture reelle plus lente
+    que le modele (ecart_modele).
+    """
+    import math
+
+    import estimator
+    import simulation
+
+    np.random.seed(0)
+    individu = gen.Individual(duree/4, 4)
+    voiture = simulation.State()
+    filtre = estimator.Estimator(taille_pixel, (320, 240))
+    en_route, derniere, consignes, prochaine = [], None, None, 0.0
+    erreurs = {"derniere pose": [], "estimateur": []}
+
+    def en_pixels(x, y):
+        return x/taille_pixel + 320, y/taille_pixel + 240
+
+    t_debut = time.perf_counter()
+    for pas in range(int(duree*1000)):
+        t = pas*1e-3
+        vitesses = tuple(individu(t))
+        if vitesses != consignes:
+            filtre.command(vitesses, t)
+            consignes = vitesses
+        voiture.update(*(ecart_modele*v for v in vitesses), dt=1e-3)
+        if t >= prochaine: # L'image est prise maintenant et arrive apres latence.
+            x, y = en_pixels(voiture.x, voiture.y)
+            pose = ((x + np.random.normal(0, bruit), y + np.random.normal(0, bruit)),
+                    voiture.theta + np.random.normal(0, .02))
+            en_route.append((t + latence, pose, t))
+            prochaine += 1/image_par_s
+        while en_route and en_route[0][0] <= t:
+            _, derniere, t_image = en_route.pop(0)
+            filtre.correct(derniere, t_image)
+        if pas % 5 == 0 and derniere is not None:
+            vraie = en_pixels(voiture.x, voiture.y)
+            erreurs["derniere pose"].append(math.dist(derniere[0], vraie))
+            erreurs["estimateur"].append(math.dist(filtre.estimate(t)[0], vraie))
+    temps = time.perf_counter() - t_debut
+
+    print(f"estimation : {duree} s, {image_par_s} images/s, latence {latence*1e3:g} ms, "
+          f"bruit {bruit:g} px, voiture a {ecart_modele:g} du modele")
+    for nom, erreur in erreurs.items():
+        print(f"	{nom:13s} : erreur moyenne {np.mean(erreur):.2f} px (max {np.max(erreur):.2f} px)")
+    print(f"	{filtre.nbr_steps} pas du modele, {filtre.nbr_poses} poses, {temps:.2f} s avec la voiture simulee")
+
+
+def threshold_calibration(nbr_images=20, image_par_s=30):
+    """
+    Seuil de la camera sur des images 640x480 factices (une voiture blanche sur un fond
+    bruite, plus ou moins eclaire): l'ancienne descente de 255 a 1, une image seuillee
+    par pas, contre detect.histogram_threshold sur une seule image.
+    """
+    import tempfile
+
+    import cv2
+    import detect
+
+    rng = np.random.default_rng(0)
+    images = []
+    for numero in range(nbr_images):
+        eclairage = 40 + 100*numero/nbr_images
+        image = np.clip(rng.normal(eclairage, 15, (480, 640)), 0, 255).astype(np.uint8)
+        x, y = int(rng.integers(100, 540)), int(rng.integers(100, 380))
+        cv2.rectangle(image, (x-25, y-20), (x+25, y+20), min(255, eclairage + 110), -1)
+        cv2.circle(image, (x-9, y), 13, 0, -1)
+        cv2.circle(image, (x+14, y), 8, 0, -1)
+        images.append(image)
+
+    t_debut, ancien, nbr_lectures = time.perf_counter(), [], 0
+    for image in images:
+        for seuil in range(255, 0, -1):
+            nbr_lectures += 1
+            if cv2.threshold(image, thresh=seuil, maxval=255, type=0)[1].mean() > 1.05:
+                break
+        ancien.append(seuil)
+    t_ancien = (time.perf_counter() - t_debut) / nbr_images
+
+    print(f"threshold_calibration : {nbr_images} images 640x480")
+    print(f"	descente       : {t_ancien*1e3:.2f} ms par image, {nbr_lectures/nbr_images:.0f} images lues, "
+          f"soit {nbr_lectures/nbr_images/image_par_s:.1f} s a {image_par_s} images/s")
+    for methode in detect.THRESH_METHODS:
+        t_debut = time.perf_counter()
+        seuils = [detect.histogram_threshold(image, methode) for image in images]
+        duree = (time.perf_counter() - t_debut) / nbr_images
+        print(f"	{methode:14s} : {duree*1e3:.2f} ms par image, 1 image lue, "
+              f"{sum(a == b for a, b in zip(ancien, seuils))}/{nbr_images} seuils egaux a la descente")
+
+    # Seuil garde: la verification se fait sur l'image deja lue.
+    with tempfile.TemporaryDirectory() as repertoire:
+        chemin = os.path.join(repertoire, detect.THRESH_FILE)
+        detect.calibrate(images[0], "1/default", thresh_file=chemin)
+        t_debut = time.perf_counter()
+        repris = sum(detect.calibrate(image, "1/default", thresh_file=chemin)[1] for image in images[:2])
+        duree = (time.perf_counter() - t_debut) / 2
+        autre = detect.calibrate(images[-1], "1/default", thresh_file=chemin)[1]
+    print(f"\tseuil garde    : {duree*1e3:.2f} ms, repris {repris}/2 avec le meme eclairage, "
+          f"{'repris' if autre else 'recalcule'} avec un autre")
+
+
+def wire_protocol(nbr_messages=20000, taille_max_segment=40):
+    """
+    Encodage et decodage des consignes des roues: l'ancien pickle d'un dict par roue
+    contre les trames de protocol, une par roue ou une pour les 4 roues. Les trames
+    sont aussi decoupees au hasard, comme des segments TCP, pour verifier le decoupage.
+    """
+    import pickle
+
+    import protocol
+
+    rng = np.random.default_rng(0)
+    vitesses = rng.uniform(-1, 1, (nbr_messages, 4)).astype(np.float32).astype(float).tolist()
+    roues = [(numero % 4 + 1, v[numero % 4]) for numero, v in enumerate(vitesses)]
+
+    def mesure(encode, decode, messages):
+        t_debut = time.perf_counter()
+        trames = [encode(message) for message in messages]
+        t_encode = time.perf_counter() - t_debut
+        t_debut = time.perf_counter()
+        decodes = [decode(trame) for trame in trames]
+        t_decode = time.perf_counter() - t_debut
+        return t_encode/len(messages)*1e6, t_decode/len(messages)*1e6, len(trames[0]), decodes
+
+    parser = protocol.FrameParser()
+
+    def decode_trame(trame):
+        (message_type, payload), = parser.feed(trame)
+        return protocol.decode(message_type, payload)[1]
+
+    resultats = {
+        "pickle, une roue": mesure(lambda m: pickle.dumps({"args": m, "kwargs": {}}),
+                                   lambda d: pickle.loads(d)["args"], roues),
+        "trame, une roue": mesure(lambda m: protocol.encode_move_wheel(*m), decode_trame, roues),
+        "trame, 4 roues": mesure(protocol.encode_set_wheels, decode_trame, vitesses),
+    }
+    print(f"wire_protocol : {nbr_messages} messages")
+    for nom, (t_encode, t_decode, taille, decodes) in resultats.items():
+        justes = sum(tuple(a) == tuple(b) for a, b in zip(decodes, roues if "une" in nom else vitesses))
+        print(f"\t{nom:16s} : encodage {t_encode:.2f} us, decodage {t_decode:.2f} us, "
+              f"{taille} octets, {justes}/{nbr_messages} identiques")
+
+    # Flux coupe n'importe ou: une seule lecture de plusieurs trames ou une trame en plusieurs lectures.
+    flux = b"".join(protocol.encode_set_wheels(v) for v in vitesses)
+    recues, debut = [], 0
+    t_debut = time.perf_counter()
+    while debut < len(flux):
+        fin = debut + int(rng.integers(1, taille_max_segment))
+        recues += [protocol.decode(*trame)[1] for trame in parser.feed(flux[debut:fin])]
+        debut = fin
+    duree = time.perf_counter() - t_debut
+    print(f"\tflux decoupe     : {duree/nbr_messages*1e6:.2f} us par trame, "
+          f"{sum(tuple(a) == tuple(b) for a, b in zip(recues, vitesses))}/{nbr_messages} trames retrouvees")
+
+
+BENCHMARKS = {
+    "batch_state": batch_state,
+    "integrators": integrators,
+    "copy_regression": copy_regression,
+    "parallel_scaling": parallel_scaling,
+    "boundary_resume": boundary_resume,
+    "results_writer": results_writer,
+    "run_store": run_store,
+    "rendering": rendering,
+    "recording": recording,
+    "early_stopping": early_stopping,
+    "selection_methods": selection_methods,
+    "islands": islands,
+    "control_loop": control_loop,
+    "detection": detection,
+    "estimation": estimation,
+    "threshold_calibration": threshold_calibration,
+    "wire_protocol": wire_protocol,
+}
+
+
+if __name__ == '__main__':
+    for nom in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[nom]()
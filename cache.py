@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""
+|==========================================|
+| Caches of already simulated individuals. |
+|==========================================|
+
+* With small mutation factors, many children are bit identical to a
+parent or to a sibling, simulating them again is useless.
+* When only the last portions of a genome changed, the simulation
+starts again from the state of the car at the first changed portion.
+"""
+
+import collections
+import hashlib
+
+import simulation
+
+
+class FitnessCache:
+    """
+    |===================================================|
+    | Bounded LRU cache of scores and trajectories,     |
+    | keyed by genome, physics and simulation settings. |
+    |===================================================|
+    """
+    def __init__(self, maxsize=10000):
+        """
+        Parameters
+        ----------
+        :param maxsize: Nombre maximal d'individus gardes en memoire.
+        :type maxsize: int
+        """
+        assert isinstance(maxsize, int), \
+            "'maxsize' must be of type int. Not %s." \
+            % type(maxsize).__name__
+        assert maxsize > 0, "'maxsize' must be positive."
+
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict() # Du moins au plus recemment utilise.
+        self.hits = 0 # Individus retrouves dans la generation courante.
+        self.misses = 0 # Individus simules dans la generation courante.
+        self.history = [] # (hits, misses) de chaque generation terminee.
+
+    def hasher(self, *settings):
+        """
+        |=============================================|
+        | Debut de cle commun a toute une generation. |
+        |=============================================|
+
+        Parameters
+        ----------
+        :arg settings: Tout ce qui, en plus du genome, change le resultat
+            (duree des portions, arrivee, integrateur...). Doit avoir un repr stable.
+
+        Returns
+        -------
+        :return: Un hash des constantes physiques et des reglages,
+            a completer avec key.
+        :rtype: hashlib.blake2b
+        """
+        return hashlib.blake2b(repr((simulation.constants(), settings)).encode(), digest_size=16)
+
+    def key(self, hasher, bias):
+        """
+        Cle d'un individu: le hash commun complete par bias.tobytes().
+        """
+        hasher = hasher.copy()
+        hasher.update(str(bias.shape).encode())
+        hasher.update(bias.tobytes())
+        return hasher.digest()
+
+    def get(self, key):
+        """
+        |=========================================|
+        | Resultat deja calcule pour un individu. |
+        |=========================================|
+
+        Returns
+        -------
+        :return: Le score, les echantillons de la trajectoire de forme (nbr_samples, 6)
+            et la raison de l'arret de la simulation, None si l'individu est inconnu.
+        :rtype: (float, np.ndarray, str)
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, score, samples, reason="complete"):
+        """
+        Enregistre le resultat d'un individu, en oubliant le plus ancien si besoin.
+        """
+        self.entries[key] = (score, samples, reason)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def new_generation(self):
+        """
+        Archive les compteurs de la generation qui se termine.
+        """
+        self.history.append((self.hits, self.misses))
+        self.hits, self.misses = 0, 0
+
+
+class BoundaryCache(FitnessCache):
+    """
+    |=======================================|
+    | States of the car at portion bounds,  |
+    | keyed by the portions already driven. |
+    |=======================================|
+
+    * The trajectory up to portion k only depends on bias[:k], the entries
+    are (etat, samples): the vector (vx, vy, w, x, y, theta) at the start
+    of portion k and the samples of the trajectory recorded before it.
+    * hits counts the individuals resumed from a cached state,
+    saved_steps the simulation steps which were not computed again.
+    * The size of an entry grows with the recorded samples,
+    the cache is bounded by the bytes of its arrays.
+    * A step of simulation.BatchState costs about the same for a few cars
+    or a few hundreds: the saved steps only save time for large populations.
+    """
+    def __init__(self, maxbytes=64 << 20):
+        """
+        Parameters
+        ----------
+        :param maxbytes: Taille maximale des etats et echantillons gardes, en octets.
+        :type maxbytes: int
+        """
+        assert isinstance(maxbytes, int), \
+            "'maxbytes' must be of type int. Not %s." \
+            % type(maxbytes).__name__
+        assert maxbytes > 0, "'maxbytes' must be positive."
+
+        super().__init__(1) # maxsize ne sert pas, la limite est maxbytes.
+        self.maxbytes = maxbytes
+        self.nbytes = 0 # Taille des tableaux des entrees.
+        self.saved_steps = 0 # Pas economises dans la generation courante.
+        self.saved_steps_history = [] # saved_steps de chaque generation terminee.
+
+    def keys(self, hasher, bias):
+        """
+        |======================================|
+        | Cles de tous les debuts d'un genome. |
+        |======================================|
+
+        Returns
+        -------
+        :return: La cle de bias[:k] pour k = 1 ... nbr_portions-1.
+        :rtype: list
+        """
+        hasher = hasher.copy()
+        hasher.update(str(bias.shape[1:]).encode())
+        keys = []
+        for portion in bias[:-1]: # Hash incremental, une portion de plus a chaque cle.
+            hasher.update(portion.tobytes())
+            keys.append(hasher.digest())
+        return keys
+
+    def get(self, keys):
+        """
+        |==========================================|
+        | Plus long debut deja simule d'un genome. |
+        |==========================================|
+
+        Parameters
+        ----------
+        :param keys: Les cles donnees par self.keys.
+        :type keys: list
+
+        Returns
+        -------
+        :return: Le numero k de la premiere portion a simuler et l'entree
+            de bias[:k], (0, None) si aucun debut n'est connu.
+        :rtype: (int, tuple)
+        """
+        for k in range(len(keys), 0, -1):
+            if keys[k-1] in self.entries:
+                self.entries.move_to_end(keys[k-1])
+                self.hits += 1
+                return k, self.entries[keys[k-1]]
+        self.misses += 1
+        return 0, None
+
+    def put(self, key, etat, samples):
+        """
+        Enregistre l'etat au debut d'une portion et les echantillons deja enregistres.
+        """
+        if key in self.entries:
+            self.nbytes -= sum(array.nbytes for array in self.entries[key])
+        self.entries[key] = (etat, samples)
+        self.entries.move_to_end(key)
+        self.nbytes += etat.nbytes + samples.nbytes
+        while self.nbytes > self.maxbytes and self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in entry)
+
+    def new_generation(self):
+        """
+        Archive les compteurs de la generation qui se termine.
+        """
+        super().new_generation()
+        self.saved_steps_history.append(self.saved_steps)
+        self.saved_steps = 0
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""
+|=====================================|
+| Checkpoints of a running evolution. |
+|=====================================|
+
+* A checkpoint is a pickled dict, written in a temporary file of the same
+directory then renamed over the previous one: a crash during the writing
+leaves the previous checkpoint intact.
+* The content is chosen by genetic.Generation.simulation,
+:seealso: genetic.Generation.resume
+"""
+
+import os
+import pickle
+import random
+import tempfile
+
+import numpy as np
+
+
+def save(path, state):
+    """
+    |==========================================|
+    | Ecrit state dans path de facon atomique. |
+    |==========================================|
+
+    * Les etats des generateurs de random et np.random sont ajoutes.
+
+    Parameters
+    ----------
+    :param path: Le fichier du point de reprise.
+    :type path: str
+    :param state: Tout ce qu'il faut pour continuer l'evolution.
+    :type state: dict
+    """
+    state = dict(state, random=random.getstate(), np_random=np.random.get_state())
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    file = tempfile.NamedTemporaryFile("wb", dir=directory, prefix=".checkpoint_", delete=False)
+    try:
+        with file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, path)
+    except BaseException:
+        os.remove(file.name)
+        raise
+
+
+def load(path):
+    """
+    |==================================|
+    | Lit un point de reprise de save. |
+    |==================================|
+
+    * Les generateurs de random et np.random ne sont pas modifies,
+    :seealso: restore_random
+
+    Returns
+    -------
+    :return: Le dict donne a save, avec les etats des generateurs.
+    :rtype: dict
+    """
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def restore_random(state):
+    """
+    Remet random et np.random dans l'etat du point de reprise.
+    """
+    random.setstate(state["random"])
+    np.random.set_state(state["np_random"])
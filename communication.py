@@ -9,7 +9,6 @@
 
 import ipaddress
 import os
-import pickle
 import queue
 import socket
 import subprocess
@@ -18,6 +17,7 @@ import threading
 import time
 
 import interface
+import protocol
 
 
 PORT = 1234 # This can be any number 
@@ -42,18 +42,30 @@ class Server:
     def salon(self, client_socket):
         """
         Method to be launched in a thread, if it's a client.
+
+        * Les messages sont des trames de protocol, decoupees quel que soit le decoupage TCP.
+        * Une trame invalide ferme la connexion, la suite du flux ne peut plus etre decoupee.
         """
+        parser = protocol.FrameParser()
         while True:
-            data = client_socket.recv(1024)
-            if data:
-                print("Received message :")
-                print(data)
-                message = pickle.loads(data)
-                print("\t%s", message)
+            data = client_socket.recv(4096)
+            if not data: # Le client est deconnecte.
+                break
+            try:
+                frames = parser.feed(data)
+            except ValueError as e:
+                sys.stderr.write(str(e))
+                break
+            for message_type, payload in frames:
                 try:
-                    interface.move_wheel(*message["args"], **message["kwargs"])
+                    command, args = protocol.decode(message_type, payload)
+                    if command == "set_wheels":
+                        interface.set_wheels(*args)
+                    else:
+                        interface.move_wheel(*args)
                 except Exception as e:
                     sys.stderr.write(str(e))
+        client_socket.close()
 
     def ecoute(self):
         """
@@ -106,6 +118,7 @@ class Client:
             self.port = PORT
         print(self.ip, self.port)
         self.tcp_socket = socket.create_connection((self.ip, self.port))
+        self.tcp_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Les trames courtes partent tout de suite.
 
     def get_ipv4_lan(self):
         """
@@ -184,9 +197,18 @@ class Client:
             f.write(ip)
         return ip, port
 
-    def move_wheel(self, *args, **kwargs):
+    def move_wheel(self, wheel, speed):
         """
         Alias to move_wheel of the Rapsberry.
+
+        :seealso: protocol.encode_move_wheel
+        """
+        self.tcp_socket.sendall(protocol.encode_move_wheel(wheel, speed))
+
+    def set_wheels(self, *speeds):
+        """
+        Alias to set_wheels of the Rapsberry, one frame for the 4 wheels.
+
+        :seealso: protocol.encode_set_wheels
         """
-        data = pickle.dumps({"args": args, "kwargs": kwargs})
-        self.tcp_socket.sendall(data)
+        self.tcp_socket.sendall(protocol.encode_set_wheels(speeds))
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+"""
+|================================|
+| Fixed rate control of the car. |
+|================================|
+
+* The commands are applied at a fixed rate, on deadlines computed from a
+monotonic clock: a late tick does not shift the following ones.
+* The four wheel speeds are sent in a single command, only when one of them changes.
+* The pose is read by a thread, the control loop takes the last one
+without waiting for the camera.
+* The loop, the estimator and the camera share one clock (time.monotonic):
+a pose is dated by the capture of its image, not by its arrival.
+* With an estimator.Estimator, the loop records the estimated pose at every
+tick instead of the sparse camera poses.
+* Each run gives ControlStats: achieved rate, overruns, lateness
+and command to pose latency.
+"""
+
+import functools
+import math
+import threading
+import time
+
+import numpy as np
+
+
+class ControlStats:
+    """
+    |========================================|
+    | Statistiques d'une boucle de controle. |
+    |========================================|
+    """
+    def __init__(self, rate):
+        """
+        :param rate: La frequence demandee, en Hz.
+        :type rate: float
+        """
+        self.rate = rate
+        self.ticks = 0 # Nombre de tours de boucle.
+        self.overruns = 0 # Tours finis apres l'echeance du suivant.
+        self.duration = 0.0 # Duree de la boucle en secondes.
+        self.lateness = [] # Retard du reveil sur l'echeance de chaque tour, en secondes.
+        self.latencies = [] # Entre un changement de consigne et la premiere pose d'une image prise apres.
+        self.commands = 0 # Envois des consignes des 4 roues.
+        self.poses = 0 # Nouvelles poses lues.
+
+    @property
+    def achieved_rate(self):
+        """
+        La frequence obtenue, en Hz.
+        """
+        return self.ticks / self.duration if self.duration else 0.0
+
+    def __str__(self):
+        lateness = np.array(self.lateness or [0.0])*1e3
+        latencies = np.array(self.latencies or [np.nan])*1e3
+        return (f"{self.achieved_rate:.1f}/{self.rate:g} Hz, {self.ticks} tours, "
+                f"{self.overruns} depassements, retard moyen {lateness.mean():.2f} ms (max {lateness.max():.2f} ms), "
+                f"latence consigne-pose {np.nanmean(latencies):.1f} ms (max {np.nanmax(latencies):.1f} ms), "
+                f"{self.commands} consignes, {self.poses} poses")
+
+
+class PoseReader(threading.Thread):
+    """
+    |===========================================|
+    | Lit la pose de la voiture en continu dans |
+    | un thread, la derniere est gardee.        |
+    |===========================================|
+    """
+    def __init__(self, get_position, clock=time.monotonic):
+        """
+        Parameters
+        ----------
+        :param get_position: Fonction bloquante qui renvoie une nouvelle pose et l'instant
+            de capture de son image, (((x, y), angle), instant),
+            :seealso: interface.next_position
+        :type get_position: callable
+        :param clock: Horloge monotone des instants de capture, en secondes.
+        :type clock: callable
+        """
+        super().__init__(daemon=True)
+        self.get_position = get_position
+        self.clock = clock
+        self.pose = None # ((x, y), angle, capture de l'image, fin de la mesure, numero)
+        self.error = None
+        self._running = threading.Event()
+        self._running.set()
+
+    def run(self):
+        number = 0
+        while self._running.is_set():
+            try:
+                (position, angle), capture_time = self.get_position()
+            except Exception as error: # Renvoyee par latest.
+                self.error = error
+                return
+            number += 1
+            self.pose = (position, angle, capture_time, self.clock(), number)
+
+    def latest(self):
+        """
+        |==========================================|
+        | La derniere pose mesuree, sans attendre. |
+        |==========================================|
+
+        Returns
+        -------
+        :return: ((x, y), angle, capture de l'image, fin de la mesure, numero de la mesure),
+            None avant la premiere mesure.
+        :rtype: tuple
+        """
+        if self.error is not None:
+            raise self.error
+        return self.pose
+
+    def stop(self):
+        """
+        Arrete le thread apres la mesure en cours.
+        """
+        self._running.clear()
+        if self.is_alive():
+            self.join()
+
+
+class ControlLoop:
+    """
+    |=========================================|
+    | Applique les consignes d'un individu a  |
+    | frequence fixe et enregistre les poses. |
+    |=========================================|
+    """
+    def __init__(self, rate=50, set_wheels=None, get_position=None, clock=time.monotonic, sleep=time.sleep,
+                 estimator=None):
+        """
+        Parameters
+        ----------
+        :param rate: Frequence de la boucle, en Hz.
+        :type rate: float
+        :param set_wheels: Commande des 4 roues, None pour interface.set_wheels.
+        :type set_wheels: callable
+        :param get_position: Attente d'une nouvelle pose et de l'instant de capture de son image,
+            None pour interface.next_position(timestamp=True). :seealso: PoseReader
+        :type get_position: callable
+        :param clock: Horloge monotone en secondes, celle des instants de capture.
+        :type clock: callable
+        :param sleep: Attente, en secondes.
+        :type sleep: callable
+        :param estimator: Estimation de la pose entre deux images, avec la meme horloge que clock,
+            None pour n'enregistrer que les poses de la camera. :seealso: estimator.Estimator
+        :type estimator: estimator.Estimator
+        """
+        assert rate > 0, "'rate' must be positive."
+        if set_wheels is None or get_position is None:
+            import interface
+            set_wheels = interface.set_wheels if set_wheels is None else set_wheels
+            if get_position is None:
+                get_position = functools.partial(interface.next_position, timestamp=True)
+
+        self.rate = rate
+        self.set_wheels = set_wheels
+        self.get_position = get_position
+        self.clock = clock
+        self.sleep = sleep
+        self.estimator = estimator
+
+    def run(self, commands, duration):
+        """
+        |=================================|
+        | Fait rouler la voiture duration |
+        | secondes puis l'arrete.         |
+        |=================================|
+
+        Parameters
+        ----------
+        :param commands: Les vitesses des roues a l'instant t, :seealso: genetic.Gene.__call__
+        :type commands: callable
+        :param duration: Duree du mouvement, en secondes.
+        :type duration: float
+
+        Returns
+        -------
+        :return: Les listes des x et des y des poses lues, ou estimees a chaque tour
+            avec un estimateur, et les statistiques.
+        :rtype: (list, list, ControlStats)
+        """
+        stats = ControlStats(self.rate)
+        period = 1 / self.rate
+        X, Y = [], []
+        sent = [None]*4 # Les vitesses appliquees.
+        command_time = None # Changement de consigne en attente d'une pose.
+        last_pose = 0
+
+        reader = PoseReader(self.get_position, self.clock)
+        reader.start()
+        start = self.clock()
+        tick = 0
+        try:
+            while True:
+                now = self.clock()
+                if now - start >= duration:
+                    break
+
+                # Consignes, envoyees en une fois si l'une d'elles change.
+                speeds = [float(speed) for speed in commands(now - start)]
+                if speeds != sent:
+                    self.set_wheels(*speeds)
+                    stats.commands += 1
+                    if command_time is None:
+                        command_time = now
+                    if self.estimator is not None:
+                        self.estimator.command(speeds, now)
+                    sent = speeds
+
+                # Pose, sans attendre la camera.
+                pose = reader.latest()
+                if pose is not None and pose[4] != last_pose:
+                    (x, y), angle, capture_time, measure_end, last_pose = pose
+                    if self.estimator is None:
+                        X.append(x)
+                        Y.append(y)
+                    else:
+                        self.estimator.correct(((x, y), angle), capture_time)
+                    stats.poses += 1
+                    if command_time is not None and capture_time >= command_time:
+                        stats.latencies.append(measure_end - command_time)
+                        command_time = None
+                if self.estimator is not None:
+                    estimate = self.estimator.estimate(self.clock())
+                    if estimate is not None:
+                        X.append(estimate[0][0])
+                        Y.append(estimate[0][1])
+
+                # Attente de l'echeance suivante.
+                tick += 1
+                deadline = start + tick*period
+                now = self.clock()
+                if now > deadline: # Les tours manques sont sautes.
+                    stats.overruns += 1
+                    tick = math.ceil((now - start) / period)
+                    deadline = start + tick*period
+                self.sleep(max(0.0, deadline - self.clock()))
+                stats.lateness.append(max(0.0, self.clock() - deadline))
+                stats.ticks += 1
+        finally:
+            self.set_wheels(0, 0, 0, 0) # La voiture s'arrete a la fin, meme apres une erreur.
+            stats.duration = self.clock() - start
+            reader.stop()
+        return X, Y, stats
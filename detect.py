@@ -6,27 +6,347 @@
 |======================|
 """
 
+import collections
+import json
+import os
+import time
+import threading
+
 import cv2
 import numpy as np
-import threading
 
 
-lock = threading.Lock()
+def _center(contour):
+    """
+    Centre d'un contour, celui de son rectangle englobant si son aire est nulle.
+    """
+    x, y, width, height = cv2.boundingRect(contour)
+    moments = cv2.moments(contour)
+    try:
+        cx = int(moments['m10']/moments['m00'])
+    except ZeroDivisionError:
+        cx = x + width//2
+    try:
+        cy = int(moments['m01']/moments['m00'])
+    except ZeroDivisionError:
+        cy = y + height//2
+    return cx, cy
+
+
+def find_contours(thresh_image, offset=(0, 0), coef=1):
+    """
+    |============================================|
+    | Cherche la voiture et ses deux ronds parmi |
+    | les contours d'une image seuillee.         |
+    |============================================|
+
+    * La voiture est un contour de perimetre entre 150 et 190 pixels, le rond
+    arriere un de ses enfants entre 75 et 90, le rond avant entre 40 et 60.
+
+    Parameters
+    ----------
+    :param thresh_image: Image noir et blanc, ou une partie de l'image.
+    :type thresh_image: np.ndarray
+    :param offset: Position (x, y) de thresh_image dans l'image entiere.
+    :type offset: tuple
+    :param coef: Facteur d'echelle des perimetres.
+    :type coef: float
+
+    Returns
+    -------
+    :return: Les centres de la voiture, du rond arriere et du rond avant
+        dans l'image entiere, None si la voiture n'est pas vue.
+    :rtype: tuple
+    """
+    contours, hierarchy = cv2.findContours(thresh_image,
+                            mode=cv2.RETR_TREE,
+                            method=cv2.CHAIN_APPROX_SIMPLE,
+                            offset=tuple(offset)) # Find coutours.
+    if hierarchy is None:
+        return None
+
+    children = {} # Parent -> enfants, en un seul passage.
+    for j, parent in enumerate(hierarchy[0][:, 3].tolist()):
+        children.setdefault(parent, []).append(j)
+
+    found = None
+    for i, contour in enumerate(contours):
+        if 150*coef < cv2.arcLength(contour, True) < 190*coef: # On detecte la voiture (le perimetre de la voiture etant contenu entre ces 2 valeurs.)
+            pos = _center(contour)
+            rear, front = pos, pos
+            for j in children.get(i, ()): # Récupère les enfants:
+                peri_child = cv2.arcLength(contours[j], True)
+                if peri_child > 75*coef and peri_child < 90*coef:
+                    rear = _center(contours[j])
+
+                if peri_child > 40*coef and peri_child < 60*coef:
+                    front = _center(contours[j])
+            found = (pos, rear, front)
+    return found
+
+
+def find_components(thresh_image, offset=(0, 0), coef=1):
+    """
+    |==============================================|
+    | Meme chose que find_contours, avec les       |
+    | composantes connexes, sans suivre les bords. |
+    |==============================================|
+
+    * Le perimetre de la voiture est estime par celui de son rectangle englobant,
+    celui d'un rond par celui du disque de meme aire.
+
+    :seealso: find_contours
+    """
+    nbr, labels, stats, centroids = cv2.connectedComponentsWithStats(thresh_image, connectivity=8)
+    perimeters = 2*(stats[:, cv2.CC_STAT_WIDTH] + stats[:, cv2.CC_STAT_HEIGHT])
+    found = None
+    for k in np.flatnonzero((150*coef < perimeters) & (perimeters < 190*coef)):
+        if k == 0: # Le fond.
+            continue
+        x, y, width, height = stats[k, :4].tolist()
+        pos = (offset[0] + int(centroids[k, 0]), offset[1] + int(centroids[k, 1]))
+        rear, front = pos, pos
+
+        # Les trous de la voiture: ce qui n'est pas elle dans son rectangle, sans toucher le bord.
+        holes = (labels[y:y+height, x:x+width] != k).astype(np.uint8)
+        nbr_holes, _, holes_stats, holes_centroids = cv2.connectedComponentsWithStats(holes, connectivity=4)
+        for q in range(1, nbr_holes):
+            hx, hy, hwidth, hheight, area = holes_stats[q].tolist()
+            if hx == 0 or hy == 0 or hx + hwidth == width or hy + hheight == height:
+                continue
+            peri_child = 2*np.sqrt(np.pi*area)
+            center = (offset[0] + x + int(holes_centroids[q, 0]), offset[1] + y + int(holes_centroids[q, 1]))
+            if 75*coef < peri_child < 90*coef:
+                rear = center
+            if 40*coef < peri_child < 60*coef:
+                front = center
+        found = (pos, rear, front)
+    return found
+
+
+DETECTORS = {"contours": find_contours, "components": find_components}
+
+
+# Seuillage.
+
+WHITE_FRACTION = 1.05/255 # Part de pixels blancs visee, celle de l'ancien critere thresh_image.mean() > 1.05.
+THRESH_FILE = "thresh_camera.json" # Seuils deja trouves, par camera et par eclairage.
+THRESH_METHODS = ("fraction", "otsu")
+
+def histogram_threshold(gray_image, method="fraction", white_fraction=WHITE_FRACTION):
+    """
+    |==================================================|
+    | Seuil d'une image grise d'apres son histogramme. |
+    |==================================================|
+
+    * 'fraction' donne le plus grand seuil qui laisse plus de white_fraction pixels blancs,
+    le meme que la descente de 255 a 1 de l'ancien ImageCapture.init_thresh.
+    * 'otsu' donne le seuil qui separe le mieux les deux modes de l'histogramme.
+
+    Parameters
+    ----------
+    :param gray_image: Image en niveaux de gris (uint8).
+    :type gray_image: np.ndarray
+    :param method: L'une des THRESH_METHODS.
+    :type method: str
+    :param white_fraction: Part de pixels strictement au dessus du seuil, pour 'fraction'.
+    :type white_fraction: float
+
+    Returns
+    -------
+    :return: Le seuil, entre 1 et 255.
+    :rtype: int
+    """
+    assert method in THRESH_METHODS, "'method' must be one of %s." % ", ".join(THRESH_METHODS)
+    if method == "otsu":
+        thresh, _ = cv2.threshold(gray_image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return max(1, int(thresh))
+
+    histogram = np.bincount(gray_image.ravel(), minlength=256)
+    above = histogram.sum() - np.cumsum(histogram) # above[t]: pixels > t.
+    candidates = np.flatnonzero(above[1:] > white_fraction*gray_image.size) + 1
+    return int(candidates[-1]) if len(candidates) else 1
+
+def white_fraction(gray_image, thresh):
+    """
+    Part des pixels strictement au dessus de thresh.
+    """
+    return np.count_nonzero(gray_image > thresh) / gray_image.size
+
+def calibrate(gray_image, key, method="fraction", thresh_file=THRESH_FILE, tolerance=2.0):
+    """
+    |====================================================|
+    | Seuil garde pour key, ou recalcule sur gray_image. |
+    |====================================================|
+
+    * Le seuil garde est repris si, sur gray_image, sa part de pixels blancs reste
+    a tolerance pres de celle de la calibration. Sinon il est recalcule et garde.
+
+    Parameters
+    ----------
+    :param gray_image: Une image de la camera en niveaux de gris.
+    :type gray_image: np.ndarray
+    :param key: La camera et l'eclairage, par exemple '1/default'.
+    :type key: str
+    :param method: Calcul du seuil, :seealso: histogram_threshold
+    :type method: str
+    :param thresh_file: Fichier json des seuils gardes, None pour toujours recalculer.
+    :type thresh_file: str
+    :param tolerance: Rapport maximal entre les parts de pixels blancs.
+    :type tolerance: float
+
+    Returns
+    -------
+    :return: Le seuil, et True s'il est repris de thresh_file.
+    :rtype: (int, bool)
+    """
+    assert tolerance >= 1, "'tolerance' must be at least 1."
+    saved = {}
+    if thresh_file is not None and os.path.exists(thresh_file):
+        with open(thresh_file, "r") as f:
+            saved = json.load(f)
+
+    # Verification rapide du seuil garde.
+    if key in saved and saved[key]["method"] == method:
+        fraction = white_fraction(gray_image, saved[key]["thresh"])
+        if saved[key]["white_fraction"]/tolerance <= fraction <= saved[key]["white_fraction"]*tolerance:
+            return saved[key]["thresh"], True
+
+    thresh = histogram_threshold(gray_image, method)
+    if thresh_file is not None:
+        saved[key] = {"thresh": thresh, "method": method, "white_fraction": white_fraction(gray_image, thresh)}
+        with open(thresh_file, "w") as f:
+            json.dump(saved, f, indent=4)
+    return thresh, False
+
+
+class Tracker:
+    """
+    |==========================================|
+    | Cherche la voiture dans une fenetre      |
+    | autour de sa position prevue, dans toute |
+    | l'image quand elle y est perdue.         |
+    |==========================================|
+    """
+    def __init__(self, threshold, detector="contours", tracking=True, margin=80):
+        """
+        Parameters
+        ----------
+        :param threshold: Seuillage d'une image ou d'une partie d'image.
+        :type threshold: callable
+        :param detector: Le detecteur, parmi DETECTORS.
+        :type detector: str
+        :param tracking: False pour toujours traiter toute l'image.
+        :type tracking: bool
+        :param margin: Demi cote de la fenetre a vitesse nulle, en pixels.
+        :type margin: int
+        """
+        assert detector in DETECTORS, "'detector' must be one of %s." % ", ".join(DETECTORS)
+        self.threshold = threshold
+        self.detector = detector
+        self.tracking = tracking
+        self.margin = margin
+        self.last_seen = None # ((x, y), instant de capture) de la derniere image ou la voiture est vue.
+        self.speed = (0.0, 0.0) # Vitesse de la voiture, en pixels par seconde.
+        self.nbr_tracked = 0 # Poses trouvees dans la fenetre.
+        self.nbr_full = 0 # Images traitees en entier.
+        self.process_times = collections.deque(maxlen=100) # Durees des derniers traitements, en secondes.
+
+    def window(self, capture_time, shape):
+        """
+        |===================================|
+        | Fenetre (x0, y0, x1, y1) autour   |
+        | de la position prevue, None si la |
+        | voiture est perdue.               |
+        |===================================|
+        """
+        if not self.tracking or self.last_seen is None:
+            return None
+        (x, y), t = self.last_seen
+        dt = max(0.0, capture_time - t)
+        x, y = x + self.speed[0]*dt, y + self.speed[1]*dt
+        margin = self.margin + 0.5*np.hypot(*self.speed)*dt # L'erreur de prevision grandit avec la vitesse.
+        height, width = shape[:2]
+        x0, y0 = max(0, int(x - margin)), max(0, int(y - margin))
+        x1, y1 = min(width, int(x + margin) + 1), min(height, int(y + margin) + 1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    def __call__(self, image, capture_time=0.0):
+        """
+        |====================================|
+        | Cherche la voiture dans une image. |
+        |====================================|
+
+        * La duree du traitement est ajoutee a self.process_times.
+
+        Returns
+        -------
+        :return: Les centres de la voiture, du rond arriere et du rond avant,
+            None si la voiture n'est pas vue. :seealso: find_contours
+        :rtype: tuple
+        """
+        t_debut = time.perf_counter()
+        find = DETECTORS[self.detector]
+        found = None
+        window = self.window(capture_time, image.shape)
+        if window is not None:
+            x0, y0, x1, y1 = window
+            found = find(self.threshold(image[y0:y1, x0:x1]), offset=(x0, y0))
+            self.nbr_tracked += found is not None
+        if found is None: # Voiture perdue ou pas de suivi: toute l'image.
+            found = find(self.threshold(image))
+            self.nbr_full += 1
+
+        if found is None:
+            self.last_seen, self.speed = None, (0.0, 0.0)
+        else:
+            if self.last_seen is not None and capture_time > self.last_seen[1]:
+                (x, y), t = self.last_seen
+                dt = capture_time - t
+                self.speed = ((found[0][0] - x)/dt, (found[0][1] - y)/dt)
+            self.last_seen = (found[0], capture_time)
+        self.process_times.append(time.perf_counter() - t_debut)
+        return found
+
+    def process_ms(self):
+        """
+        Duree moyenne du traitement des dernieres images, en millisecondes.
+        """
+        return 1e3*np.mean(self.process_times) if self.process_times else 0.0
 
 
 class ImageCapture(threading.Thread):
     """
     Enable connection with the camera,
     Process read images .
+
+    * Ce thread est le seul a lire la camera, il garde la derniere image
+    et son instant de capture.
+    * Un second thread calcule la pose sur la derniere image, les images
+    arrivees pendant le calcul sont perdues (comptees dans nbr_dropped).
+    * get_position renvoie tout de suite la derniere pose calculee.
     """
-    def __init__ (self):
-        super().__init__()
+    def __init__ (self, lighting="default", method="fraction", thresh_file=THRESH_FILE):
+        """
+        Parameters
+        ----------
+        :param lighting: Nom de l'eclairage, le seuil est garde pour chaque camera et chaque eclairage.
+        :type lighting: str
+        :param method: Calcul du seuil, :seealso: histogram_threshold
+        :type method: str
+        :param thresh_file: Fichier des seuils deja trouves, None pour toujours recalculer.
+        :type thresh_file: str
+        """
+        super().__init__(daemon=True)
         for k in range(1,5): # Try every possible port where the webcam can be
            self.capture = cv2.VideoCapture(k)
            if not self.capture.isOpened():
                 print(k)
                 continue
            break
+        self.camera_index = k
 
         assert self.capture.isOpened(), "Unable to read data from camera."
         self.camera_image = None
@@ -38,94 +358,83 @@ class ImageCapture(threading.Thread):
         self.front = (2, 2) # Centre du rond rond avant.
         self.pos = (0, 0) # Le centre de la voiture
         self.alpha = np.pi/2 # L'angle de la voiture par defaut.
-        self.init_thresh() # Valeur par defaut du seuil.
+        self.init_thresh(lighting, method, thresh_file) # Valeur par defaut du seuil.
+
+        # Derniere image: (image, instant de capture, numero).
+        self.frame = None
+        self.frame_ready = threading.Condition()
+        self.nbr_frames = 0 # Images lues.
+        self.nbr_dropped = 0 # Images remplacees avant d'etre traitees.
+        self.taken = 0 # Numero de la derniere image prise par le thread de la pose.
 
-    def init_thresh(self):
+        # Derniere pose: ((x, y), angle, instant de capture de son image).
+        self.pose = None
+        self.pose_ready = threading.Condition()
+        self.nbr_poses = 0 # Poses calculees.
+
+        self.tracker = Tracker(self.threshold) # Ses reglages peuvent etre changes.
+        self.start_time = time.monotonic()
+        self.worker = threading.Thread(target=self.process, daemon=True)
+
+    def init_thresh(self, lighting="default", method="fraction", thresh_file=THRESH_FILE):
         """
-        Recherche Le seuil optimal.
+        Recherche le seuil sur une seule image, ou reprend celui de thresh_file.
 
         * Seul la voiture doit etre presente dans le champ de l'image.
-        """
-        # On part d'une image toute noire.
-        # On diminue le seuil jusqu'a la bonne valeur.
 
-        for thresh in range(255, 0, -1):
-            self.thresh = thresh
-            self.read()
-            if self.thresh_image.mean() > 1.05: #1.045:
-                break
+        :seealso: calibrate
+        """
+        gray_image = cv2.cvtColor(self.read()[0], cv2.COLOR_BGR2GRAY)
+        self.thresh, reused = calibrate(gray_image, "%d/%s" % (self.camera_index, lighting), method, thresh_file)
+        return reused
 
     def read(self):
         """
         Get image from camera.
 
+        * Seul le thread de capture doit lire la camera une fois demarre.
+
         Returns
         -------
-        :return: Image from camera, Thresholded black and white image.
-        :rtype: np.ndarray, np.ndarray
+        :return: Image from camera, and its capture time (time.monotonic).
+        :rtype: np.ndarray, float
         """
-        with lock:
-            return_value, self.camera_image = self.capture.read()
+        return_value, self.camera_image = self.capture.read()
+        capture_time = time.monotonic()
 
         if not return_value:
             raise ConnectionError('Unable to read camera video (Stream Stopped ?)')
+        return self.camera_image, capture_time
 
-        gray_image = cv2.cvtColor(self.camera_image, cv2.COLOR_BGR2GRAY)
+    def threshold(self, image):
+        """
+        Met a jour et renvoie l'image seuillee noir et blanc.
+        """
+        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         _, self.thresh_image = cv2.threshold(gray_image, thresh=self.thresh, maxval=255, type=0) # il y avait thresh=220, maxval=255
+        return self.thresh_image
 
-    def get_position(self):
+    def locate(self, image, capture_time=0.0):
         """
         Return barycenter of the car and angle between the car and the abscisses axes.
-        """
-        self.read()
-        coef = 1
-        contours, hierarchy = cv2.findContours(self.thresh_image,
-                                mode=cv2.RETR_TREE,
-                                method=cv2.CHAIN_APPROX_SIMPLE) # Find coutours.
-                                
-        for i, contour in enumerate(contours):
-            if 150*coef < cv2.arcLength(contour, True) < 190*coef: # On detecte la voiture (le perimetre de la voiture etant contenu entre ces 2 valeurs.)
-                x, y, width, height = cv2.boundingRect(contour) # Recupere la position du contour.
-
-                moments = cv2.moments(contour)
-                try:
-                    cx = int(moments['m10']/moments['m00'])
-                except ZeroDivisionError:
-                    cx = x + width//2
-                try:
-                    cy = int(moments['m01']/moments['m00'])
-                except ZeroDivisionError:
-                    cy = y + height//2
-                self.pos = (cx, cy)
-                self.rear, self.front = self.pos, self.pos
-
-                # Récupère les enfants:
-                for j in range(len(hierarchy[0])):
-                    if hierarchy[0][j][3] == i:
-                        x, y, width, height = cv2.boundingRect(contours[j])
-                        moments = cv2.moments(contours[j])
-                        try:
-                            cx = int(moments['m10']/moments['m00'])
-                        except ZeroDivisionError:
-                            cx = x + width//2
-                        try:
-                            cy = int(moments['m01']/moments['m00'])
-                        except ZeroDivisionError:
-                            cy = y + height//2
-
-                        peri_child = cv2.arcLength(contours[j], True)
-                        if peri_child > 75*coef and peri_child < 90*coef:
-                            self.rear = (cx, cy)
-
-                        if peri_child > 40*coef and peri_child < 60*coef:
-                            self.front = (cx, cy)
 
+        * La voiture est cherchee par self.tracker, la pose precedente est gardee
+        si elle n'est pas vue.
+        """
+        found = self.tracker(image, capture_time)
+        if found is not None:
+            self.pos, self.rear, self.front = found
         self.orientation() # Met a jour l'angle
         return self.pos, self.alpha
 
     def run(self):
         """
-        Pour le debaugage, affiche en temps reel ce qu'il se passe.
+        |=============================================|
+        | Lit la camera en continu, garde la derniere |
+        | image et reveille le thread de la pose.     |
+        |=============================================|
+
+        * Avec self.show, affiche en temps reel ce qu'il se passe, pour le debaugage.
         """
         def draw_target(image, x, y, length):
             """
@@ -135,11 +444,18 @@ class ImageCapture(threading.Thread):
             image = cv2.line(image, (x, y-length), (x, y+length), (255, 50, 130), 2)
             return image
 
+        self.worker.start()
         while True:
-            self.get_position() if self.show else self.read()
+            image, capture_time = self.read()
+            with self.frame_ready:
+                if self.frame is not None and self.frame[2] > self.taken:
+                    self.nbr_dropped += 1
+                self.nbr_frames += 1
+                self.frame = (image, capture_time, self.nbr_frames)
+                self.frame_ready.notify_all()
 
             if self.show:
-                copy_image = self.camera_image
+                copy_image = image.copy()
 
                 copy_image = cv2.putText(copy_image, 'Car', self.pos, cv2.FONT_HERSHEY_SIMPLEX, 0.8,
                     color=(0, 255, 0),
@@ -172,6 +488,72 @@ class ImageCapture(threading.Thread):
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
 
+    def process(self):
+        """
+        Boucle du thread de la pose, sur la derniere image lue.
+        """
+        number = 0
+        while True:
+            with self.frame_ready:
+                self.frame_ready.wait_for(lambda: self.frame is not None and self.frame[2] > number)
+                image, capture_time, number = self.frame
+                self.taken = number
+            position, alpha = self.locate(image, capture_time)
+            with self.pose_ready:
+                self.pose = (position, alpha, capture_time)
+                self.nbr_poses += 1
+                self.pose_ready.notify_all()
+
+    def get_position(self, timestamp=False, after=None, timeout=None):
+        """
+        |======================================|
+        | La derniere pose calculee, sans lire |
+        | la camera.                           |
+        |======================================|
+
+        * N'attend qu'avant la premiere pose, ou avec after.
+
+        Parameters
+        ----------
+        :param timestamp: True pour avoir aussi l'instant de capture de l'image (time.monotonic).
+        :type timestamp: bool
+        :param after: Attend une pose dont l'image est prise apres cet instant, None pour ne pas attendre.
+        :type after: float
+        :param timeout: Attente maximale en secondes, None pour attendre sans limite.
+        :type timeout: float
+
+        Returns
+        -------
+        :return: ((x, y), angle), ou (((x, y), angle), instant) avec timestamp.
+        :rtype: tuple
+        """
+        with self.pose_ready:
+            if not self.pose_ready.wait_for(lambda: self.pose is not None
+                    and (after is None or self.pose[2] > after), timeout):
+                raise TimeoutError("No new position from the camera.")
+            position, alpha, capture_time = self.pose
+        if timestamp:
+            return (position, alpha), capture_time
+        return position, alpha
+
+    def statistics(self):
+        """
+        |=====================================|
+        | Cadence de la camera et de la pose. |
+        |=====================================|
+
+        Returns
+        -------
+        :return: Images par seconde, poses par seconde, images lues, images perdues,
+            poses trouvees dans la fenetre de suivi et duree moyenne du traitement
+            des dernieres images en millisecondes.
+        :rtype: dict
+        """
+        duration = time.monotonic() - self.start_time
+        return {"fps": self.nbr_frames / duration, "pose_rate": self.nbr_poses / duration,
+                "frames": self.nbr_frames, "dropped": self.nbr_dropped, "tracked": self.tracker.nbr_tracked,
+                "process_ms": self.tracker.process_ms()}
+
     def orientation(self):
         """
         |================================|
@@ -188,16 +570,41 @@ class ImageCapture(threading.Thread):
         cv2.destroyAllWindows()
 
 
-# Starting video capture.
+# Video capture, started on first use so that the detectors can be imported without a camera.
 
-image_capture = ImageCapture()
-image_capture.start()
+image_capture = None
 
-def get_position():
-    return image_capture.get_position()
+def camera():
+    """
+    The started ImageCapture.
+    """
+    global image_capture
+    if image_capture is None:
+        image_capture = ImageCapture()
+        image_capture.start()
+    return image_capture
+
+def get_position(*args, **kwargs):
+    """
+    :seealso: ImageCapture.get_position
+    """
+    return camera().get_position(*args, **kwargs)
+
+_last_capture = [None] # Instant de l'image de la derniere pose donnee par next_position.
+
+def next_position(timeout=1.0, timestamp=False):
+    """
+    Attend une pose plus recente que celle du precedent appel.
+
+    :seealso: ImageCapture.get_position
+    """
+    pose, _last_capture[0] = camera().get_position(timestamp=True, after=_last_capture[0], timeout=timeout)
+    if timestamp:
+        return pose, _last_capture[0]
+    return pose
 
 def main():
-    image_capture.show = True
+    camera().show = True
     image_capture.join()
 
 if __name__ == '__main__':
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+"""
+|==========================================|
+| High rate pose estimate of the real car. |
+|==========================================|
+
+* Between two camera poses, the car is moved by simulation.State
+with the wheel commands actually sent.
+* A camera pose arrives late: it is compared to the estimate of the
+instant its image was taken, and the difference is spread on the
+current estimate (complementary filter).
+* The estimate can be asked at any rate, it never waits for the camera.
+"""
+
+import collections
+import math
+import threading
+import time
+
+import simulation
+
+
+def _angle(angle):
+    """
+    Angle ramene dans [-pi, pi[.
+    """
+    return (angle + math.pi) % (2*math.pi) - math.pi
+
+
+class Estimator:
+    """
+    |==========================================|
+    | Filtre complementaire entre le modele de |
+    | la voiture et les poses de la camera.    |
+    |==========================================|
+    """
+    def __init__(self, pixel_size, origin, gain=0.3, speed_gain=0.05, *, dt=1e-3,
+                 clock=time.monotonic, history=500):
+        """
+        Parameters
+        ----------
+        :param pixel_size: Taille d'un pixel de la camera dans les unites de la simulation.
+        :type pixel_size: float
+        :param origin: Le pixel de l'origine de la simulation.
+        :type origin: tuple
+        :param gain: Part de l'ecart a une pose de la camera corrigee sur la position
+            et l'angle, 1 pour croire la camera, 0 pour l'ignorer.
+        :type gain: float
+        :param speed_gain: Part de l'ecart corrigee sur les vitesses,
+            rapportee au temps depuis la pose precedente.
+        :type speed_gain: float
+        :param dt: Pas de temps du modele en secondes, celui de la simulation.
+        :type dt: float
+        :param clock: Horloge monotone des instants donnes, en secondes,
+            celle des instants de capture de detect.
+        :type clock: callable
+        :param history: Nombre d'estimations gardees pour recaler les poses en retard.
+        :type history: int
+        """
+        assert 0 <= gain <= 1, "'gain' must be between 0 and 1."
+        assert 0 <= speed_gain <= 1, "'speed_gain' must be between 0 and 1."
+        assert pixel_size > 0, "'pixel_size' must be positive."
+
+        self.gain = gain
+        self.speed_gain = speed_gain
+        self.pixel_size = pixel_size
+        self.origin = origin
+        self.dt = dt
+        self.clock = clock
+
+        self.state = None # simulation.State, None avant la premiere pose.
+        self.time = None # Instant de self.state.
+        self.commands = (0.0, 0.0, 0.0, 0.0) # Consignes appliquees depuis self.time.
+        self.history = collections.deque(maxlen=history) # (instant, x, y, theta)
+        self.last_pose = None # Instant de la derniere pose de la camera.
+        self.nbr_poses = 0
+        self.nbr_steps = 0 # Pas du modele.
+        self.lock = threading.Lock()
+
+    def _propagate(self, t):
+        """
+        Avance le modele jusqu'a l'instant t avec les consignes courantes.
+        """
+        nbr_steps = int((t - self.time) / self.dt)
+        state = self.state
+        for _ in range(nbr_steps):
+            state.update(*self.commands, dt=self.dt)
+        self.time += nbr_steps*self.dt
+        self.nbr_steps += nbr_steps
+        if nbr_steps:
+            self.history.append((self.time, state.x, state.y, state.theta))
+
+    def command(self, speeds, t=None):
+        """
+        |===================================|
+        | Les consignes envoyees aux roues, |
+        | appliquees a partir de t.         |
+        |===================================|
+
+        :param speeds: Les 4 consignes. :seealso: simulation.State.update
+        :type speeds: list
+        :param t: L'instant de l'envoi, None pour maintenant.
+        :type t: float
+        """
+        t = self.clock() if t is None else t
+        with self.lock:
+            if self.state is not None and t > self.time:
+                self._propagate(t)
+            self.commands = tuple(float(speed) for speed in speeds)
+
+    def correct(self, pose, t):
+        """
+        |========================================|
+        | Recale l'estimation sur une pose de la |
+        | camera dont l'image est prise a t.     |
+        |========================================|
+
+        * La premiere pose initialise l'estimation, voiture a l'arret.
+
+        :param pose: ((x, y), angle) en pixels. :seealso: detect.ImageCapture.get_position
+        :type pose: tuple
+        :param t: L'instant de capture de l'image.
+        :type t: float
+        """
+        (x, y), theta = self._to_model(pose)
+        with self.lock:
+            self.nbr_poses += 1
+            if self.state is None:
+                self.state = simulation.State(x=x, y=y, theta=theta)
+                self.time = t
+                self.history.append((t, x, y, theta))
+                self.last_pose = t
+                return
+            if t > self.time:
+                self._propagate(t)
+
+            # L'estimation a l'instant de l'image.
+            past = min(self.history, key=lambda entry: abs(entry[0] - t))
+            error_x, error_y = x - past[1], y - past[2]
+            error_theta = _angle(theta - past[3])
+
+            # Le recalage vaut aussi pour les estimations gardees depuis l'image,
+            # sinon la pose suivante compterait l'ecart une deuxieme fois.
+            shift_x, shift_y, shift_theta = self.gain*error_x, self.gain*error_y, self.gain*error_theta
+            self.history = collections.deque(
+                ((time_, x_ + shift_x, y_ + shift_y, theta_ + shift_theta) if time_ >= past[0] else (time_, x_, y_, theta_)
+                 for time_, x_, y_, theta_ in self.history), maxlen=self.history.maxlen)
+            state = self.state
+            state.x += shift_x
+            state.y += shift_y
+            state.theta += shift_theta
+            if self.last_pose is not None and t > self.last_pose: # Vitesses dans le repere de la voiture.
+                elapsed = t - self.last_pose
+                cos_theta, sin_theta = math.cos(state.theta), math.sin(state.theta)
+                state.vx += self.speed_gain*(error_x*cos_theta + error_y*sin_theta)/elapsed
+                state.vy += self.speed_gain*(-error_x*sin_theta + error_y*cos_theta)/elapsed
+                state.w += self.speed_gain*error_theta/elapsed
+            self.last_pose = max(self.last_pose, t)
+
+    def estimate(self, t=None):
+        """
+        |==========================================|
+        | La pose estimee a l'instant t, en pixels |
+        | comme celles de la camera.               |
+        |==========================================|
+
+        Returns
+        -------
+        :return: ((x, y), angle), None avant la premiere pose de la camera.
+        :rtype: tuple
+        """
+        t = self.clock() if t is None else t
+        with self.lock:
+            if self.state is None:
+                return None
+            if t > self.time:
+                self._propagate(t)
+            return self._to_pixels(self.state)
+
+    def _to_model(self, pose):
+        """
+        Pose de la camera dans les unites de la simulation.
+        """
+        (x, y), theta = pose
+        return ((x - self.origin[0])*self.pixel_size, (y - self.origin[1])*self.pixel_size), theta
+
+    def _to_pixels(self, state):
+        """
+        Pose de la simulation en pixels de la camera.
+        """
+        return ((state.x/self.pixel_size + self.origin[0], state.y/self.pixel_size + self.origin[1]),
+                _angle(state.theta))
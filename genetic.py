@@ -7,19 +7,56 @@
 """
 
 import inspect
-import random
-import time
-import csv
 import os
 
-import matplotlib.pyplot as plt
 import numpy as np
 
+def identity(x):
+    """
+    Fonction des biais par defaut, definie dans le module pour que les genes
+    restent picklables (processus lances par 'spawn').
+    """
+    return x
+
+def directory(type_simu, simulation_counter, nbr_individuals, mutation_factor, portion_duration, nbr_portions,
+              coord_arrivee=(0,1), accepted_radius=0.1):
+    """
+    |============================================|
+    | Repertoire des resultats d'une simulation, |
+    | sans creer la generation.                  |
+    |============================================|
+
+    * Les parametres sont ceux de Generation.__init__ , :seealso: Generation.directory
+
+    Returns
+    -------
+    :return: Le chemin, de la forme "simulation_data/Simu <simulation_counter> : <parametres>".
+    :rtype: str
+    """
+    arriveeX = coord_arrivee[0]*nbr_portions*4.0/20
+    arriveeY = coord_arrivee[1]*nbr_portions*4.0/20
+
+    if type_simu == 0:
+        repertoire = (f"simulation_data/Simu {simulation_counter} : "
+        f"type_simu=0, nbr_individuals={nbr_individuals}, "
+        f"mutation_factor={mutation_factor}, portion_duration={portion_duration}, "
+        f"nbr_portions={nbr_portions}, arrivee=({arriveeX},{arriveeY})")
+    else:
+        repertoire = (f"simulation_data/Simu {simulation_counter} : "
+        f"type_simu=1, nbr_individuals={nbr_individuals}, "
+        f"mutation_factor={mutation_factor}, portion_duration={portion_duration}, "
+        f"nbr_portions={nbr_portions}, accepted_radius={accepted_radius}, "
+        f"arrivee=({arriveeX},{arriveeY})")
+    return repertoire
+
 class Gene:
     """
     A gene is a sequence of moves.
     """
-    def __init__(self, portion_duration, nbr_portions, *, nbr_outputs=4, fct=lambda x: x):
+    __slots__ = ("portion_duration", "nbr_portions", "nbr_outputs", "fct",
+                 "nbr_parameters", "_bias", "_compiled", "weight")
+
+    def __init__(self, portion_duration, nbr_portions, *, nbr_outputs=4, fct=identity):
         """
         Parameters
         ----------
@@ -29,7 +66,7 @@ class Gene:
         :type nbr_sections: int
         :param nbr_outputs: Number of outputs.
         :type nbr_outputs: int
-        :param fct: Bias function.
+        :param fct: Bias function, it must be picklable for parallel.EvaluationPool.
         :type fct: callable
         """
         assert isinstance(portion_duration, (int, float)), \
@@ -63,23 +100,87 @@ class Gene:
             size=(self.nbr_portions, nbr_outputs, self.nbr_parameters))
         self.weight = 1.0 # La notoriete du gene.
 
+    @property
+    def bias(self):
+        """
+        Tensor of shape (nbr_portions, nbr_outputs, nbr_parameters).
+
+        * Assigning a new tensor invalidates the compiled schedule,
+        so the bias must not be modified in place.
+        * After a copy, the tensor is shared and becomes read only
+        (copy on write: Gene methods always assign a new tensor).
+        """
+        return self._bias
+
+    @bias.setter
+    def bias(self, bias):
+        self._bias = bias
+        self._compiled = None
+
+    def compile(self):
+        """
+        |====================================|
+        | Evaluates every portion only once. |
+        |====================================|
+
+        * The result is cached until the bias changes.
+
+        Returns
+        -------
+        :return: Read only table of the commands,
+            of shape (nbr_portions, nbr_outputs).
+        :rtype: np.ndarray
+        """
+        if self._compiled is None:
+            self._compiled = np.array(
+                [[self.fct(*self.bias[rang, s]) for s in range(self.nbr_outputs)]
+                for rang in range(self.nbr_portions)], dtype=float)
+            self._compiled.flags.writeable = False
+        return self._compiled
+
+    def schedule(self):
+        """
+        |==================================|
+        | Iterates over the gene portions. |
+        |==================================|
+
+        * The commands are constant during a whole portion.
+
+        Yields
+        ------
+        :return: The start instant, the end instant and the commands of each portion.
+        :rtype: (float, float, np.ndarray)
+        """
+        for rang, commands in enumerate(self.compile()):
+            yield rang*self.portion_duration, (rang+1)*self.portion_duration, commands
+
     def copy(self):
         """
         |================|
         | Copies a gene. |
         |================|
 
+        * The bias tensor is not duplicated but shared,
+        in read only, between both genes.
+
         Returns
         -------
         :return: New gene, a copy of the current one.
         :rtype: Gene
         """
-        def init(self, **kwargs):
-            """Initialization."""
-            for k, v in kwargs.items():
-                setattr(self, k, v)
+        self._bias.flags.writeable = False # Copie a l'ecriture.
+        return self._copy_slots()
 
-        return type(type(self).__name__, (type(self),), {"__init__": init})(**self.__dict__)
+    def _copy_slots(self):
+        """
+        Nouvel objet de la meme classe, avec les memes attributs.
+        """
+        new_gene = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(self, name):
+                    setattr(new_gene, name, getattr(self, name))
+        return new_gene
 
     def __add__(self, other):
         """
@@ -114,7 +215,7 @@ class Gene:
         """
         |=============================|
         | Assigns a weight to a gene. |
-        |    '0.2*gen1 + 0.8*gen2'    |
+        | '0.2*gen1 + 0.8*gen2'       |
         |=============================|
 
         Parameters
@@ -163,7 +264,7 @@ class Gene:
             raise ValueError("Entered instant does not belong to the definition interval.")
 
         rang = int(instant / self.portion_duration)
-        return [self.fct(*self.bias[rang, s]) for s in range(self.nbr_outputs)]
+        return self.compile()[rang].tolist()
 
     def mute(self, factor):
         """
@@ -190,7 +291,7 @@ class Gene:
 
         new_gene = self.copy()
         mutation_tensor = np.random.uniform(0, 1, size=new_gene.bias.shape) < factor
-        new_gene.bias += mutation_tensor * np.random.normal(0, 1, size=new_gene.bias.shape)
+        new_gene.bias = new_gene.bias + mutation_tensor * np.random.normal(0, 1, size=new_gene.bias.shape)
         new_gene.bias = np.where( 1<new_gene.bias, 1, new_gene.bias)
         new_gene.bias = np.where( 0>new_gene.bias, 0, new_gene.bias)
         # new_gene.bias = np.where(max(0, min(1, new_gene.bias)))
@@ -200,72 +301,205 @@ class Individual(Gene):
     """
     An individual is a behavior of the population,
     which is a sequence of nbr_portions moves of nbr_outputs wheels.
+
+    * Inside a Generation, an individual is only a view: its bias and
+    its score are a row of Generation.biases and a cell of Generation.scores.
     """
+    __slots__ = ("_generation", "_index", "_score",
+                 "arriveeX", "arriveeY", "position", "orientation")
+
     def __init__(self, *args, **kwargs):
+        self._generation, self._index = None, None # Individu autonome.
         Gene.__init__(self, *args, **kwargs)
         self.score = None # Resultat donne par le traitement d'image.
         # self.orientation = 0
         # self.position = None # Mettre le centre de l'image
         # self.arriveeX, self.arriveeY = coord_arrivee
 
-    def move_car(self):
+    @classmethod
+    def view(cls, generation, index):
+        """
+        |=============================================|
+        | Individual backed by a row of a generation. |
+        |=============================================|
+
+        Parameters
+        ----------
+        :param generation: The population that owns the data.
+        :type generation: Generation
+        :param index: Row of the individual in generation.biases.
+        :type index: int
+
+        Returns
+        -------
+        :return: An individual that reads and writes generation.biases[index]
+            and generation.scores[index].
+        :rtype: Individual
+        """
+        ind = generation.template._copy_slots()
+        ind._generation, ind._index = generation, index
+        ind._bias, ind._compiled = generation.biases[index], None
+        return ind
+
+    @Gene.bias.setter
+    def bias(self, bias):
+        if self._generation is None:
+            Gene.bias.fset(self, bias)
+        else: # On ecrit dans le tenseur de la population.
+            self._generation.biases[self._index] = bias
+            self._compiled = None
+
+    @property
+    def score(self):
+        """
+        Resultat de la derniere evaluation, None si l'individu n'a pas ete teste.
+        """
+        if self._generation is None:
+            return self._score
+        score = self._generation.scores[self._index]
+        return None if np.isnan(score) else float(score)
+
+    @score.setter
+    def score(self, score):
+        if self._generation is None:
+            self._score = score
+        else:
+            self._generation.scores[self._index] = np.nan if score is None else score
+
+    def copy(self):
+        """
+        |=======================|
+        | Copies an individual. |
+        |=======================|
+
+        * The copy of a view is an independent individual.
+
+        :seealso: Gene.copy
+        """
+        if self._generation is None:
+            return Gene.copy(self)
+        new_ind = self._copy_slots()
+        new_ind._generation, new_ind._index = None, None
+        new_ind.bias = self.bias.copy()
+        new_ind.score = self.score
+        return new_ind
+
+    def move_car(self, rate=50, stats=None, estimator=None):
         """
         Operates the car.
 
+        * Les consignes sont appliquees a frequence fixe, :seealso: control.ControlLoop
+
+        Parameters
+        ----------
+        :param rate: Frequence de la boucle de controle, en Hz.
+        :type rate: float
+        :param stats: Liste ou ajouter les statistiques de la boucle, None pour les oublier.
+        :type stats: list
+        :param estimator: Estimation de la pose a chaque tour de boucle, un nouveau a chaque
+            mouvement, None pour les seules poses de la camera. :seealso: estimator.Estimator
+        :type estimator: estimator.Estimator
+
         Returns
         -------
         :return: les liste des points x, y qui representent les positions de la voiture.
         :rtype: (list, list)
         """
-        import interface
+        import control
         self.reset_position()
-        print("move car during %f s..." % self.portion_duration*self.nbr_portions)
-
-        X, Y = [], []
-        t_debut = time.time()
-        while time.time() - t_debut < self.portion_duration*self.nbr_portions:
-            current_time = time.time() - t_debut
-            # On fait bouger les 4 roues.
-            for numero_roue, speed in enumerate(self(current_time)):
-                print(numero_roue)
-                interface.move_wheel(numero_roue+1, speed)
-
-            # Recuperation de la position reele
-            (x, y), _ = interface.get_position()
-            X.append(x)
-            Y.append(y)
+        print("move car during %f s..." % (self.portion_duration*self.nbr_portions))
 
-        interface.move_wheel("", 0) # La voiture s'arette a la fin.
-        print("\tterminate")
-        return x, y
+        X, Y, loop_stats = control.ControlLoop(rate, estimator=estimator).run(self, self.portion_duration*self.nbr_portions)
+        if stats is not None:
+            stats.append(loop_stats)
+        print("\tterminate:", loop_stats)
+        return X, Y
 
-    def move_simulation(self):
+    def move_simulation(self, solver=None, recording=None):
         """
         Operates the simulation of the car.
 
+        * The score depends on the final state only, whatever is recorded.
+
+        Parameters
+        ----------
+        :param solver: Integrateur a pas adaptatif, None pour le pas fixe de 1 ms.
+            Ses compteurs de pas sont mis a jour.
+        :type solver: simulation.DormandPrince
+        :param recording: Les pas enregistres, les memes quel que soit l'integrateur.
+            None pour simulation.Recording(), un etat par seconde.
+        :type recording: simulation.Recording
+
         Returns
         -------
-        :return: les liste des points x, y qui representent les positions de la voiture.
-        :rtype: (list, list)
+        :return: Les etats enregistres de la voiture, dans un tableau alloue une fois pour toute.
+        :rtype: simulation.Trajectory
         """
         import simulation
 
+        recording = simulation.Recording() if recording is None else recording
         dt = 1e-3 # Pas de temps en seconde.
-        x, y = [], []
+        recorded = recording.steps(self.nbr_portions*round(self.portion_duration / dt))
+        states = np.empty((len(recorded), 6))
         state = simulation.State() # On positione la voiture a l'origine
-        for i, t in enumerate(np.arange(0, self.portion_duration*self.nbr_portions, dt)):
-            state.update(*self(t), dt=dt)
-            if not i % 1000:
-                x.append(state.x)
-                y.append(state.y)
+        if solver is None:
+            following = recorded.tolist() + [-1] # Le -1 n'est jamais atteint.
+            i, j = 0, 0
+            for start, end, commands in self.schedule(): # Consignes constantes sur chaque portion.
+                commands = commands.tolist()
+                for _ in range(round((end - start) / dt)):
+                    state.update(*commands, dt=dt)
+                    if i == following[j]:
+                        states[j] = state.vx, state.vy, state.w, state.x, state.y, state.theta
+                        j += 1
+                    i += 1
+        else:
+            # Memes instants d'echantillonage que le pas fixe, apres les pas enregistres.
+            instants = (recorded + 1)*dt
+            j = 0
+            for start, end, commands in self.schedule(): # Chaque portion est un evenement.
+                commands = commands.tolist()
+                t = start
+                for instant in instants[(start <= instants) & (instants < end)]:
+                    solver.advance(state, commands, instant - t)
+                    states[j] = state.vx, state.vy, state.w, state.x, state.y, state.theta
+                    j += 1
+                    t = instant
+                solver.advance(state, commands, end - t)
+            if j < len(states): # Le dernier pas, a la fin de la derniere portion.
+                states[j] = state.vx, state.vy, state.w, state.x, state.y, state.theta
+
+        self.score = self.fitness(state.x, state.y)
+
+        return simulation.Trajectory((recorded + 1)*dt, states)
+
+    def fitness(self, x, y):
+        """
+        |=========================================|
+        | Score of a car stopped at point (x, y). |
+        |=========================================|
+
+        Parameters
+        ----------
+        :param x: Abscisse de la voiture, nombre ou np.ndarray.
+        :param y: Ordonnee de la voiture, nombre ou np.ndarray.
 
-        # self.score = x[-1]**2 + y[-1]**2 # Bidon et mal fait, c'est juste pour le test.
-        # self.score = y[-1]-abs(x[-1])
-        # self.score = 1 / ( (self.arriveeX*self.nbr_portions/10.0-x[-1])**2 + (self.arriveeY*self.nbr_portions/10.0-y[-1])**2 ) # Tout droit jusqu'au point choisi
-        self.score = 1 / ( (self.arriveeX*self.nbr_portions*4.0/20-x[-1])**2 +
-                    (self.arriveeY*self.nbr_portions*4.0/20-y[-1])**2 ) # Le point choisi dépend du point standard (0.1) et de nbr_portions
+        Returns
+        -------
+        :return: Inverse du carre de la distance a l'arrivee.
+        :rtype: float or np.ndarray
+        """
+        # return x**2 + y**2 # Bidon et mal fait, c'est juste pour le test.
+        # return y-abs(x)
+        # return 1 / ( (self.arriveeX*self.nbr_portions/10.0-x)**2 + (self.arriveeY*self.nbr_portions/10.0-y)**2 ) # Tout droit jusqu'au point choisi
+        target_x, target_y = self.target()
+        return 1 / ( (target_x-x)**2 + (target_y-y)**2 )
 
-        return x, y
+    def target(self):
+        """
+        Point vise par la voiture, il depend du point standard (0.1) et de nbr_portions.
+        """
+        return self.arriveeX*self.nbr_portions*4.0/20, self.arriveeY*self.nbr_portions*4.0/20
 
     def reset_position(self):
         """
@@ -284,7 +518,7 @@ class Individual(Gene):
         eps_pos = 50 # Tolerance sur le carre centre autour du point d'arrive (en pxl).
         x0, y0 = 320, 230 # Point a atteindre.(en pxl)
 
-        self.position, self.orientation = interface.get_position()
+        self.position, self.orientation = interface.next_position()
 
         # Calcul de l'angle entre barycentre de la voiture et point de depart.
         def get_alpha():
@@ -310,14 +544,14 @@ class Individual(Gene):
             fact_bis *= 1.01
             # interface.move_wheel("l", -0.4)
             # interface.move_wheel("r", 0.4)
-            interface.move_wheel("l", -fact_bis*control_angle(np.pi + get_alpha() - self.orientation)/np.pi)
-            interface.move_wheel("r",  fact_bis*control_angle(np.pi + get_alpha() - self.orientation)/np.pi)
-            self.position, self.orientation = interface.get_position()
+            turn = fact_bis*control_angle(np.pi + get_alpha() - self.orientation)/np.pi
+            interface.set_wheels(turn, -turn, turn, -turn) # Roues droites (1, 3) et gauches (2, 4).
+            self.position, self.orientation = interface.next_position()
             print("Orientation: ", control_angle(np.pi - get_alpha() + self.orientation),
                  "position actuelle: ", self.position, self.orientation)
             # print("fact speed : ", fact_bis)
         # As long as we are not at the center, the car goes straight
-        interface.move_wheel("", 0)
+        interface.set_wheels(0, 0, 0, 0)
 
         input("suite")
 
@@ -325,20 +559,21 @@ class Individual(Gene):
         while abs(x0 - self.position[0]) > eps_pos or abs(y0 - self.position[1]) > eps_pos:
             # print(abs(x0 - self.position[0]), abs(y0 - self.position[1]))
             print("Avancer vers la cible - distance", 0.5*(np.sqrt((self.position[1] - y0)**2 + (self.position[0] - x0)**2) / norm))
-            interface.move_wheel("", (0.5*(np.sqrt((self.position[1] - y0)**2 + (self.position[0] - x0)**2) / norm)))
-            self.position, self.orientation = interface.get_position()
+            speed = 0.5*(np.sqrt((self.position[1] - y0)**2 + (self.position[0] - x0)**2) / norm)
+            interface.set_wheels(speed, speed, speed, speed)
+            self.position, self.orientation = interface.next_position()
             print("Avancer vers la cible - position : ", self.position, self.orientation)
 
         # As long as the the car is not facing the chosen direction, it rotates on itself
-        interface.move_wheel("", 0)
+        interface.set_wheels(0, 0, 0, 0)
         print("\torientation finale")
         while abs(np.pi/2 - self.orientation) > eps_angle:
             print("Orientation finale - Angle : ", abs(np.pi/2 - self.orientation))
-            interface.move_wheel("l", -fact_speed*(0.5+0.5*(abs(abs(self.orientation)-np.pi/2))/np.pi))
-            interface.move_wheel("r", fact_speed*(0.5+0.5*(abs(abs(self.orientation)-np.pi/2))/np.pi))
-            self.position, self.orientation = interface.get_position()
+            turn = fact_speed*(0.5+0.5*(abs(abs(self.orientation)-np.pi/2))/np.pi)
+            interface.set_wheels(turn, -turn, turn, -turn)
+            self.position, self.orientation = interface.next_position()
 
-        interface.move_wheel("", 0)
+        interface.set_wheels(0, 0, 0, 0)
         print("\tterminated")
 
     def __lt__(self, other):
@@ -398,7 +633,7 @@ class Generation:
     | Represente un paquet d'individu. |
     |==================================|
     """
-    def __init__(self, nbr_individuals, mutation_factor, coord_arrivee=(0,1), accepted_radius=0.1, *args, **kwargs):
+    def __init__(self, nbr_individuals, mutation_factor, coord_arrivee=(0,1), accepted_radius=0.1, *args, cache_size=10000, boundary_cache_bytes=64 << 20, recording=None, early_stopping=(), unreachable_rank=1, selection="roulette", nbr_elites=0, **kwargs):
         """
         Parameters
         ----------
@@ -407,6 +642,32 @@ class Generation:
         :param mutation_factor: Facteur de mutation entre 0 et 1.
         :type mutation_factor: float
         :param accepted_raidus : float: rayon de tolérance autour de l'arrivée
+        :param cache_size: Nombre d'individus dont le resultat est garde
+            pour ne pas les simuler a nouveau, 0 pour ne rien garder.
+        :param boundary_cache_bytes: Taille en octets des etats au debut d'une portion gardes
+            pour reprendre la simulation des enfants a leur premiere portion modifiee,
+            0 pour toujours partir de l'origine. :seealso: cache.BoundaryCache
+        :param recording: Les pas enregistres de chaque simulation,
+            None pour simulation.Recording(), un etat par seconde.
+        :type recording: simulation.Recording
+        :param early_stopping: Arrets anticipes des simulations au pas fixe, parmi
+            'target' quand la voiture est a moins de accepted_radius de l'arrivee
+            (le score est celui de cet instant) et 'unreachable' quand elle ne peut
+            plus depasser le unreachable_rank-ieme score de la generation precedente.
+            Le score d'une voiture arretee par 'unreachable' est faux mais reste sous
+            celui des nbr_elites individus gardes: 'unreachable' demande une selection
+            de selection.TOP_ONLY et 1 <= nbr_elites <= unreachable_rank, les nbr_elites meilleurs
+            scores sont alors ceux de la simulation complete.
+            Vide pour simuler chaque individu jusqu'au bout.
+        :type early_stopping: tuple
+        :param unreachable_rank: Rang du score a battre pour 'unreachable'.
+        :type unreachable_rank: int
+        :param selection: Tirage des parents, parmi selection.METHODS.
+            'truncation' les tire parmi les nbr_elites meilleurs.
+        :type selection: str
+        :param nbr_elites: Nombre des meilleurs individus gardes tels quels a chaque
+            generation, sans etre simules a nouveau.
+        :type nbr_elites: int
         :arg args: Same as Individual.__init__ .
         :key kwargs: Same as Individual.__init__ .
         """
@@ -420,177 +681,650 @@ class Generation:
             "de 2 elements au moins."
         assert 0 <= mutation_factor <= 1, "Le facteur de mutation " \
             "doit etre exprime entre 0 et 1."
+        assert set(early_stopping) <= {"target", "unreachable"}, \
+            "'early_stopping' must only contain 'target' and 'unreachable'."
+        assert 1 <= unreachable_rank <= nbr_individuals, \
+            "'unreachable_rank' must be a rank of the population."
+        import selection as selection_
+        assert selection in selection_.METHODS, \
+            "'selection' must be one of %s." % ", ".join(selection_.METHODS)
+        assert 0 <= nbr_elites < nbr_individuals, "'nbr_elites' must leave room for children."
+        assert selection not in selection_.TOP_ONLY or nbr_elites >= 1, \
+            "'%s' draws the parents among the nbr_elites best, there must be at least 1." % selection
+        assert "unreachable" not in early_stopping \
+            or (selection in selection_.TOP_ONLY and nbr_elites <= unreachable_rank), \
+            "'unreachable' gives wrong scores to the pruned cars, it needs a selection " \
+            "among the best (%s) and nbr_elites <= unreachable_rank." % ", ".join(selection_.TOP_ONLY)
 
         self.nbr_individuals = nbr_individuals
         self.mutation_factor = mutation_factor
         self.accepted_radius = accepted_radius
-        self.individuals = [Individual(*args, **kwargs)
-            for _ in range(self.nbr_individuals)]
 
-    def create_file(self, type_simu=0, simulation_counter=0):
+        # Les parametres communs a tous les individus.
+        self.template = Individual(*args, **kwargs)
+        self.template.arriveeX, self.template.arriveeY = coord_arrivee
+
+        # Toute la population dans un seul tenseur, et un score par individu.
+        self.scores = np.full(self.nbr_individuals, np.nan)
+        self.biases = np.random.uniform(-1, 1,
+            size=(self.nbr_individuals,) + self.template.bias.shape)
+
+        import simulation
+        self.recording = simulation.Recording() if recording is None else recording
+        self.samples = None # Les etats enregistres de la derniere generation simulee.
+
+        # Arrets anticipes.
+        self.early_stopping = tuple(early_stopping)
+        self.unreachable_rank = unreachable_rank
+        self.unreachable_score = None # Le score a battre, celui de la generation precedente.
+        self.stop_reasons = None # Pourquoi chaque simulation de la derniere generation s'est arretee.
+
+        # Reproduction.
+        self.selection = selection
+        self.nbr_elites = nbr_elites
+        self.nbr_kept = 0 # Individus en tete de la population deja simules, :seealso: reproduce
+
+        self.nbr_evaluations = 0 # Individus simules ou testes, hors caches.
+        self.control_stats = None # Les control.ControlStats des voitures de la derniere generation testee.
+        self.stop_reason = None # Le critere qui a arrete la derniere evolution.
+        self._restored = None # Le point de reprise que simulation doit continuer, :seealso: resume
+
+        import cache
+        self.fitness_cache = cache.FitnessCache(cache_size) if cache_size else None
+        self.boundary_cache = cache.BoundaryCache(boundary_cache_bytes) if boundary_cache_bytes else None
+
+    def _bind(self):
+        """
+        Recree les vues des individus sur self.biases et self.scores.
+        """
+        self._individuals = [Individual.view(self, i) for i in range(self.nbr_individuals)]
+
+    @property
+    def biases(self):
+        """
+        Les genomes de tous les individus, de forme (nbr_individuals,) + template.bias.shape.
+
+        * Les individus lisent leurs lignes et gardent leurs consignes compilees:
+        le tenseur se remplace en entier ou s'ecrit avec set_biases, pas en place.
+        """
+        return self._biases
+
+    @biases.setter
+    def biases(self, biases):
+        self._biases = biases
+        self._bind()
+
+    def set_biases(self, rows, biases):
+        """
+        |==============================================|
+        | Ecrit les genomes de certains individus dans |
+        | le tenseur de la population.                 |
+        |==============================================|
+
+        Parameters
+        ----------
+        :param rows: Les numeros des individus, ou tout ce qui indexe self.biases.
+        :type rows: list
+        :param biases: Les nouveaux genomes.
+        :type biases: np.ndarray
+        """
+        self._biases[rows] = biases
+        for i in np.arange(self.nbr_individuals)[rows].ravel():
+            self._individuals[i]._compiled = None # Les consignes de l'ancien genome.
+
+    @property
+    def individuals(self):
+        """
+        Les individus, des vues sur les lignes de self.biases et self.scores.
+        """
+        return self._individuals
+
+    @individuals.setter
+    def individuals(self, individuals):
+        assert len(individuals) == self.nbr_individuals, \
+            "There must be %d individuals." % self.nbr_individuals
+        self.biases = np.array([ind.bias for ind in individuals], dtype=float)
+        self.scores = np.array([np.nan if ind.score is None else ind.score
+            for ind in individuals], dtype=float)
+        self.nbr_kept = 0
+
+    def reproduce(self):
+        """
+        |=============================================|
+        | Cree la generation suivante d'un seul coup. |
+        |=============================================|
+
+        * Les self.nbr_elites meilleurs individus passent en tete de la
+        generation suivante avec leur score et leurs etats enregistres.
+        * Chaque autre enfant est la moyenne de deux parents tires au hasard
+        selon self.selection, puis subit des mutations.
+        * Les operations portent sur tout le tenseur self.biases.
+        """
+        import selection
+
+        # Selection des parents, de forme (nbr_children, 2), en un seul tirage.
+        nbr_children = self.nbr_individuals - self.nbr_elites
+        options = {"size": self.nbr_elites} if self.selection in selection.TOP_ONLY else {}
+        parents = selection.METHODS[self.selection](self.scores, 2*nbr_children, **options)
+        parents = parents.reshape(nbr_children, 2)
+
+        # Melange des deux parents.
+        biases = self.biases[parents].mean(axis=1)
+
+        # Mutations.
+        mutation_tensor = np.random.uniform(0, 1, size=biases.shape) < self.mutation_factor
+        biases += mutation_tensor * np.random.normal(0, 1, size=biases.shape)
+        np.clip(biases, 0, 1, out=biases)
+
+        # Elitisme, les resultats sont gardes.
+        best = selection.elites(self.scores, self.nbr_elites)
+        self.biases = np.concatenate((self.biases[best], biases))
+        self.scores = np.concatenate((self.scores[best], np.full(nbr_children, np.nan)))
+        if self.samples is not None:
+            self.samples = self.samples[best]
+            self.stop_reasons = [self.stop_reasons[i] for i in best]
+            self.nbr_kept = len(best)
+
+    def move_simulation(self, solver=None, pool=None):
+        """
+        |===============================================|
+        | Simule tous les individus en une seule passe. |
+        |===============================================|
+
+        * Meme resultat que Individual.move_simulation sur chaque individu,
+        mais toutes les voitures avancent ensemble dans un simulation.BatchState.
+        * Avec un integrateur a pas adaptatif, les individus sont simules l'un apres l'autre.
+        * Les genomes deja simules avec les memes reglages sont pris dans self.fitness_cache.
+        * L'elite gardee par reproduce n'est pas simulee a nouveau.
+        * Les etats enregistres selon self.recording sont ranges dans self.samples,
+        de forme (nbr_individuals, nbr_samples, 6), :seealso: simulation.FIELDS
+        * Avec self.early_stopping, la raison de l'arret de chaque simulation
+        est dans self.stop_reasons.
+
+        Parameters
+        ----------
+        :param solver: Integrateur a pas adaptatif, None pour le pas fixe.
+        :type solver: simulation.DormandPrince
+        :param pool: Processus qui se partagent la simulation, None pour tout faire ici.
+        :type pool: parallel.EvaluationPool
+
+        Returns
+        -------
+        :return: Pour chaque individu, les listes des points x, y de sa trajectoire.
+        :rtype: list
+        """
+        assert solver is None or not self.early_stopping, \
+            "Early stopping is only implemented for the fixed step."
+
+        nbr_steps = self.template.nbr_portions*round(self.template.portion_duration / 1e-3)
+        shape = (self.nbr_individuals, len(self.recording.steps(nbr_steps)), 6)
+        kept = self.nbr_kept if self.samples is not None and self.samples.shape[1:] == shape[1:] else 0
+        samples, self.samples = self.samples, np.empty(shape)
+        if kept: # L'elite gardee par reproduce.
+            self.samples[:kept] = samples[:kept]
+        self.stop_reasons = (self.stop_reasons or [])[:kept] + ["complete"]*(self.nbr_individuals - kept)
+        self.nbr_kept = 0
+        rows = list(range(kept, self.nbr_individuals)) # Les individus a simuler.
+        if self.fitness_cache is not None:
+            hasher = self.fitness_cache.hasher(
+                self.template.portion_duration, self.template.arriveeX, self.template.arriveeY,
+                None if solver is None else (solver.rtol, solver.atol, solver.first_step, solver.max_step),
+                self.recording, "target" in self.early_stopping and self.accepted_radius)
+            pending = {} # Les individus qui attendent la simulation d'un genome.
+            for i in rows:
+                key = self.fitness_cache.key(hasher, self.biases[i])
+                if key in pending: # Un frere identique est deja en attente.
+                    pending[key].append(i)
+                    self.fitness_cache.hits += 1
+                    continue
+                cached = self.fitness_cache.get(key)
+                if cached is None:
+                    pending[key] = [i]
+                else:
+                    self.scores[i], self.samples[i], self.stop_reasons[i] = cached
+            rows = [indices[0] for indices in pending.values()]
+
+        if rows:
+            self.nbr_evaluations += len(rows)
+            scores, samples, reasons = self._simulate(rows, solver, pool)
+            self.scores[rows] = scores
+            self.samples[rows] = samples
+            for i, reason in zip(rows, reasons):
+                self.stop_reasons[i] = reason
+            if self.fitness_cache is not None:
+                for (key, indices), score, samples_ind, reason in zip(pending.items(), scores, samples, reasons):
+                    if reason != "unreachable": # Ce score depend de l'elite du moment.
+                        self.fitness_cache.put(key, score, samples_ind.copy(), reason)
+                    self.scores[indices[1:]] = score
+                    self.samples[indices[1:]] = samples_ind
+                    for i in indices[1:]:
+                        self.stop_reasons[i] = reason
+
+        if "unreachable" in self.early_stopping:
+            self.unreachable_score = np.partition(self.scores, -self.unreachable_rank)[-self.unreachable_rank]
+        if self.fitness_cache is not None:
+            self.fitness_cache.new_generation()
+        if self.boundary_cache is not None:
+            self.boundary_cache.new_generation()
+        return [(samples_ind[:, 3].tolist(), samples_ind[:, 4].tolist()) for samples_ind in self.samples]
+
+    def _stops(self):
+        """
+        |===========================================|
+        | Conditions d'arret anticipe des voitures. |
+        |===========================================|
+
+        Returns
+        -------
+        :return: Les conditions, :seealso: simulation.simulate_batch
+        :rtype: tuple
+        """
+        import simulation
+
+        stops = []
+        target = self.template.target()
+        if "target" in self.early_stopping:
+            stops.append(simulation.TargetReached(target, self.accepted_radius))
+        if "unreachable" in self.early_stopping and self.unreachable_score is not None:
+            stops.append(simulation.Unreachable(target, 1/np.sqrt(self.unreachable_score)))
+        return tuple(stops)
+
+    def _simulate(self, rows, solver=None, pool=None):
+        """
+        |=========================================|
+        | Simule les individus de numeros donnes. |
+        |=========================================|
+
+        * Au pas fixe, un individu dont les premieres portions sont dans
+        self.boundary_cache repart de l'etat de la voiture a la premiere
+        portion inconnue, les etats qu'il atteint y sont ajoutes.
+
+        Returns
+        -------
+        :return: Les scores, les echantillons de forme (len(rows), nbr_samples, 6)
+            et pour chaque individu la raison de l'arret de sa simulation:
+            'complete' ou le nom de la condition d'arret.
+        :rtype: (np.ndarray, np.ndarray, list)
+        """
+        import simulation
+
+        if solver is not None:
+            if pool is not None:
+                scores, samples, _, _ = pool.evaluate(self.biases[rows], solver, recording=self.recording)
+                return scores, samples, ["complete"]*len(rows)
+            samples = np.array([self.individuals[i].move_simulation(solver, self.recording).states
+                                for i in rows])
+            return self.scores[rows], samples, ["complete"]*len(rows)
+
+        # Reprise au debut de la plus longue suite de portions deja simulee.
+        first_portions = np.zeros(len(rows), dtype=int)
+        initial = np.zeros((6, len(rows)))
+        prefixes = {}
+        if self.boundary_cache is not None:
+            hasher = self.boundary_cache.hasher(self.template.portion_duration, self.recording)
+            keys = [self.boundary_cache.keys(hasher, self.biases[i]) for i in rows]
+            for j, keys_ind in enumerate(keys):
+                first_portions[j], entry = self.boundary_cache.get(keys_ind)
+                if entry is not None:
+                    initial[:, j], prefixes[j] = entry
+
+        stops = self._stops()
+        if pool is not None:
+            _, samples, bounds, stopped = pool.evaluate(self.biases[rows], recording=self.recording,
+                first_portions=first_portions, initial=initial, stops=stops)
+        else:
+            samples, bounds, stopped = simulation.simulate_batch(
+                np.array([self.individuals[i].compile() for i in rows]), self.template.portion_duration,
+                recording=self.recording, first_portions=first_portions, initial=initial, stops=stops)
+
+        if self.boundary_cache is not None:
+            steps = round(self.template.portion_duration / 1e-3) # Le pas de simulate_batch.
+            recorded = self.recording.steps(self.template.nbr_portions*steps)
+            for j, prefix in prefixes.items():
+                samples[j, :len(prefix)] = prefix
+            self.boundary_cache.saved_steps += int(first_portions.sum())*steps
+            for j, keys_ind in enumerate(keys):
+                for portion in range(first_portions[j] + 1, self.template.nbr_portions):
+                    if np.isnan(bounds[portion, 0, j]): # La voiture s'est arretee avant.
+                        break
+                    nbr_samples = np.searchsorted(recorded, portion*steps)
+                    self.boundary_cache.put(keys_ind[portion-1], bounds[portion, :, j].copy(),
+                                            samples[j, :nbr_samples].copy())
+        reasons = [stops[number].name if number >= 0 else "complete" for number in stopped.tolist()]
+        return self.template.fitness(bounds[-1, 3], bounds[-1, 4]), samples, reasons
+
+    def directory(self, type_simu=0, simulation_counter=0):
+        """
+        |============================================|
+        | Repertoire des resultats d'une simulation. |
+        |============================================|
+
+        Returns
+        -------
+        :return: Le chemin, de la forme "simulation_data/Simu <simulation_counter> : <parametres>".
+        :rtype: str
+        """
+        return directory(type_simu, simulation_counter, self.nbr_individuals, self.mutation_factor,
+                         self.template.portion_duration, self.template.nbr_portions,
+                         (self.template.arriveeX, self.template.arriveeY), self.accepted_radius)
+
+    def create_file(self, type_simu=0, simulation_counter=0, size=None, **kwargs):
         """
         |===================================|
         | Cree et initialise le fichier csv |
         | qui enregistrera les resultats.   |
         |===================================|
-        """
-        portion_duration = self.individuals[0].portion_duration
-        nbr_portions = self.individuals[0].nbr_portions
-        arriveeX = self.individuals[0].arriveeX*nbr_portions*4.0/20
-        arriveeY = self.individuals[0].arriveeY*nbr_portions*4.0/20
 
-        if type_simu == 0:
-            repertoire = (f"simulation_data/Simu {simulation_counter} : "
-            f"type_simu=0, nbr_individuals={self.nbr_individuals}, "
-            f"mutation_factor={self.mutation_factor}, portion_duration={portion_duration}, "
-            f"nbr_portions={nbr_portions}, arrivee=({arriveeX},{arriveeY})")
-        else:
-            repertoire = (f"simulation_data/Simu {simulation_counter} : "
-            f"type_simu=1, nbr_individuals={self.nbr_individuals}, "
-            f"mutation_factor={self.mutation_factor}, portion_duration={portion_duration}, "
-            f"nbr_portions={nbr_portions}, accepted_radius={self.accepted_radius}, "
-            f"arrivee=({arriveeX},{arriveeY})")
+        Parameters
+        ----------
+        :param size: Pour continuer une evolution, la taille du fichier existant
+            a garder, sans nouvel entete. None pour ajouter un entete.
+        :key kwargs: Seuils d'ecriture, :seealso: results.ResultsWriter
+
+        Returns
+        -------
+        :return: L'ecrivain du fichier, il reste ouvert jusqu'a son close.
+        :rtype: results.ResultsWriter
+        """
+        import results
 
+        repertoire = self.directory(type_simu, simulation_counter)
         fname = "data_simu.csv"
-         
-        try: 
-            os.makedirs(repertoire)
-        except OSError:
-            if not os.path.isdir(repertoire):
-                Raise
-
-        with open(repertoire+"/"+fname, "a") as file:
-            list_col = ["Génération", 'Individu', 'Score']
-            for portion in range(self.individuals[0].nbr_portions):
-                for roue in range(4):
-                    list_col.append('Gene_' + str(portion) + 'roue_' + str(roue))
-            if type_simu == 1:
-                list_col.append('individuals_under_threshold')
-            writer = csv.writer(file)
-            writer.writerow(list_col)
 
-        return repertoire
+        os.makedirs(repertoire, exist_ok=True)
+        if size is not None: # Les lignes ecrites apres le point de reprise sont effacees.
+            with open(os.path.join(repertoire, fname), "r+") as file:
+                file.truncate(size)
+            return results.ResultsWriter(os.path.join(repertoire, fname), None, **kwargs)
+
+        list_col = ["Génération", 'Individu', 'Score']
+        for portion in range(self.template.nbr_portions):
+            for roue in range(self.template.nbr_outputs):
+                list_col.append('Gene_' + str(portion) + 'roue_' + str(roue))
+        if type_simu == 1:
+            list_col.append('individuals_under_threshold')
+        return results.ResultsWriter(os.path.join(repertoire, fname), list_col, **kwargs)
+
+    def commands(self):
+        """
+        |==========================================|
+        | Consignes de tous les individus, a plat. |
+        |==========================================|
+
+        * La fonction des genes est appliquee a tout self.biases d'un coup
+        quand elle accepte des tableaux, sinon individu par individu.
 
-    def save_score(self, gen_number, ind_number, type_simu, repertoire="", individuals_under_threshold=0):
+        Returns
+        -------
+        :return: Tableau de forme (nbr_individuals, nbr_portions, nbr_outputs).
+        :rtype: np.ndarray
+        """
+        shape = self.biases.shape[:-1]
+        try:
+            commands = np.broadcast_to(self.template.fct(*np.moveaxis(self.biases, -1, 0)), shape)
+        except (TypeError, ValueError): # Fonction scalaire, math.sin par exemple.
+            commands = np.array([ind.compile() for ind in self.individuals])
+        return np.asarray(commands, dtype=float)
+
+    def save_score(self, gen_number, writer, individuals_under_threshold=None):
+        """
+        |==================================|
+        | Ajoute les lignes de generation. |
+        |==================================|
+
+        :param gen_number: Le numero de la generation.
+        :param writer: L'ecrivain donne par create_file.
+        :param individuals_under_threshold: Ajoute a la ligne du dernier individu
+            quand type_simu vaut 1, None sinon.
         """
-        |===================|
-        | Ajoute une ligne. |
-        |===================|
+        scores = np.where(np.isnan(self.scores), None, self.scores) # None comme Individual.score.
+        writer.write_generation(gen_number, scores, self.commands(), individuals_under_threshold)
 
-        :param gen_number: Le numero de la generation de la ligne qui va etre completee.
-        :param ind_number: Le numero de l'individu de la generation de la ligne.
+    def create_store(self, type_simu=0, simulation_counter=0, **kwargs):
         """
-        fname = "data_simu.csv"
-        with open(repertoire+"/"+fname, "a") as file:
-            # Création de l'écrivain'' CSV.
-            writer = csv.writer(file)
+        |=========================================|
+        | Cree le stockage binaire des resultats, |
+        | a cote de data_simu.csv.                |
+        |=========================================|
+
+        Parameters
+        ----------
+        :key kwargs: :seealso: store.RunStore
 
-            list_data = [gen_number, ind_number, self.individuals[ind_number].score]
+        Returns
+        -------
+        :return: Le stockage, dans le sous repertoire run_store.
+        :rtype: store.RunStore
+        """
+        import store
 
-            # for portion in self.individuals[ind_number].Gene.nbr_portions :
+        repertoire = os.path.join(self.directory(type_simu, simulation_counter), "run_store")
+        return store.RunStore(repertoire, **kwargs)
 
-            instant = 0
-            while instant < self.individuals[0].nbr_portions * self.individuals[0].portion_duration:
-                list_wheel = [self.individuals[ind_number](instant)[k] for k in range(4)]
-                for i in range(4):
-                    list_data.append(list_wheel[i])
-                instant += self.individuals[0].portion_duration
+    def save_store(self, gen_number, run_store, trajectories, trajectory_points=100):
+        """
+        |===================================|
+        | Ajoute la generation au stockage, |
+        | trajectoires comprises.           |
+        |===================================|
 
-            if (type_simu == 1) and (ind_number == self.nbr_individuals-1): 
-                #condition1 : on a besoin de individuals_under_threshold puisque la type_simu dépend du rayon maximal autorisé (type_simu = 1)
-                #condition2 : on ajoute le individuals_under_threshold de la génération si c'est le dernier individu (de la génération)
-                    list_data.append(individuals_under_threshold)
+        :param gen_number: Le numero de la generation.
+        :param run_store: Le stockage donne par create_store.
+        :param trajectories: Les listes des points x, y de chaque individu.
+        :param trajectory_points: Nombre de points gardes par trajectoire.
+        """
+        import store
 
+        run_store.append(gen_number, scores=self.scores, biases=self.biases,
+                         trajectories=store.downsample(trajectories, trajectory_points))
 
-            # Écriture des quelques données.
-            writer.writerows([list_data])
+    def save(self, gen_number, writer, run_store, trajectories, trajectory_points=100,
+             individuals_under_threshold=None):
+        """
+        Enregistre la generation dans data_simu.csv et/ou dans le stockage binaire,
+        ceux qui valent None sont ignores.
+        """
+        if writer is not None:
+            self.save_score(gen_number, writer, individuals_under_threshold)
+        if run_store is not None:
+            self.save_store(gen_number, run_store, trajectories, trajectory_points)
 
-    def simulation(self, nature="virtual", type_simu=0, nbr_generations=100, simulation_counter=0, tolerated_ind_percentage=10):
+    def simulation(self, nature="virtual", type_simu=0, nbr_generations=None, simulation_counter=0, tolerated_ind_percentage=10, solver=None, workers=None, seed=0, max_rows=None, max_bytes=1 << 20, output="csv", trajectory_points=100, plot="sync", point_budget=20000, criteria=(), checkpoint=None, checkpoint_interval=10, estimator=None, migration=None):
         """
         |=====================================|
         | Simule l'evolution des generations. |
         |=====================================|
 
-        :param nbr_generations: Le nombre d'iterations.
+        * L'evolution s'arrete au premier critere d'arret qui se declenche,
+        son nom est garde dans self.stop_reason. :seealso: stopping
+
+        :param nbr_generations: Le nombre maximal d'iterations,
+            None pour 100 avec type_simu 0 et 50 avec type_simu 1.
         :param nature: 'virtual' ou 'real', simulation ou test reel.
         :param type_simu : 0 pour choisir le nombre de générations,
                            1 pour continuer à créer des générations tant que
                              tous les ind ne sont pas dans le rayon choisi autour de l'arrivée (accepted_radius)
-        """
-        assert nature in {"virtual", "real"}
-
-        repertoire = self.create_file(type_simu=type_simu, simulation_counter=simulation_counter)
-
-        # Cas où nbr_generations est fixé
-        if (type_simu == 0):
-
-            for gen_number in range(nbr_generations):
-                plt.axis("equal")
-                plt.title("generation : %d" % gen_number)
-
-                # Excecution des simulations, ou activation de la voiture
-                for ind_num, (x, y) in enumerate(
-                        ind.move_simulation() if nature == "virtual" else ind.move_car()
-                        for ind in self.individuals):
-                    plt.plot(x, y)
-                    self.save_score(gen_number, ind_num, type_simu, repertoire=repertoire)
-
-                # for i in range(self.nbr_individuals):
-                #     self.save_score(gen_number, i)
-
-                # Bebe entre generations.
-                weights = [ind.score for ind in self.individuals]
-                self.individuals = [
-                    (random.choices(self.individuals, weights=weights, k=1)[0]
-                     + random.choices(self.individuals, weights=weights, k=1)[0]
-                     ).mute(self.mutation_factor)
-                    for _ in range(self.nbr_individuals)]
+        :param solver: simulation.DormandPrince pour un pas adaptatif, None pour le pas fixe.
+        :param workers: Nombre de processus pour la simulation virtuelle, None pour tout faire ici.
+        :param seed: Graine des processus, les resultats ne dependent pas de leur nombre.
+        :param max_rows, max_bytes: Seuils d'ecriture de data_simu.csv en plus de la fin
+            de chaque generation, :seealso: results.ResultsWriter
+        :param output: 'csv' pour data_simu.csv, 'npy' pour le stockage binaire
+            avec les trajectoires (:seealso: store.RunStore), 'both' pour les deux.
+        :param trajectory_points: Nombre de points gardes par trajectoire dans le stockage binaire.
+        :param plot: 'sync', 'async' pour dessiner les generations dans un autre processus,
+            'none' pour ne pas les dessiner (matplotlib n'est alors pas importe).
+        :param point_budget: Nombre maximal de points par image, :seealso: render.Renderer
+        :param criteria: Criteres d'arret en plus de nbr_generations (et du seuil de
+            type_simu 1), par exemple stopping.Plateau(10).
+        :param checkpoint: Fichier du point de reprise, reecrit toutes les
+            checkpoint_interval generations, None pour ne pas en faire. :seealso: resume
+        :param checkpoint_interval: Nombre de generations entre deux points de reprise
+            (les caches y sont, un point de reprise coute quelques dixiemes de seconde).
+        :param estimator: Pour le test reel, cree l'estimateur de pose de chaque voiture,
+            par exemple functools.partial(estimator.Estimator, pixel_size, origin),
+            None pour les seules poses de la camera. :seealso: Individual.move_car
+        :param migration: Appelee par migration(self, gen_number) apres l'evaluation de chaque
+            generation et les criteres d'arret, avant reproduce: elle peut remplacer des
+            individus evalues (:seealso: set_biases), self.stop_reason dit si c'est la derniere
+            generation. Elle n'est pas gardee dans le point de reprise. :seealso: island.run_islands
 
-                if gen_number % 10 == 0:
-                    plt.savefig(repertoire+"/generation_%02d.png" % gen_number)
-                plt.clf()
+        Returns
+        -------
+        :return: Le nombre de generations evaluees.
+        :rtype: int
+        """
+        settings = {name: value for name, value in locals().items() if name not in {"self", "criteria", "migration"}}
+        import checkpoint as checkpoint_
+        import stopping
 
-        # Cas où on continue tant que tous les individus ne sont pas dans le rayon choisi
-        elif type_simu == 1:
+        assert nature in {"virtual", "real"}
+        assert output in {"csv", "npy", "both"}
+        if type_simu not in {0, 1}:
+            print("type_simu doit valoir 0 (nbr_generations fixé) ou 1 (choix de accepted_radius)")
+            return 0
 
+        # Cas où nbr_generations est fixé, ou où on continue tant que tous
+        # les individus ne sont pas dans le rayon choisi.
+        if nbr_generations is None:
+            nbr_generations = 100 if type_simu == 0 else 50
+        restored, self._restored = self._restored, None
+        if restored is None:
+            criteria = [stopping.MaxGenerations(nbr_generations)] \
+                + ([stopping.UnderThreshold(tolerated_ind_percentage)] if type_simu == 1 else []) \
+                + list(criteria)
+            for criterion in criteria:
+                criterion.reset(self)
+            self.stop_reason = None
             gen_number = 0
-            individuals_under_threshold = self.nbr_individuals
-
-            while (individuals_under_threshold > (tolerated_ind_percentage*self.nbr_individuals/100)) and (gen_number < 50):
-                individuals_under_threshold = self.nbr_individuals
-                plt.axis("equal")
-                plt.title("generation : %d" % gen_number)
-
+        else: # Les criteres continuent avec leur etat.
+            criteria, gen_number = restored["criteria"], restored["gen_number"]
+            individuals_under_threshold = restored["individuals_under_threshold"]
+
+        repertoire = self.directory(type_simu, simulation_counter)
+        writer = run_store = None
+        if output in {"csv", "both"}:
+            writer = self.create_file(type_simu=type_simu, simulation_counter=simulation_counter,
+                                      size=restored and restored["csv_size"], max_rows=max_rows, max_bytes=max_bytes)
+        if output in {"npy", "both"}:
+            run_store = self.create_store(type_simu=type_simu, simulation_counter=simulation_counter,
+                                          keep=restored and restored["store_rows"])
+
+        pool = None
+        if workers and nature == "virtual": # Les processus vivent le temps de toute l'evolution.
+            import parallel
+            pool = parallel.EvaluationPool(self, workers, seed=seed)
+
+        import render
+        renderer = render.Renderer(plot, point_budget)
+
+        if restored is not None:
+            checkpoint_.restore_random(restored)
+
+        try:
+            while self.stop_reason is None:
                 # Excecution des simulations, ou activation de la voiture
-                for ind_num, (x, y) in enumerate(
-                        ind.move_simulation() if nature == "virtual" else ind.move_car()
-                        for ind in self.individuals):
-                    plt.plot(x, y)
-                    self.save_score(gen_number, ind_num, 1, repertoire, individuals_under_threshold)
-                    #Maj du compteur d'individus sous le seuil de tolérance
-                    if ( self.individuals[ind_num].score > (1/self.accepted_radius)):
-                        individuals_under_threshold-=1
-
-                # for i in range(self.nbr_individuals):
-                #     self.save_score(gen_number, i)
+                if nature == "virtual":
+                    trajectories = self.move_simulation(solver, pool)
+                else:
+                    self.control_stats = []
+                    trajectories = [ind.move_car(stats=self.control_stats,
+                                                 estimator=None if estimator is None else estimator())
+                                    for ind in self.individuals]
+                    self.nbr_evaluations += self.nbr_individuals
+
+                #Maj du compteur d'individus sous le seuil de tolérance
+                individuals_under_threshold = self.nbr_individuals - int(np.sum(self.scores > 1/self.accepted_radius))
+                self.save(gen_number, writer, run_store, trajectories, trajectory_points,
+                          individuals_under_threshold if type_simu == 1 else None)
+
+                # Les criteres regardent la generation evaluee, avant les bebes.
+                self.stop_reason = stopping.first(criteria, self, gen_number + 1)
+                if migration is not None:
+                    migration(self, gen_number)
 
                 # Bebe entre generations.
-                weights = [ind.score for ind in self.individuals]
-                self.individuals = [
-                    (random.choices(self.individuals, weights=weights, k=1)[0]
-                     + random.choices(self.individuals, weights=weights, k=1)[0]
-                     ).mute(self.mutation_factor)
-                    for _ in range(self.nbr_individuals)]
+                self.reproduce()
 
-                # if gen_number % 10 == 0:
-                plt.savefig(repertoire+"/"+"generation_%02d.png" % gen_number)
+                if type_simu == 1 or gen_number % 10 == 0:
+                    renderer.submit(trajectories, "generation : %d" % gen_number,
+                                    repertoire+"/generation_%02d.png" % gen_number)
+                gen_number += 1
 
-                plt.clf()
-                gen_number+=1
+                if checkpoint is not None and (gen_number % checkpoint_interval == 0 or self.stop_reason is not None):
+                    checkpoint_.save(checkpoint, dict(self._state(), configuration=self._configuration(),
+                        settings=settings, criteria=criteria,
+                        gen_number=gen_number, individuals_under_threshold=individuals_under_threshold,
+                        csv_size=writer and writer.file.tell(), store_rows=run_store and run_store.nbr_rows))
 
+            if type_simu == 1:
+                self.individuals_under_threshold = individuals_under_threshold
+            return gen_number
+
+        finally:
+            renderer.close() # Attend les dernieres images.
+            if writer is not None:
+                writer.close() # Les lignes en attente sont ecrites meme apres une erreur.
+            if run_store is not None:
+                run_store.close()
+            if pool is not None:
+                pool.close()
+
+    def _state(self):
+        """
+        La population et ce qui sert a l'evaluer, pour un point de reprise.
+        """
+        return {name: getattr(self, name) for name in ("biases", "scores", "samples", "stop_reasons",
+            "nbr_kept", "unreachable_score", "nbr_evaluations", "stop_reason", "fitness_cache", "boundary_cache")}
 
-        else:
+    def _configuration(self):
+        """
+        Les parametres de __init__ qui changent l'evolution, pour verifier une reprise.
+        """
+        return {"nbr_individuals": self.nbr_individuals, "mutation_factor": self.mutation_factor,
+                "accepted_radius": self.accepted_radius,
+                "coord_arrivee": (self.template.arriveeX, self.template.arriveeY),
+                "portion_duration": self.template.portion_duration, "nbr_portions": self.template.nbr_portions,
+                "nbr_outputs": self.template.nbr_outputs, "selection": self.selection, "nbr_elites": self.nbr_elites,
+                "early_stopping": self.early_stopping, "unreachable_rank": self.unreachable_rank,
+                "recording": repr(self.recording),
+                "cache_size": 0 if self.fitness_cache is None else self.fitness_cache.maxsize,
+                "boundary_cache_bytes": 0 if self.boundary_cache is None else self.boundary_cache.maxbytes}
+
+    def resume(self, path, **kwargs):
+        """
+        |=============================================|
+        | Continue l'evolution d'un point de reprise. |
+        |=============================================|
 
-            print("type_simu doit valoir 0 (nbr_generations fixé) ou 1 (choix de accepted_radius)")
+        * La generation doit etre creee avec les memes parametres que celle
+        qui a ecrit le point de reprise, sinon AssertionError donne ceux qui different.
+        L'evolution continue a l'identique,
+        les fichiers de resultats sont ramenes a l'instant du point de reprise.
 
-        
+        Parameters
+        ----------
+        :param path: Le fichier ecrit par simulation(checkpoint=path).
+        :type path: str
+        :key kwargs: Parametres de simulation a changer, par exemple workers ou plot.
+
+        Returns
+        -------
+        :return: Le nombre de generations evaluees depuis le debut.
+        :rtype: int
+        """
+        import checkpoint
+
+        state = checkpoint.load(path)
+        assert "configuration" in state, "The checkpoint does not record the configuration of its population."
+        configuration = self._configuration()
+        different = [name for name in configuration if state["configuration"].get(name) != configuration[name]]
+        assert not different, "The checkpoint was written with different parameters: %s." \
+            % ", ".join(f"{name}={state['configuration'].get(name)!r} (not {configuration[name]!r})" for name in different)
+        assert state["biases"].shape == self.biases.shape, \
+            "The checkpoint was written by a different population."
+        for name, value in state.items():
+            if name in self._state():
+                setattr(self, name, value)
+        self._restored = state
+        return self.simulation(**dict(state["settings"], **kwargs))
@@ -50,6 +50,8 @@ class RaspControler:
         self.pwm = {mot: self.gpio.PWM(table["pwm"], 1000)
             for mot, table in self.motors.items()}
 
+        self.en_pins = [self.motors["m%d" % w]["en"] for w in [1, 2, 3, 4]] # Sens des roues 1 a 4.
+
         # Output initialisation
         for mot in self.motors.keys():
             self.gpio.output(self.motors[mot]["en"], self.gpio.LOW)
@@ -107,6 +109,28 @@ class RaspControler:
                 self.pwm[mot].ChangeDutyCycle(100*abs(speed))
                 print(mot, abs(speed))
 
+    def set_wheels(self, *speeds):
+        """
+        |============================|
+        | Move the 4 wheels at once. |
+        |============================|
+
+        * Les sens des 4 roues changent en une seule ecriture des GPIO,
+        puis les 4 rapports cycliques.
+
+        :param speeds: Les vitesses des roues 1 a 4, :seealso: RaspControler.move_wheel
+        :type speeds: float
+        """
+        assert len(speeds) == 4, "4 speeds are required. Not %d." % len(speeds)
+        for speed in speeds:
+            assert isinstance(speed, (int, float)), \
+                "'speed' have to be a number. Not a %s." % type(speed).__name__
+            assert -1 <= speed <= 1, "abs(speed) must be <= 1. Not %f." % speed
+
+        self.gpio.output(self.en_pins, [self.gpio.HIGH if speed >= 0 else self.gpio.LOW for speed in speeds])
+        for wheel_number, speed in enumerate(speeds):
+            self.pwm["m%d" % (wheel_number + 1)].ChangeDutyCycle(100*abs(speed))
+
     def close(self):
         """
         |================|
@@ -126,29 +150,54 @@ class RaspControler:
         """
         self.close()
 
-def move_wheel(*args, **kwargs):
+def _controler():
     """
-    Alias to Controler.move_wheel.
+    The RaspControler on the Raspberry, a communication.Client elsewhere.
     The purpose is not to recreate a connection each time.
-
-    :seealso: Controler.move_wheel
     """
     if getpass.getuser() == "pi": # If we are on the Raspberry.
         if "controler" not in globals():
             globals()["controler"] = RaspControler()
-        return controler.move_wheel(*args, **kwargs)
+        return controler
     else: # If we are not on the Raspberry.
         import communication
         if "client" not in globals():
             globals()["client"] = communication.Client()
-        return client.move_wheel(*args, **kwargs)
+        return client
+
+def move_wheel(*args, **kwargs):
+    """
+    Alias to Controler.move_wheel.
+
+    :seealso: Controler.move_wheel
+    """
+    return _controler().move_wheel(*args, **kwargs)
+
+def set_wheels(*speeds):
+    """
+    Alias to Controler.set_wheels, a single message from the computer.
+
+    :seealso: RaspControler.set_wheels
+    """
+    return _controler().set_wheels(*speeds)
+
+def get_position(*args, **kwargs):
+    """
+    Return the actual position of the car, without waiting for the camera.
 
-def get_position():
+    :seealso: detect.ImageCapture.get_position
     """
-    Return the actual position of the car.
+    import detect
+    return detect.get_position(*args, **kwargs)
+
+def next_position(*args, **kwargs):
+    """
+    Wait for a position measured after the one of the previous call.
+
+    :seealso: detect.next_position
     """
     import detect
-    return detect.get_position()
+    return detect.next_position(*args, **kwargs)
 
 if __name__ == "__main__":
     if getpass.getuser() == "pi": # If we are on the Raspberry.
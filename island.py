@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+"""
+|======================================================|
+| Island model: several populations evolving in        |
+| their own process and exchanging their best genomes. |
+|======================================================|
+
+* Each island is a genetic.Generation in its own process.
+* Every migration_interval generations, each island sends its nbr_migrants
+best individuals to its neighbours, which replace their worst ones.
+The migrants keep their score and recorded states, they are not simulated again.
+* Each island runs genetic.Generation.simulation, the migrations go
+through its migration hook.
+* The hook also sends every generation to the main process,
+which writes the generations of all the islands in a single csv file.
+"""
+
+import multiprocessing
+import os
+import random
+import traceback
+
+import numpy as np
+
+
+TOPOLOGIES = ("ring", "full")
+
+
+def neighbours(number, nbr_islands, topology="ring"):
+    """
+    |==================================|
+    | Iles qui recoivent les migrants. |
+    |==================================|
+
+    >>> neighbours(3, 4, "ring")
+    [0]
+    >>> neighbours(1, 4, "full")
+    [0, 2, 3]
+
+    Parameters
+    ----------
+    :param number: Le numero de l'ile qui envoie.
+    :type number: int
+    :param nbr_islands: Nombre d'iles.
+    :type nbr_islands: int
+    :param topology: 'ring' pour envoyer a l'ile suivante, 'full' pour les envoyer a toutes.
+    :type topology: str
+
+    Returns
+    -------
+    :return: Les numeros des iles destinataires.
+    :rtype: list
+    """
+    assert topology in TOPOLOGIES, "'topology' must be one of %s." % ", ".join(TOPOLOGIES)
+    if nbr_islands == 1:
+        return []
+    if topology == "ring":
+        return [(number + 1) % nbr_islands]
+    return [other for other in range(nbr_islands) if other != number]
+
+
+def emigrants(generation, nbr_migrants):
+    """
+    Les meilleurs individus d'une generation evaluee: genomes, scores,
+    etats enregistres et raisons d'arret.
+    """
+    import selection
+
+    best = selection.elites(generation.scores, nbr_migrants)
+    return (generation.biases[best].copy(), generation.scores[best].copy(),
+            generation.samples[best].copy(), [generation.stop_reasons[i] for i in best])
+
+
+def immigrate(generation, migrants):
+    """
+    |========================================|
+    | Remplace les plus mauvais individus    |
+    | d'une generation evaluee par migrants. |
+    |========================================|
+
+    :param migrants: Les listes d'individus donnees par emigrants.
+    :type migrants: list
+    """
+    biases = np.concatenate([m[0] for m in migrants])
+    scores = np.concatenate([m[1] for m in migrants])
+    samples = np.concatenate([m[2] for m in migrants])
+    reasons = [reason for m in migrants for reason in m[3]]
+    assert len(biases) < generation.nbr_individuals, "Too many migrants for the island."
+
+    worst = np.argsort(generation.scores, kind="stable")[:len(biases)]
+    generation.set_biases(worst, biases)
+    generation.scores[worst] = scores
+    generation.samples[worst] = samples
+    for i, reason in zip(worst, reasons):
+        generation.stop_reasons[i] = reason
+
+
+class Migration:
+    """
+    |============================================|
+    | Echanges d'une ile avec ses voisines, pour |
+    | genetic.Generation.simulation(migration=). |
+    |============================================|
+
+    * Migration synchrone: toutes les migration_interval generations, l'ile envoie
+    ses meilleurs individus puis attend ceux de chacune de ses sources.
+    * Une ile qui s'arrete le dit a ses voisines, qui ne l'attendent plus.
+    """
+    def __init__(self, number, destinations, sources, inboxes, results, migration_interval, nbr_migrants):
+        """
+        Parameters
+        ----------
+        :param number: Le numero de l'ile.
+        :type number: int
+        :param destinations: Les iles qui recoivent ses migrants, :seealso: neighbours
+        :type destinations: list
+        :param sources: Nombre d'iles qui lui envoient des migrants.
+        :type sources: int
+        :param inboxes: Les files de reception de toutes les iles.
+        :type inboxes: list
+        :param results: File du processus principal, :seealso: _island
+        :type results: multiprocessing.Queue
+        """
+        self.number = number
+        self.destinations = destinations
+        self.sources = sources # Iles encore en route qui envoient ici.
+        self.inboxes = inboxes
+        self.results = results
+        self.migration_interval = migration_interval
+        self.nbr_migrants = nbr_migrants
+
+    def __call__(self, generation, gen_number):
+        self.results.put((self.number, gen_number, generation.scores.copy(),
+                          generation.commands(), generation.nbr_evaluations))
+        if generation.stop_reason is not None: # Derniere generation.
+            for other in self.destinations:
+                self.inboxes[other].put(None)
+            return
+        if (gen_number + 1) % self.migration_interval or not self.destinations:
+            return
+
+        migrants = emigrants(generation, self.nbr_migrants)
+        for other in self.destinations:
+            self.inboxes[other].put(migrants)
+        received = []
+        while len(received) < self.sources:
+            message = self.inboxes[self.number].get()
+            if message is None: # Une source s'est arretee.
+                self.sources -= 1
+            else:
+                received.append(message)
+        if received:
+            immigrate(generation, received)
+
+
+def _island(number, parameters, inboxes, sources, results):
+    """
+    |==========================================|
+    | Evolution d'une ile, dans son processus. |
+    |==========================================|
+
+    * Envoie dans results, apres chaque generation, le tuple
+    (numero de l'ile, numero de la generation, scores, consignes, nbr_evaluations),
+    puis None a la fin. Une erreur est envoyee sous forme de texte.
+    """
+    import genetic as gen
+
+    try:
+        np.random.seed([parameters["seed"], number])
+        random.seed(repr((parameters["seed"], number)))
+        generation = gen.Generation(*parameters["args"], **parameters["kwargs"])
+        settings = dict(parameters["settings"])
+        settings["simulation_counter"] = settings.get("simulation_counter", 0) + number
+        if settings.get("checkpoint") is not None:
+            settings["checkpoint"] = "%s.%d" % (settings["checkpoint"], number)
+        migration = Migration(number, neighbours(number, len(inboxes), parameters["topology"]), sources,
+                              inboxes, results, parameters["migration_interval"], parameters["nbr_migrants"])
+        generation.simulation(migration=migration, **settings)
+        results.put(None)
+    except Exception:
+        results.put(traceback.format_exc())
+
+
+def run_islands(nbr_islands, *args, nbr_generations=100, migration_interval=10, nbr_migrants=2,
+                topology="ring", seed=0, settings=None, directory="simulation_data/islands", **kwargs):
+    """
+    |====================================================|
+    | Fait evoluer nbr_islands populations en parallele. |
+    |====================================================|
+
+    * Chaque ile evolue par genetic.Generation.simulation, avec ses criteres d'arret,
+    ses fichiers de resultats, ses images et ses points de reprise.
+    L'ile k a le numero de simulation simulation_counter + k, et le point de
+    reprise checkpoint.k .
+    * Le fichier directory/data_simu.csv contient en plus les lignes de toutes les iles,
+    precedees du numero de l'ile.
+
+    Parameters
+    ----------
+    :param nbr_islands: Nombre d'iles, une par processus.
+    :type nbr_islands: int
+    :param nbr_generations: Nombre maximal de generations de chaque ile.
+    :type nbr_generations: int
+    :param migration_interval: Nombre de generations entre deux migrations.
+    :type migration_interval: int
+    :param nbr_migrants: Nombre d'individus envoyes a chaque voisin.
+    :type nbr_migrants: int
+    :param topology: Les voisins de chaque ile, :seealso: neighbours
+    :type topology: str
+    :param seed: Graine de l'evolution, chaque ile a la sienne.
+    :type seed: int
+    :param settings: Autres arguments de genetic.Generation.simulation, par exemple
+        solver, plot, output ou criteria.
+    :type settings: dict
+    :param directory: Repertoire du fichier csv de toutes les iles, None pour ne pas l'ecrire.
+    :type directory: str
+    :arg args: Same as genetic.Generation.__init__ .
+    :key kwargs: Same as genetic.Generation.__init__ .
+
+    Returns
+    -------
+    :return: Pour chaque ile et chaque generation, le meilleur score et le nombre
+        de simulations de l'ile depuis le debut, de forme (nbr_islands, nbr_generations, 2),
+        NaN apres l'arret d'une ile.
+    :rtype: np.ndarray
+    """
+    import results as results_
+
+    assert nbr_islands >= 1, "'nbr_islands' must be positive."
+    assert nbr_generations >= 1, "'nbr_generations' must be positive."
+    assert migration_interval >= 1, "'migration_interval' must be positive."
+    assert topology in TOPOLOGIES, "'topology' must be one of %s." % ", ".join(TOPOLOGIES)
+    assert "unreachable" not in kwargs.get("early_stopping", ()) or nbr_migrants <= kwargs.get("nbr_elites", 0), \
+        "With 'unreachable', only the nbr_elites best scores are exact: nbr_migrants must not exceed it."
+
+    settings = dict(settings or {}, nbr_generations=nbr_generations)
+    parameters = dict(args=args, kwargs=kwargs, settings=settings, migration_interval=migration_interval,
+                      nbr_migrants=nbr_migrants, topology=topology, seed=seed)
+    sources = [0]*nbr_islands # Nombre de messages recus a chaque migration.
+    for number in range(nbr_islands):
+        for other in neighbours(number, nbr_islands, topology):
+            sources[other] += 1
+
+    inboxes = [multiprocessing.Queue() for _ in range(nbr_islands)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_island, args=(number, parameters, inboxes, sources[number], results),
+                                         daemon=True)
+                 for number in range(nbr_islands)]
+    for process in processes:
+        process.start()
+
+    history = np.full((nbr_islands, nbr_generations, 2), np.nan)
+    writer = None
+    try:
+        running = nbr_islands
+        while running:
+            message = results.get()
+            if message is None:
+                running -= 1
+                continue
+            if isinstance(message, str):
+                raise RuntimeError("An island failed:\n" + message)
+            number, gen_number, scores, commands, nbr_evaluations = message
+            history[number, gen_number] = np.nanmax(scores), nbr_evaluations
+
+            if directory is not None:
+                if writer is None:
+                    os.makedirs(directory, exist_ok=True)
+                    columns = ["Ile", "Génération", 'Individu', 'Score'] \
+                        + ['Gene_' + str(portion) + 'roue_' + str(roue)
+                           for portion in range(commands.shape[1]) for roue in range(commands.shape[2])]
+                    writer = results_.ResultsWriter(os.path.join(directory, "data_simu.csv"), columns)
+                scores = np.where(np.isnan(scores), None, scores).tolist()
+                for ind_number, (score, row) in enumerate(zip(scores, commands.reshape(len(commands), -1).tolist())):
+                    writer.writerow([number, gen_number, ind_number, score] + row)
+                writer.flush(sync=True)
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        if writer is not None:
+            writer.close()
+    return history
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""
+|===========================================|
+| Evaluation of a generation on many cores. |
+|===========================================|
+
+* The processes are created once and kept alive across generations.
+* The genomes go through a shared memory block, only the
+index ranges are sent with each task.
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+import random
+
+import numpy as np
+
+import simulation
+
+
+_worker = {} # Etat propre a chaque processus du pool.
+
+
+def _init_worker(name, shape, template, seed):
+    """
+    Ouvre le bloc de memoire partagee dans un processus du pool.
+    """
+    shm = shared_memory.SharedMemory(name=name) # Seul le processus principal le detruit.
+    _worker.update(shm=shm, biases=np.ndarray(shape, buffer=shm.buf),
+                   template=template, seed=seed)
+
+
+def _evaluate(task):
+    """
+    |======================================|
+    | Simule les individus start a stop-1. |
+    |======================================|
+
+    Returns
+    -------
+    :return: Les scores, les echantillons de forme (stop-start, nbr_samples, 6),
+        l'integrateur utilise (pour ses compteurs), les etats au debut
+        de chaque portion et les numeros des conditions d'arret
+        (ces deux derniers valent None avec un integrateur).
+    :rtype: (np.ndarray, np.ndarray, simulation.DormandPrince, np.ndarray, np.ndarray)
+    """
+    generation_number, start, stop, solver, recording, first_portions, initial, stops = task
+
+    # La graine ne depend que de la tache, pas du processus qui la traite.
+    np.random.seed([_worker["seed"], generation_number, start])
+    random.seed(repr((_worker["seed"], generation_number, start)))
+
+    template = _worker["template"]
+    individuals = []
+    for bias in _worker["biases"][start:stop]:
+        ind = template.copy()
+        ind.bias = bias
+        individuals.append(ind)
+
+    if solver is None:
+        samples, bounds, stopped = simulation.simulate_batch(
+            np.array([ind.compile() for ind in individuals]), template.portion_duration,
+            recording=recording, first_portions=first_portions, initial=initial, stops=stops)
+        return template.fitness(bounds[-1, 3], bounds[-1, 4]), samples, solver, bounds, stopped
+
+    samples = np.array([ind.move_simulation(solver, recording).states for ind in individuals])
+    return np.array([ind.score for ind in individuals]), samples, solver, None, None
+
+
+class EvaluationPool:
+    """
+    |=========================================|
+    | Persistent process pool evaluating the  |
+    | individuals of a Generation.            |
+    |=========================================|
+    """
+    def __init__(self, generation, workers, *, seed=0, start_method=None):
+        """
+        Parameters
+        ----------
+        :param generation: Population a evaluer, elle donne la taille maximale des lots.
+        :type generation: genetic.Generation
+        :param workers: Nombre de processus.
+        :type workers: int
+        :param seed: Graine des generateurs aleatoires des processus.
+        :type seed: int
+        :param start_method: 'fork', 'spawn' ou 'forkserver', None pour celle par defaut
+            de la plateforme. Avec 'spawn' et 'forkserver', generation.template est envoye par pickle.
+        :type start_method: str
+        """
+        assert isinstance(workers, int), \
+            "'workers' must be of type int. Not %s." \
+            % type(workers).__name__
+        assert workers > 0, "There must be at least 1 worker."
+
+        self.shape = generation.biases.shape
+        self.shm = shared_memory.SharedMemory(create=True, size=generation.biases.nbytes)
+        self.biases = np.ndarray(self.shape, buffer=self.shm.buf)
+        self.workers = workers
+        self.pool = multiprocessing.get_context(start_method).Pool(workers, initializer=_init_worker,
+            initargs=(self.shm.name, self.shape, generation.template, seed))
+        self.generation_number = 0
+
+    def evaluate(self, biases, solver=None, *, recording=None, first_portions=None, initial=None, stops=()):
+        """
+        |====================================|
+        | Simule des individus en parallele. |
+        |====================================|
+
+        Parameters
+        ----------
+        :param biases: Les genomes a simuler, au plus autant que la population du pool.
+        :type biases: np.ndarray
+        :param solver: Integrateur a pas adaptatif, None pour le pas fixe.
+            Ses compteurs sont incrementes de ceux des processus.
+        :type solver: simulation.DormandPrince
+        :param recording: Les pas enregistres, None pour simulation.Recording().
+        :type recording: simulation.Recording
+        :param first_portions: Pour le pas fixe, la premiere portion simulee de chaque genome.
+        :param initial: Pour le pas fixe, l'etat de chaque voiture au debut de cette portion.
+        :param stops: Pour le pas fixe, les conditions d'arret anticipe.
+            :seealso: simulation.simulate_batch
+
+        Returns
+        -------
+        :return: Dans l'ordre des genomes, les scores, les echantillons
+            de forme (len(biases), nbr_samples, 6), les etats au debut de chaque
+            portion et les numeros des conditions d'arret (None avec un integrateur).
+        :rtype: (np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+        """
+        assert biases.shape[1:] == self.shape[1:] and len(biases) <= self.shape[0], \
+            "The genomes do not fit in the shared memory."
+        self.biases[:len(biases)] = biases
+
+        # Une tranche contigue des genomes par processus.
+        bounds = np.linspace(0, len(biases), min(self.workers, len(biases)) + 1).astype(int)
+        tasks = [(self.generation_number, start, stop,
+                  None if solver is None else simulation.DormandPrince(
+                      solver.rtol, solver.atol, first_step=solver.first_step, max_step=solver.max_step),
+                  recording,
+                  None if first_portions is None else first_portions[start:stop],
+                  None if initial is None else initial[:, start:stop],
+                  stops)
+                 for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+        results = self.pool.map(_evaluate, tasks) # Les resultats arrivent dans l'ordre.
+        self.generation_number += 1
+
+        scores = np.concatenate([scores for scores, *_ in results])
+        samples = np.concatenate([samples for _, samples, *_ in results])
+        if solver is not None:
+            for _, _, task_solver, _, _ in results:
+                solver.nbr_steps += task_solver.nbr_steps
+                solver.nbr_rejected += task_solver.nbr_rejected
+                solver.nbr_evaluations += task_solver.nbr_evaluations
+            return scores, samples, None, None
+        return (scores, samples, np.concatenate([bounds for *_, bounds, _ in results], axis=2),
+                np.concatenate([stopped for *_, stopped in results]))
+
+    def close(self):
+        """
+        Arrete les processus et libere la memoire partagee.
+        """
+        if hasattr(self, "pool"):
+            self.pool.close()
+            self.pool.join()
+            del self.pool
+        if hasattr(self, "shm"):
+            del self.biases
+            self.shm.close()
+            self.shm.unlink()
+            del self.shm
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
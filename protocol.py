@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+|===============================================|
+| Wire format between the computer and the car. |
+|===============================================|
+
+* Each message is a frame: a header (version, type, payload length)
+followed by the payload, so that the server can split a TCP stream
+whatever the way it is cut.
+* The payloads have a fixed struct layout, nothing is unpickled.
+* Frames of an unknown version are refused.
+"""
+
+import struct
+
+
+VERSION = 1
+HEADER = struct.Struct("!BBH") # Version, type du message, longueur du contenu.
+
+# Types des messages.
+MOVE_WHEEL = 1 # Une roue: vitesse puis nom de la roue en ascii.
+SET_WHEELS = 2 # Les 4 roues d'un coup.
+
+_MOVE_WHEEL = struct.Struct("!f")
+_SET_WHEELS = struct.Struct("!4f")
+
+
+def frame(message_type, payload):
+    """
+    |=====================================|
+    | Ajoute l'en-tete devant un contenu. |
+    |=====================================|
+    """
+    assert len(payload) <= 0xFFFF, "The payload is too long for a frame."
+    return HEADER.pack(VERSION, message_type, len(payload)) + payload
+
+
+def encode_move_wheel(wheel, speed):
+    """
+    |==============================================|
+    | Trame de interface.RaspControler.move_wheel. |
+    |==============================================|
+
+    Parameters
+    ----------
+    :param wheel: Numero de 1 a 4 ou nom de roues, :seealso: interface.RaspControler.move_wheel
+    :type wheel: int or str
+    :param speed: Vitesse entre -1 et 1.
+    :type speed: float
+
+    Returns
+    -------
+    :return: La trame a envoyer.
+    :rtype: bytes
+    """
+    assert isinstance(wheel, (int, str)), "'wheel' has to be of type str or int."
+    return frame(MOVE_WHEEL, _MOVE_WHEEL.pack(speed) + str(wheel).encode("ascii"))
+
+
+def encode_set_wheels(speeds):
+    """
+    |=================================|
+    | Trame des vitesses des 4 roues. |
+    |=================================|
+
+    :param speeds: Les vitesses des roues 1 a 4.
+    :type speeds: list
+    """
+    return frame(SET_WHEELS, _SET_WHEELS.pack(*speeds))
+
+
+def decode(message_type, payload):
+    """
+    |===============================|
+    | Le contenu d'une trame recue. |
+    |===============================|
+
+    Returns
+    -------
+    :return: Le nom de la commande et ses arguments,
+        ('move_wheel', (wheel, speed)) ou ('set_wheels', (s1, s2, s3, s4)).
+    :rtype: (str, tuple)
+    """
+    if message_type == MOVE_WHEEL:
+        speed, = _MOVE_WHEEL.unpack_from(payload)
+        wheel = payload[_MOVE_WHEEL.size:].decode("ascii")
+        return "move_wheel", (int(wheel) if wheel.isdigit() else wheel, speed)
+    if message_type == SET_WHEELS:
+        if len(payload) != _SET_WHEELS.size:
+            raise ValueError("Bad set_wheels payload of %d bytes." % len(payload))
+        return "set_wheels", _SET_WHEELS.unpack(payload)
+    raise ValueError("Unknown message type %d." % message_type)
+
+
+class FrameParser:
+    """
+    |=========================================|
+    | Decoupe un flux d'octets en trames, que |
+    | les segments TCP soient groupes ou non. |
+    |=========================================|
+    """
+    def __init__(self):
+        self.buffer = b"" # Debut d'une trame pas encore recue en entier.
+
+    def feed(self, data):
+        """
+        |====================================|
+        | Ajoute des octets recus et renvoie |
+        | les trames completes.              |
+        |====================================|
+
+        Returns
+        -------
+        :return: Les (type, contenu) des trames completes, dans l'ordre.
+        :rtype: list
+        """
+        data = self.buffer + data if self.buffer else bytes(data)
+        frames = []
+        start, size = 0, len(data)
+        while size - start >= HEADER.size:
+            version, message_type, length = HEADER.unpack_from(data, start)
+            if version != VERSION:
+                raise ValueError("Unsupported protocol version %d." % version)
+            end = start + HEADER.size + length
+            if end > size:
+                break
+            frames.append((message_type, data[start + HEADER.size:end]))
+            start = end
+        self.buffer = data[start:]
+        return frames
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+"""
+|=========================================|
+| Drawing of the generation trajectories. |
+|=========================================|
+
+* The figures are drawn with matplotlib.figure.Figure, without pyplot,
+so no window and no backend are needed.
+* matplotlib is only imported when a figure is drawn.
+* With Renderer("async"), the drawing happens in another process,
+the evolution only puts the trajectories in a queue. A failed drawing
+or a dead process is reported to the evolution instead of blocking it.
+"""
+
+import multiprocessing
+import queue as queue_
+import traceback
+
+import numpy as np
+
+
+MODES = ("sync", "async", "none")
+
+
+def decimate(trajectories, point_budget):
+    """
+    |================================================|
+    | Garde au plus point_budget points en tout,     |
+    | repartis equitablement entre les trajectoires. |
+    |================================================|
+
+    Parameters
+    ----------
+    :param trajectories: Pour chaque individu, les listes des points x, y.
+    :type trajectories: list
+    :param point_budget: Nombre maximal de points de toutes les trajectoires.
+    :type point_budget: int
+
+    Returns
+    -------
+    :return: Une ligne brisee de forme (nbr_points, 2) par trajectoire,
+        les extremites sont toujours gardees.
+    :rtype: list
+    """
+    per_line = max(2, point_budget // max(1, len(trajectories)))
+    lines = []
+    for x, y in trajectories:
+        points = np.column_stack((x, y)).astype(float) if len(x) else np.empty((0, 2))
+        if len(points) > per_line:
+            points = points[np.linspace(0, len(points) - 1, per_line).round().astype(int)]
+        lines.append(points)
+    return lines
+
+
+def draw(lines, title, path):
+    """
+    |=======================================|
+    | Dessine les trajectoires en une seule |
+    | LineCollection et enregistre l'image. |
+    |=======================================|
+
+    Parameters
+    ----------
+    :param lines: Les lignes donnees par decimate.
+    :type lines: list
+    :param title: Titre de la figure.
+    :type title: str
+    :param path: Fichier de l'image.
+    :type path: str
+    """
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+
+    figure = Figure()
+    axes = figure.subplots()
+    axes.add_collection(LineCollection(lines, colors=[f"C{i % 10}" for i in range(len(lines))]))
+    axes.autoscale()
+    axes.axis("equal")
+    axes.set_title(title)
+    figure.savefig(path)
+
+
+def _serve(queue, errors):
+    """
+    Boucle du processus de dessin, s'arrete en recevant None.
+    Les erreurs sont renvoyees dans errors, les figures suivantes sont dessinees.
+    """
+    for task in iter(queue.get, None):
+        try:
+            draw(*task)
+        except Exception:
+            errors.put((task[2], traceback.format_exc()))
+
+
+class Renderer:
+    """
+    |=======================================|
+    | Dessine les generations, ici, dans un |
+    | autre processus ou pas du tout.       |
+    |=======================================|
+    """
+    def __init__(self, mode="sync", point_budget=20000, maxsize=8, timeout=1.0):
+        """
+        Parameters
+        ----------
+        :param mode: 'sync' pour dessiner tout de suite, 'async' pour dessiner dans
+            un autre processus, 'none' pour ne rien dessiner (matplotlib n'est pas importe).
+        :type mode: str
+        :param point_budget: Nombre maximal de points par figure, :seealso: decimate
+        :type point_budget: int
+        :param maxsize: Nombre de figures en attente au dela duquel submit attend
+            le processus de dessin.
+        :type maxsize: int
+        :param timeout: Intervalle en secondes entre deux verifications que le processus
+            de dessin est en vie, quand la file est pleine.
+        :type timeout: float
+        """
+        assert mode in MODES, "'mode' must be one of %s." % ", ".join(MODES)
+        assert point_budget > 0, "'point_budget' must be positive."
+
+        self.mode = mode
+        self.point_budget = point_budget
+        self.timeout = timeout
+        self.nbr_figures = 0
+        if mode == "async":
+            self.queue = multiprocessing.Queue(maxsize)
+            self.errors = multiprocessing.Queue() # (fichier, trace) des figures ratees.
+            self.process = multiprocessing.Process(target=_serve, args=(self.queue, self.errors), daemon=True)
+            self.process.start()
+
+    def _check(self):
+        """
+        Leve RuntimeError si une figure n'a pas pu etre dessinee.
+        """
+        try:
+            path, trace = self.errors.get_nowait()
+        except queue_.Empty:
+            return
+        raise RuntimeError("Drawing %s failed in the render process:\n%s" % (path, trace))
+
+    def _put(self, task):
+        """
+        Met une tache dans la file sans attendre un processus de dessin mort.
+        """
+        while True:
+            try:
+                self.queue.put(task, timeout=self.timeout)
+                return
+            except queue_.Full:
+                if not self.process.is_alive():
+                    raise RuntimeError("The render process died with exit code %s."
+                                       % self.process.exitcode) from None
+
+    def submit(self, trajectories, title, path):
+        """
+        |===============================|
+        | Dessine une figure, ou la met |
+        | dans la file du processus.    |
+        |===============================|
+
+        Parameters
+        ----------
+        :param trajectories: Pour chaque individu, les listes des points x, y.
+        :type trajectories: list
+        :param title: Titre de la figure.
+        :type title: str
+        :param path: Fichier de l'image.
+        :type path: str
+        """
+        if self.mode == "none":
+            return
+        task = (decimate(trajectories, self.point_budget), title, path)
+        if self.mode == "async":
+            self._check()
+            if not self.process.is_alive():
+                raise RuntimeError("The render process died with exit code %s." % self.process.exitcode)
+            self._put(task)
+        else:
+            draw(*task)
+        self.nbr_figures += 1
+
+    def close(self):
+        """
+        Attend que toutes les figures soient dessinees,
+        leve RuntimeError si l'une d'elles ne l'a pas ete.
+        """
+        if self.mode == "async" and self.process is not None:
+            try:
+                if self.process.is_alive():
+                    self._put(None)
+                self.process.join()
+                self._check()
+                if self.process.exitcode:
+                    raise RuntimeError("The render process died with exit code %s." % self.process.exitcode)
+            finally:
+                if self.process.exitcode: # Personne ne videra la file.
+                    self.queue.cancel_join_thread()
+                self.queue.close()
+                self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
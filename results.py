@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+|============================================|
+| Buffered writer of the simulation results. |
+|============================================|
+
+* The csv file stays open during the whole evolution,
+the rows of a generation are written together.
+* The rows are kept in memory and reach the disk once per generation,
+or sooner when a row or byte threshold is exceeded.
+* The end of each generation is synced to the disk: after a crash
+the file holds every generation written before it.
+"""
+
+import csv
+import io
+import os
+
+
+class ResultsWriter:
+    """
+    |===========================================|
+    | Ecrit les lignes de data_simu.csv par     |
+    | paquets, dans un fichier toujours ouvert. |
+    |===========================================|
+    """
+    def __init__(self, path, columns=None, *, max_rows=None, max_bytes=1 << 20):
+        """
+        Parameters
+        ----------
+        :param path: Chemin du fichier csv, ouvert en ajout.
+        :type path: str
+        :param columns: Noms des colonnes, ecrits tout de suite. None pour ne pas
+            ecrire d'entete.
+        :type columns: list
+        :param max_rows: Nombre de lignes en attente au dela duquel elles sont
+            ecrites sans attendre la fin de la generation, None pour ne pas limiter.
+        :type max_rows: int
+        :param max_bytes: Meme chose en octets, None pour ne pas limiter.
+        :type max_bytes: int
+        """
+        assert max_rows is None or max_rows > 0, "'max_rows' must be positive."
+        assert max_bytes is None or max_bytes > 0, "'max_bytes' must be positive."
+
+        self.path = path
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.file = open(path, "a")
+        self.buffer = io.StringIO() # Les lignes en attente.
+        self.writer = csv.writer(self.buffer)
+        self.pending_rows = 0
+        self.nbr_flushes = 0 # Nombre d'ecritures sur le disque.
+        if columns is not None:
+            self.writerow(columns)
+            self.flush()
+
+    def writerow(self, row):
+        """
+        Ajoute une ligne, ecrite sur le disque si un seuil est depasse.
+        """
+        self.writer.writerow(row)
+        self.pending_rows += 1
+        if (self.max_rows is not None and self.pending_rows >= self.max_rows) \
+                or (self.max_bytes is not None and self.buffer.tell() >= self.max_bytes):
+            self.flush()
+
+    def write_generation(self, gen_number, scores, commands, last_column=None):
+        """
+        |================================|
+        | Ajoute les lignes de toute une |
+        | generation puis les ecrit.     |
+        |================================|
+
+        Parameters
+        ----------
+        :param gen_number: Le numero de la generation.
+        :type gen_number: int
+        :param scores: Le score de chaque individu, de taille nbr_individuals.
+        :type scores: np.ndarray
+        :param commands: Les consignes de chaque individu,
+            de forme (nbr_individuals, nbr_portions, nbr_outputs).
+        :type commands: np.ndarray
+        :param last_column: Valeur ajoutee a la fin de la ligne du dernier individu,
+            None pour ne rien ajouter.
+        """
+        commands = commands.reshape(len(commands), -1).tolist()
+        scores = scores.tolist()
+        for ind_number, (score, row) in enumerate(zip(scores, commands)):
+            row = [gen_number, ind_number, score] + row
+            if last_column is not None and ind_number == len(scores) - 1:
+                row.append(last_column)
+            self.writerow(row)
+        self.flush(sync=True)
+
+    def flush(self, sync=False):
+        """
+        Ecrit les lignes en attente et vide le tampon du fichier,
+        avec sync attend aussi que le disque les ait ecrites (os.fsync).
+        """
+        if self.pending_rows:
+            self.file.write(self.buffer.getvalue())
+            self.buffer.seek(0)
+            self.buffer.truncate()
+            self.pending_rows = 0
+            self.nbr_flushes += 1
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        """
+        Ecrit ce qui reste et ferme le fichier.
+        """
+        if not self.file.closed:
+            self.flush(sync=True)
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if hasattr(self, "file"):
+            self.close()
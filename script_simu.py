@@ -1,105 +1,90 @@
-import genetic as gen
-import os
+import sys
+
+import sweep
 
 # PARTIE 1 : Variation de la taille de la population
 
+TAILLE_POP = sweep.grid(
+    nbr_individuals=[10, 20, 50, 70, 100, 200, 500, 700, 1000],
+    mutation_factor=[0.05],
+    portion_duration=[2],
+    nbr_portions=[10],
+    accepted_radius=[0.05])
+
 
-def taille_pop():
-    nbr_individus_tab = [10, 20, 50, 70, 100, 200, 500, 700, 1000]
-    mutation_factor = 0.05
-    portion_duration = 2
-    nbr_portions = 10
-    type_simu = 1
-    accepted_radius = 0.05
-    for i, nbr_individus in enumerate(nbr_individus_tab):
-        generation = gen.Generation(nbr_individus, mutation_factor,
-                                    portion_duration=portion_duration,
-                                    nbr_portions=nbr_portions,
-                                    accepted_radius=accepted_radius)
-        generation.simulation(type_simu=type_simu, simulation_counter=i, tolerated_ind_percentage=10)
+def taille_pop(concurrency=None):
+    return sweep.run_sweep(TAILLE_POP, "taille_pop", concurrency=concurrency,
+                           type_simu=1, tolerated_ind_percentage=10)
 
 # PARTIE 2 : Variation du pourcentage d'erreur
 
+RADIUS = sweep.grid(
+    nbr_individuals=[100],
+    mutation_factor=[0.005],
+    portion_duration=[2],
+    nbr_portions=[10],
+    accepted_radius=[1e-3, 5e-3, 1e-2, 5e-2, 1e-1, 5e-1, 1])
 
-def radius():
-    radius_tab = [1e-3, 5e-3, 1e-2, 5e-2, 1e-1, 5e-1, 1]
-    nbr_individus = 100
-    mutation_factor = 0.005
-    portion_duration = 2
-    nbr_portions = 10
-    type_simu = 1
 
-    for i, accepted_radius in enumerate(radius_tab):
-        generation = gen.Generation(nbr_individus, mutation_factor,
-                                    portion_duration=portion_duration,
-                                    nbr_portions=nbr_portions,
-                                    accepted_radius=accepted_radius)
-        generation.simulation(type_simu=type_simu, simulation_counter=i, tolerated_ind_percentage=10)
+def radius(concurrency=None):
+    return sweep.run_sweep(RADIUS, "radius", concurrency=concurrency,
+                           type_simu=1, tolerated_ind_percentage=10)
 
 # PARTIE 3 : Variation du facteur de mutation
 
+MUTATION_FACTOR = sweep.grid(
+    nbr_individuals=[100],
+    # mutation_factor=[0.001, 0.003, 0.005, 0.007, 0.01, 0.03, 0.05, 0.07],
+    mutation_factor=[0.01, 0.03, 0.05, 0.07],
+    portion_duration=[2],
+    nbr_portions=[10],
+    accepted_radius=[0.003])
 
-def mutation_factor():
-    # mutation_factor_tab = [0.001, 0.003, 0.005, 0.007, 0.01, 0.03, 0.05, 0.07]
-    mutation_factor_tab = [0.01, 0.03, 0.05, 0.07]
-
-    nbr_individus = 100
-    portion_duration = 2
-    nbr_portions = 10
-    type_simu = 1
-    accepted_radius = 0.003
 
-    for i, mutation_factor in enumerate(mutation_factor_tab):
-        generation = gen.Generation(nbr_individus, mutation_factor,
-                                    portion_duration=portion_duration,
-                                    nbr_portions=nbr_portions,
-                                    accepted_radius=accepted_radius)
-        generation.simulation(type_simu=type_simu, simulation_counter=i, tolerated_ind_percentage=10)
+def mutation_factor(concurrency=None):
+    return sweep.run_sweep(MUTATION_FACTOR, "mutation_factor", concurrency=concurrency,
+                           type_simu=1, tolerated_ind_percentage=10)
 
 # PARTIE 4 : Variation du nombre de portions
 
+# defaut_radius = 0.01 #pour 2 portions
+# accepted_radius = [defaut_radius]
+# for nbr_portions in nbr_portions_tab: #adapte la précision au point choisi
+#     accepted_radius.append(nbr_portions*defaut_radius/2) #règle de 3
+NBR_PORTIONS = sweep.grid(
+    nbr_individuals=[100],
+    mutation_factor=[0.01],
+    portion_duration=[2],
+    nbr_portions=[2, 5, 10, 15, 20],
+    accepted_radius=[0.001])
 
-def nbr_portions():
-    nbr_portions_tab = [2, 5, 10, 15, 20]
-    nbr_individus = 100
-    mutation_factor = 0.01
-    portion_duration = 2
-    type_simu = 1
-    # defaut_radius = 0.01 #pour 2 portions
-    # accepted_radius = [defaut_radius]
-    # for nbr_portions in nbr_portions_tab: #adapte la précision au point choisi
-    #     accepted_radius.append(nbr_portions*defaut_radius/2) #règle de 3
-    accepted_radius = 0.001
 
-
-    for i, nbr_portions in enumerate(nbr_portions_tab):
-        generation = gen.Generation(nbr_individus, mutation_factor,
-                                    portion_duration=portion_duration,
-                                    nbr_portions=nbr_portions,
-                                    accepted_radius=accepted_radius)
-        generation.simulation(type_simu=type_simu, simulation_counter=i, tolerated_ind_percentage=10)
+def nbr_portions(concurrency=None):
+    return sweep.run_sweep(NBR_PORTIONS, "nbr_portions", concurrency=concurrency,
+                           type_simu=1, tolerated_ind_percentage=10)
 
 # main
 
 
 if __name__ == '__main__':
-    print("1 :\tVariation de la taille de la population")
-    print("2 :\tVariation du pourcentage d'erreur")
-    print("3 :\tVariation du facteur de mutation")
-    print("4 :\tVariation du nombre de portions")
-    critere_choisi = input("Quelle partie du script exécuter ? ")
+    # python3 script_simu.py [partie [nombre de simulations en parallele]]
+    if len(sys.argv) > 1:
+        critere_choisi = sys.argv[1]
+    else:
+        print("1 :\tVariation de la taille de la population")
+        print("2 :\tVariation du pourcentage d'erreur")
+        print("3 :\tVariation du facteur de mutation")
+        print("4 :\tVariation du nombre de portions")
+        critere_choisi = input("Quelle partie du script exécuter ? ")
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else None
 
     if int(critere_choisi) == 1:
-        taille_pop()
-        print("Simulation terminée.")
+        print("Simulation terminée :", taille_pop(concurrency))
     elif int(critere_choisi) == 2:
-        radius()
-        print("Simulation terminée.")
+        print("Simulation terminée :", radius(concurrency))
     elif int(critere_choisi) == 3:
-        mutation_factor()
-        print("Simulation terminée.")
+        print("Simulation terminée :", mutation_factor(concurrency))
     elif int(critere_choisi) == 4:
-        nbr_portions()
-        print("Simulation terminée.")
+        print("Simulation terminée :", nbr_portions(concurrency))
     else:
         print("Veuillez choisir un entier entre 1 et 4.")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+|===========================================|
+| Selection of the parents of a generation. |
+|===========================================|
+
+* Every method draws all the parents in one vectorized call
+and returns their numbers in the population.
+* The scores must be positive, the bigger the better.
+* The draws use np.random, like the rest of the evolution.
+"""
+
+import numpy as np
+
+
+def _searchsorted(weights, uniforms):
+    """
+    Numeros tires avec les tirages uniforms dans [0, 1), proportionnellement a weights.
+    """
+    cdf = np.cumsum(weights, dtype=float)
+    cdf /= cdf[-1]
+    return cdf.searchsorted(uniforms, side="right")
+
+
+def roulette(scores, nbr_parents):
+    """
+    |============================================|
+    | Tirage avec remise proportionnel au score. |
+    |============================================|
+
+    * Memes tirages que np.random.choice(len(scores), nbr_parents, p=...).
+
+    Parameters
+    ----------
+    :param scores: Le score de chaque individu.
+    :type scores: np.ndarray
+    :param nbr_parents: Nombre de parents tires.
+    :type nbr_parents: int
+
+    Returns
+    -------
+    :return: Les numeros des parents, de taille nbr_parents.
+    :rtype: np.ndarray
+    """
+    return _searchsorted(scores, np.random.random_sample(nbr_parents))
+
+
+def sus(scores, nbr_parents):
+    """
+    |====================================================|
+    | Stochastic universal sampling: nbr_parents points  |
+    | regulierement espaces sur la roue, un seul tirage. |
+    |====================================================|
+
+    * Chaque individu est tire floor ou ceil de nbr_parents*score/somme fois,
+    l'ordre des parents est ensuite melange.
+
+    :seealso: roulette
+    """
+    pointers = (np.random.random_sample() + np.arange(nbr_parents)) / nbr_parents
+    return np.random.permutation(_searchsorted(scores, pointers))
+
+
+def tournament(scores, nbr_parents, size=2):
+    """
+    |=================================================|
+    | Chaque parent est le meilleur de size individus |
+    | tires au hasard avec remise.                    |
+    |=================================================|
+
+    * Seul l'ordre des scores compte.
+
+    :param size: Nombre d'individus par tournoi.
+    :type size: int
+    :seealso: roulette
+    """
+    assert size >= 1, "'size' must be positive."
+    players = np.random.randint(len(scores), size=(nbr_parents, size))
+    return players[np.arange(nbr_parents), np.argmax(scores[players], axis=1)]
+
+
+def rank(scores, nbr_parents):
+    """
+    |=================================================|
+    | Tirage proportionnel au rang: le plus mauvais a |
+    | le poids 1, le meilleur len(scores).            |
+    |=================================================|
+
+    :seealso: roulette
+    """
+    ranks = np.empty(len(scores))
+    ranks[np.argsort(scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return _searchsorted(ranks, np.random.random_sample(nbr_parents))
+
+
+def truncation(scores, nbr_parents, size):
+    """
+    |============================================|
+    | Tirage uniforme avec remise parmi les size |
+    | meilleurs individus.                       |
+    |============================================|
+
+    * Seuls les size meilleurs scores sont lus, les autres peuvent
+    etre faux, :seealso: simulation.Unreachable
+
+    :param size: Nombre d'individus qui peuvent etre parents.
+    :type size: int
+    :seealso: roulette
+    """
+    assert 1 <= size <= len(scores), "'size' must be a rank of the population."
+    return elites(scores, size)[np.random.randint(size, size=nbr_parents)]
+
+
+def elites(scores, nbr_elites):
+    """
+    |=============================================|
+    | Numeros des nbr_elites meilleurs individus, |
+    | du meilleur au moins bon.                   |
+    |=============================================|
+    """
+    if nbr_elites == 0:
+        return np.empty(0, dtype=int)
+    best = np.argpartition(scores, -nbr_elites)[-nbr_elites:]
+    return best[np.argsort(scores[best], kind="stable")[::-1]]
+
+
+METHODS = {
+    "roulette": roulette,
+    "sus": sus,
+    "tournament": tournament,
+    "rank": rank,
+    "truncation": truncation,
+}
+TOP_ONLY = ("truncation",) # Methodes qui ne lisent que les meilleurs scores.
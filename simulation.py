@@ -40,6 +40,8 @@ r"""
 
 import math
 
+import numpy as np
+
 
 J = 0.04 # (Kg.m**2) Moment d'inertie au point g projete sur l'axe vertical.
 M = 400e-3 + 300e-3 # (Kg) Masse de la voiture.
@@ -100,41 +102,36 @@ class State:
 
         self.sign = lambda x, l=1000: 1 - 2/(1 + math.exp(max(-100, min(100, l*x)))) # Fonction signe continue.
 
-    def update(self, consigne1, consigne2, consigne3, consigne4, *, dt=0.01):
+    def forces(self, vx, vy, w, consigne1, consigne2, consigne3, consigne4):
         """
-        |===============================================|
-        | Met a jour l'etat de la voiture a t = t + dt. |
-        |===============================================|
-
-        * N'effectue pas de verification car cette fonction est
-        appelle au coeur d'une boucle.
+        |=============================================|
+        | Efforts du sol sur la voiture dans un etat. |
+        |=============================================|
 
         Parameters
         ----------
-        Les couple sont donne en N.m.
-        Un couple positif tend a faire avancer la voiture.
-        :param w1: Vitesse angulaire de la roue avant droite.
-        :param w2: Vitesse angulaire de la roue avant gauche.
-        :param w3: Vitesse angulaire de la roue arriere droite.
-        :param w4: Vitesse angulaire de la roue arriere gauche.
-        :param dt: Pas d'approximation temporel de l'equa-diff au sens de Newton en seconde.
-        """
+        :param vx, vy, w: Vitesses de la voiture. :seealso: State.__init__
+        :param consigne1, consigne2, consigne3, consigne4: :seealso: State.update
 
+        Returns
+        -------
+        :return: Le moment autour de g, les accelerations sur x et sur y.
+        :rtype: (float, float, float)
+        """
         w1 = coeffAngleSpeed*consigne1
         w2 = coeffAngleSpeed*consigne2
         w3 = coeffAngleSpeed*consigne3
         w4 = coeffAngleSpeed*consigne4
 
-
         # Calcul des vitesse en chaque point des roues a l'instant initial.
-        vx1 = self.vx - (A1[1]-G[1])*self.w # Vitesse de la roue avant droite sur x.
-        vx2 = self.vx - (A2[1]-G[1])*self.w
-        vx3 = self.vx + (G[1]-A3[1])*self.w
-        vx4 = self.vx + (G[1]-A4[1])*self.w
-        vy1 = self.vy + (A1[0]-G[0])*self.w - w1*R # Vitesse de la roue avant droite sur y.
-        vy2 = self.vy - (G[0]-A2[0])*self.w - w2*R
-        vy3 = self.vy + (A3[0]-G[0])*self.w - w3*R
-        vy4 = self.vy - (G[0]-A4[0])*self.w - w4*R
+        vx1 = vx - (A1[1]-G[1])*w # Vitesse de la roue avant droite sur x.
+        vx2 = vx - (A2[1]-G[1])*w
+        vx3 = vx + (G[1]-A3[1])*w
+        vx4 = vx + (G[1]-A4[1])*w
+        vy1 = vy + (A1[0]-G[0])*w - w1*R # Vitesse de la roue avant droite sur y.
+        vy2 = vy - (G[0]-A2[0])*w - w2*R
+        vy3 = vy + (A3[0]-G[0])*w - w3*R
+        vy4 = vy - (G[0]-A4[0])*w - w4*R
         v1 = math.sqrt(vx1**2 + vy1**2) # Norme de la vitesse de derappement de la roue avant droite.
         v2 = math.sqrt(vx2**2 + vy2**2)
         v3 = math.sqrt(vx3**2 + vy3**2)
@@ -181,6 +178,30 @@ class State:
         accelx = (f1x + f2x + f3x + f4x)/M
         accely = (f1y + f2y + f3y + f4y)/M
 
+        return moment, accelx, accely
+
+    def update(self, consigne1, consigne2, consigne3, consigne4, *, dt=0.01):
+        """
+        |===============================================|
+        | Met a jour l'etat de la voiture a t = t + dt. |
+        |===============================================|
+
+        * N'effectue pas de verification car cette fonction est
+        appelle au coeur d'une boucle.
+
+        Parameters
+        ----------
+        Les couple sont donne en N.m.
+        Un couple positif tend a faire avancer la voiture.
+        :param w1: Vitesse angulaire de la roue avant droite.
+        :param w2: Vitesse angulaire de la roue avant gauche.
+        :param w3: Vitesse angulaire de la roue arriere droite.
+        :param w4: Vitesse angulaire de la roue arriere gauche.
+        :param dt: Pas d'approximation temporel de l'equa-diff au sens de Newton en seconde.
+        """
+        moment, accelx, accely = self.forces(self.vx, self.vy, self.w,
+            consigne1, consigne2, consigne3, consigne4)
+
         # Calcul du nouvel etat par integration.
         self.w += .5*dt * moment/J
         self.vx += .5*dt * accelx
@@ -188,3 +209,549 @@ class State:
         self.theta += .5*dt * self.w
         self.x += .5*dt * (self.vx*math.cos(self.theta) - self.vy*math.sin(self.theta))
         self.y += .5*dt * (self.vx*math.sin(self.theta) + self.vy*math.cos(self.theta))
+
+    def derivatives(self, etat, consignes):
+        """
+        |=============================================|
+        | Derivee temporelle d'un etat de la voiture. |
+        |=============================================|
+
+        * Ce sont les vitesses d'evolution qu'integre update,
+        facteur .5 compris, pour que les integrateurs decrivent le meme mouvement.
+
+        Parameters
+        ----------
+        :param etat: Le vecteur (vx, vy, w, x, y, theta).
+        :type etat: tuple
+        :param consignes: Les 4 consignes des roues. :seealso: State.update
+        :type consignes: list
+
+        Returns
+        -------
+        :return: La derivee de (vx, vy, w, x, y, theta).
+        :rtype: tuple
+        """
+        vx, vy, w, _, _, theta = etat
+        moment, accelx, accely = self.forces(vx, vy, w, *consignes)
+        cos_theta, sin_theta = math.cos(theta), math.sin(theta)
+        return (.5*accelx, .5*accely, .5*moment/J,
+                .5*(vx*cos_theta - vy*sin_theta), .5*(vx*sin_theta + vy*cos_theta), .5*w)
+
+class DormandPrince:
+    """
+    |===========================================|
+    | Embedded Runge-Kutta 5(4) integrator with |
+    | error control, for State.                 |
+    |===========================================|
+
+    * The step is chosen so that the local error stays below
+    atol + rtol*|etat|, component by component.
+    * A call to advance never steps beyond its duration, so the gene
+    portion boundaries (command changes) are hard events.
+    * The counters nbr_steps, nbr_rejected and nbr_evaluations
+    accumulate over every call.
+    * The stages are numpy products, but each step still costs seven calls
+    to State.derivatives: for the accuracy of the 1 ms fixed step it is
+    barely faster than State.update, so it stays opt-in (solver=None by default).
+    :seealso: benchmark.integrators
+    """
+    # Tableau de Butcher de Dormand-Prince, la derniere ligne de A est B (FSAL).
+    A = np.array([[0, 0, 0, 0, 0, 0, 0],
+                  [1/5, 0, 0, 0, 0, 0, 0],
+                  [3/40, 9/40, 0, 0, 0, 0, 0],
+                  [44/45, -56/15, 32/9, 0, 0, 0, 0],
+                  [19372/6561, -25360/2187, 64448/6561, -212/729, 0, 0, 0],
+                  [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656, 0, 0],
+                  [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]])
+    B = A[6, :6] # Ordre 5.
+    E = np.array([71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40]) # Ordre 5 - ordre 4.
+
+    def __init__(self, rtol=1e-6, atol=1e-9, *, first_step=1e-3, max_step=math.inf):
+        """
+        Parameters
+        ----------
+        :param rtol: Tolerance relative sur chaque composante de l'etat.
+        :type rtol: float
+        :param atol: Tolerance absolue sur chaque composante de l'etat.
+        :type atol: float
+        :param first_step: Pas de depart en seconde, apres chaque evenement.
+        :type first_step: float
+        :param max_step: Pas maximal en seconde.
+        :type max_step: float
+        """
+        assert rtol > 0 or atol > 0, "At least one tolerance must be positive."
+        assert 0 < first_step <= max_step, "Steps must be positive."
+
+        self.rtol = rtol
+        self.atol = atol
+        self.first_step = first_step
+        self.max_step = max_step
+
+        self.nbr_steps = 0 # Nombre de pas acceptes.
+        self.nbr_rejected = 0 # Nombre de pas rejetes.
+        self.nbr_evaluations = 0 # Nombre d'appels a State.derivatives.
+
+    def advance(self, state, consignes, duration):
+        """
+        |=====================================================|
+        | Met a jour l'etat de la voiture a t = t + duration. |
+        |=====================================================|
+
+        Parameters
+        ----------
+        :param state: La voiture, modifiee sur place.
+        :type state: State
+        :param consignes: Les 4 consignes, constantes pendant toute la duree.
+        :type consignes: list
+        :param duration: Duree d'integration en seconde.
+        :type duration: float
+        """
+        etat = np.array((state.vx, state.vy, state.w, state.x, state.y, state.theta))
+        t, h = 0.0, min(self.first_step, self.max_step)
+        k = np.empty((7, 6)) # Les derivees des etages, une ligne par etage.
+        k[0] = state.derivatives(etat.tolist(), consignes)
+        self.nbr_evaluations += 1
+
+        while duration - t > 1e-12*duration:
+            h = min(h, duration - t) # Le pas ne franchit jamais l'evenement.
+
+            # Etages du schema, k[6] est la derivee au point d'arrive (FSAL).
+            for stage in range(1, 7):
+                k[stage] = state.derivatives((etat + h*(self.A[stage, :stage] @ k[:stage])).tolist(), consignes)
+            new_etat = etat + h*(self.B @ k[:6])
+            self.nbr_evaluations += 6
+
+            # Erreur locale normalisee par la tolerance.
+            scale = self.atol + self.rtol*np.maximum(np.abs(etat), np.abs(new_etat))
+            error = math.sqrt(np.mean((h*(self.E @ k) / scale)**2))
+
+            if error <= 1:
+                t += h
+                etat = new_etat
+                k[0] = k[6]
+                self.nbr_steps += 1
+            else:
+                self.nbr_rejected += 1
+            h = min(self.max_step, h*min(5, max(.2, .9*error**-.2 if error else 5)))
+
+        state.vx, state.vy, state.w, state.x, state.y, state.theta = etat.tolist()
+
+class BatchState:
+    """
+    |=========================================|
+    | Current state of a whole batch of cars. |
+    |=========================================|
+
+    * Same model as State, but vx, vy, w, x, y and theta are
+    numpy arrays of shape (n,), one cell per car.
+    * All the cars are moved together by a single vectorized step,
+    the four wheels being stacked along a first axis of size 4.
+    """
+    # Bras de levier de chaque roue par rapport a g, de forme (4, 1).
+    dx = np.array([[A1[0]-G[0]], [A2[0]-G[0]], [A3[0]-G[0]], [A4[0]-G[0]]])
+    dy = np.array([[A1[1]-G[1]], [A2[1]-G[1]], [A3[1]-G[1]], [A4[1]-G[1]]])
+
+    def __init__(self, n, vx=0, vy=0, w=0, x=0, y=0, theta=0):
+        """
+        Parameters
+        ----------
+        :param n: Nombre de voitures simulees en parallele.
+        :type n: int
+        :param vx, vy, w, x, y, theta: Etat initial, scalaire ou tableau de taille n.
+            :seealso: State.__init__
+        """
+        assert isinstance(n, int), \
+            "'n' must be of type int. Not %s." \
+            % type(n).__name__
+        assert n > 0, "There must be at least 1 car."
+
+        # Les poids et forces maximales ne dependent pas de la voiture.
+        reference = State()
+        self.fmax = np.array([[reference.f1max], [reference.f2max],
+                              [reference.f3max], [reference.f4max]])
+
+        self.n = n
+        self.vx = np.full(n, vx, dtype=float)
+        self.vy = np.full(n, vy, dtype=float)
+        self.w = np.full(n, w, dtype=float)
+        self.x = np.full(n, x, dtype=float)
+        self.y = np.full(n, y, dtype=float)
+        self.theta = np.full(n, theta, dtype=float)
+
+    @staticmethod
+    def sign(x, l=1000):
+        """
+        Fonction signe continue, version vectorisee de State.sign.
+        """
+        return 1 - 2/(1 + np.exp(np.clip(l*x, -100, 100)))
+
+    def __getitem__(self, i):
+        """
+        |====================================|
+        | Extract the State of the i-th car. |
+        |====================================|
+
+        Returns
+        -------
+        :return: Independent copy of the state of the car number i.
+        :rtype: State
+        """
+        return State(vx=float(self.vx[i]), vy=float(self.vy[i]), w=float(self.w[i]),
+            x=float(self.x[i]), y=float(self.y[i]), theta=float(self.theta[i]))
+
+    def update(self, consigne1, consigne2, consigne3, consigne4, *, dt=0.01):
+        """
+        |==============================================|
+        | Met a jour l'etat des voitures a t = t + dt. |
+        |==============================================|
+
+        * N'effectue pas de verification car cette fonction est
+        appelle au coeur d'une boucle.
+
+        Parameters
+        ----------
+        :param consigne1: Consignes de la roue avant droite, tableau de taille n.
+        :param consigne2: Consignes de la roue avant gauche, tableau de taille n.
+        :param consigne3: Consignes de la roue arriere droite, tableau de taille n.
+        :param consigne4: Consignes de la roue arriere gauche, tableau de taille n.
+        :param dt: Pas d'approximation temporel de l'equa-diff au sens de Newton en seconde.
+        :seealso: State.update
+        """
+        self.update_wheels(
+            coeffAngleSpeed*R*np.array([consigne1, consigne2, consigne3, consigne4]), dt=dt)
+
+    def update_wheels(self, wheel_speeds, *, dt=0.01):
+        """
+        |=========================================|
+        | Met a jour l'etat a partir des vitesses |
+        | lineaires des roues, de forme (4, n).   |
+        |=========================================|
+
+        * wheel_speeds vaut coeffAngleSpeed*R*consignes, il peut etre calcule
+        une fois pour toute tant que les consignes ne changent pas.
+        :seealso: BatchState.update
+        """
+        # Vitesse de derapage de chaque roue, de forme (4, n).
+        vxw = self.vx - self.dy*self.w
+        vyw = self.vy + self.dx*self.w - wheel_speeds
+        v = np.hypot(vxw, vyw)
+
+        # Projection des forces sur x et y.
+        # cos(theta_i) = vx_i/v_i et sin(theta_i) = vy_i/v_i, avec theta_i = 0 si v_i = 0.
+        k = self.fmax * self.sign(v) / np.where(v == 0, 1, v)
+        fx = -k*vxw # Il y a un moins car la force est opposee a la vitesse.
+        fy = -k*vyw
+
+        # Calcul de la nouvelle tandance.
+        moment = (fy*self.dx - fx*self.dy).sum(axis=0)
+        accelx = fx.sum(axis=0)/M
+        accely = fy.sum(axis=0)/M
+
+        # Calcul du nouvel etat par integration.
+        self.w += .5*dt * moment/J
+        self.vx += .5*dt * accelx
+        self.vy += .5*dt * accely
+        self.theta += .5*dt * self.w
+        cos_theta, sin_theta = np.cos(self.theta), np.sin(self.theta)
+        self.x += .5*dt * (self.vx*cos_theta - self.vy*sin_theta)
+        self.y += .5*dt * (self.vx*sin_theta + self.vy*cos_theta)
+
+FIELDS = ("vx", "vy", "w", "x", "y", "theta") # Grandeurs enregistrees, dans l'ordre de State.derivatives.
+
+
+class Recording:
+    """
+    |===========================================|
+    | Which steps of a simulation are recorded. |
+    |===========================================|
+
+    * 'none': nothing, 'final': the last step only,
+    'stride': one step every stride steps, starting with the first one,
+    'count': count steps evenly spread, the first and last ones included.
+    * A sample is the state after the step, :seealso: FIELDS
+    """
+    MODES = ("none", "final", "stride", "count")
+
+    def __init__(self, mode="stride", *, stride=1000, count=100):
+        """
+        Parameters
+        ----------
+        :param mode: Un des MODES.
+        :type mode: str
+        :param stride: Nombre de pas entre deux echantillons du mode 'stride'.
+        :type stride: int
+        :param count: Nombre d'echantillons du mode 'count'.
+        :type count: int
+        """
+        assert mode in self.MODES, "'mode' must be one of %s." % ", ".join(self.MODES)
+        assert isinstance(stride, int) and stride > 0, "'stride' must be a positive int."
+        assert isinstance(count, int) and count > 0, "'count' must be a positive int."
+
+        self.mode = mode
+        self.stride = stride
+        self.count = count
+
+    def steps(self, nbr_steps):
+        """
+        |=======================================|
+        | Numeros des pas apres lesquels l'etat |
+        | est enregistre.                       |
+        |=======================================|
+
+        Parameters
+        ----------
+        :param nbr_steps: Nombre de pas de toute la simulation.
+        :type nbr_steps: int
+
+        Returns
+        -------
+        :return: Les numeros croissants, entre 0 et nbr_steps-1.
+        :rtype: np.ndarray
+        """
+        if self.mode == "none" or not nbr_steps:
+            return np.empty(0, dtype=int)
+        if self.mode == "final":
+            return np.array([nbr_steps - 1])
+        if self.mode == "stride":
+            return np.arange(0, nbr_steps, self.stride)
+        return np.unique(np.linspace(0, nbr_steps - 1, min(self.count, nbr_steps)).round().astype(int))
+
+    def __repr__(self):
+        return "Recording(%r, stride=%d, count=%d)" % (self.mode, self.stride, self.count)
+
+
+class Trajectory:
+    """
+    |===================================|
+    | Recorded samples of a single car. |
+    |===================================|
+
+    * states is preallocated, of shape (nbr_samples, 6), :seealso: FIELDS
+    * t holds the instant of each sample in second.
+    """
+    __slots__ = ("t", "states")
+
+    def __init__(self, t, states):
+        self.t = t
+        self.states = states
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def vx(self):
+        return self.states[:, 0]
+
+    @property
+    def vy(self):
+        return self.states[:, 1]
+
+    @property
+    def w(self):
+        return self.states[:, 2]
+
+    @property
+    def x(self):
+        return self.states[:, 3]
+
+    @property
+    def y(self):
+        return self.states[:, 4]
+
+    @property
+    def theta(self):
+        return self.states[:, 5]
+
+
+class TargetReached:
+    """
+    |================================|
+    | Stop condition: the car is in  |
+    | the accepted radius of target. |
+    |================================|
+    """
+    name = "target"
+
+    def __init__(self, target, radius):
+        """
+        Parameters
+        ----------
+        :param target: Coordonnees (x, y) de l'arrivee.
+        :type target: tuple
+        :param radius: Rayon de tolerance autour de l'arrivee en metre.
+        :type radius: float
+        """
+        self.target = tuple(target)
+        self.radius = radius
+
+    def __call__(self, etats, remaining):
+        """
+        Masque des voitures arretees, etats est de forme (6, n), :seealso: FIELDS
+        """
+        return np.hypot(etats[3] - self.target[0], etats[4] - self.target[1]) <= self.radius
+
+    def __repr__(self):
+        return "TargetReached(%r, %r)" % (self.target, self.radius)
+
+
+class Unreachable:
+    """
+    |====================================|
+    | Stop condition: the car can not    |
+    | get closer than distance to target |
+    | before the end of the simulation.  |
+    |====================================|
+
+    * The bound only comes from the update of State and BatchState: a wheel
+    pushes with at most its fmax (the continuous sign stays below 1), so at
+    each step the speed (vx, vy) changes by at most .5*dt*max_accel, with
+    max_accel = (f1max + f2max + f3max + f4max)/M, and the position moves by
+    .5*dt times the new speed. Over the N = T/dt remaining steps, the car moves
+    at most .5*dt*sum(|v| + .5*dt*k*max_accel, k=1..N) = .5*T*|v| + .125*max_accel*T*(T + dt).
+    """
+    name = "unreachable"
+
+    def __init__(self, target, distance, dt=1e-3):
+        """
+        Parameters
+        ----------
+        :param target: Coordonnees (x, y) de l'arrivee.
+        :type target: tuple
+        :param distance: Distance a l'arrivee en dessous de laquelle la voiture
+            doit pouvoir descendre pour continuer.
+        :type distance: float
+        :param dt: Pas de temps de la simulation en seconde, :seealso: simulate_batch
+        :type dt: float
+        """
+        self.target = tuple(target)
+        self.distance = distance
+        self.dt = dt
+        reference = State()
+        self.max_accel = (reference.f1max + reference.f2max + reference.f3max + reference.f4max) / M
+
+    def __call__(self, etats, remaining):
+        """
+        Masque des voitures arretees, remaining est le temps restant en seconde.
+
+        * Rien n'est arrete a la fin: il n'y a plus de pas a economiser, et un score
+        egal au seuil pourrait passer dessous par l'arrondi de distance.
+        """
+        if remaining <= 0:
+            return np.zeros(etats.shape[1], dtype=bool)
+        reach = .5*remaining*np.hypot(etats[0], etats[1]) \
+                + .125*self.max_accel*remaining*(remaining + self.dt)
+        distance = np.hypot(etats[3] - self.target[0], etats[4] - self.target[1])
+        return distance - reach > self.distance
+
+    def __repr__(self):
+        return "Unreachable(%r, %r, %r)" % (self.target, self.distance, self.dt)
+
+
+def simulate_batch(commands, portion_duration, *, dt=1e-3, recording=None,
+                   first_portions=None, initial=None, stops=(), check_stride=100):
+    """
+    |=============================================|
+    | Simule n voitures pilotees par leurs genes. |
+    |=============================================|
+
+    * Les consignes sont constantes sur chaque portion.
+    * Une voiture peut partir du debut d'une portion deja simulee,
+    les portions precedentes ne sont alors pas recalculees.
+    * Une voiture s'arrete avant la fin des qu'une des conditions de stops est vraie,
+    elles sont evaluees tous les check_stride pas.
+
+    Parameters
+    ----------
+    :param commands: Consignes compilees des genes, :seealso: genetic.Gene.compile
+        de forme (n, nbr_portions, 4).
+    :type commands: np.ndarray
+    :param portion_duration: Duree d'une portion en seconde.
+    :type portion_duration: float
+    :param dt: Pas de temps en seconde.
+    :type dt: float
+    :param recording: Les pas enregistres, None pour Recording().
+    :type recording: Recording
+    :param first_portions: Numero de la premiere portion simulee de chaque voiture,
+        de taille n. None pour tout simuler depuis l'origine.
+    :type first_portions: np.ndarray
+    :param initial: Etat (vx, vy, w, x, y, theta) de chaque voiture au debut
+        de sa premiere portion, de forme (6, n). Ignore pour les voitures
+        qui partent de la portion 0.
+    :type initial: np.ndarray
+    :param stops: Conditions d'arret, :seealso: TargetReached, Unreachable
+        Elles recoivent les etats (6, k) des voitures en route et le temps restant.
+    :type stops: tuple
+    :param check_stride: Nombre de pas entre deux evaluations des conditions.
+    :type check_stride: int
+
+    Returns
+    -------
+    :return: Les echantillons de forme (n, nbr_samples, 6), :seealso: FIELDS,
+        NaN avant la premiere portion simulee de chaque voiture et apres son arret.
+        Puis les etats au debut de chaque portion, de forme (nbr_portions+1, 6, n),
+        le dernier etant l'etat final, NaN hors des portions simulees.
+        Puis le numero dans stops de la condition qui a arrete chaque voiture,
+        -1 pour celles qui sont allees jusqu'au bout.
+    :rtype: np.ndarray, np.ndarray, np.ndarray
+    """
+    recording = Recording() if recording is None else recording
+    n, nbr_portions = commands.shape[:2]
+    steps = round(portion_duration / dt)
+    first = np.zeros(n, dtype=int) if first_portions is None else np.asarray(first_portions)
+    etats = np.zeros((6, n)) if initial is None else np.array(initial, dtype=float)
+    etats[:, first == 0] = 0 # Depart a l'origine.
+
+    # Vitesses lineaires des roues, de forme (nbr_portions, 4, n).
+    wheel_speeds = coeffAngleSpeed*R*np.transpose(commands, (1, 2, 0))
+
+    recorded = recording.steps(nbr_portions*steps).tolist()
+    recorded.append(-1) # Sentinelle, aucun pas ne porte ce numero.
+    samples = np.full((n, len(recorded) - 1, 6), np.nan)
+    bounds = np.full((nbr_portions + 1, 6, n), np.nan)
+    stopped = np.full(n, -1)
+    running = np.ones(n, dtype=bool) # Les voitures qui ne sont pas arretees.
+    i, j = 0, 0 # Numeros du pas et du prochain echantillon.
+    for portion, speeds in enumerate(wheel_speeds): # Consignes constantes sur chaque portion.
+        active = np.flatnonzero((first <= portion) & running) # Les voitures en route.
+        if not len(active):
+            i += steps
+            while 0 <= recorded[j] < i:
+                j += 1
+            continue
+        bounds[portion][:, active] = etats[:, active]
+        state = BatchState(len(active), *etats[:, active])
+        speeds = speeds[:, active]
+        for _ in range(steps):
+            state.update_wheels(speeds, dt=dt)
+            if i == recorded[j]:
+                samples[active, j] = np.column_stack(
+                    (state.vx, state.vy, state.w, state.x, state.y, state.theta))
+                j += 1
+            i += 1
+            if stops and not i % check_stride:
+                vectors = np.array((state.vx, state.vy, state.w, state.x, state.y, state.theta))
+                keep = np.ones(len(active), dtype=bool)
+                for number, stop in enumerate(stops): # La premiere condition vraie est retenue.
+                    arret = keep & stop(vectors, (nbr_portions*steps - i)*dt)
+                    stopped[active[arret]] = number
+                    keep &= ~arret
+                if not keep.all():
+                    etats[:, active[~keep]] = vectors[:, ~keep]
+                    running[active[~keep]] = False
+                    active, speeds = active[keep], speeds[:, keep]
+                    state = BatchState(len(active), *vectors[:, keep]) if len(active) else None
+            if not len(active): # Toutes les voitures sont arretees.
+                i = (portion + 1)*steps
+                while 0 <= recorded[j] < i:
+                    j += 1
+                break
+        if len(active):
+            etats[:, active] = state.vx, state.vy, state.w, state.x, state.y, state.theta
+    bounds[-1] = etats
+    return samples, bounds, stopped
+
+def constants():
+    """
+    Toutes les constantes physiques du modele, lues au moment de l'appel.
+    """
+    return (J, M, PHI, A1, A2, A3, A4, R, G, coeffAngleSpeed)
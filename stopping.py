@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+"""
+|====================================|
+| Stopping criteria of an evolution. |
+|====================================|
+
+* A criterion is called after the evaluation of each generation,
+before the reproduction, and returns True when the evolution must stop.
+* Generation.simulation stops at the first criterion which fires
+and keeps its name in Generation.stop_reason.
+"""
+
+import time
+
+import numpy as np
+
+
+class Criterion:
+    """
+    |==================================|
+    | Base class of stopping criteria. |
+    |==================================|
+    """
+    name = "criterion"
+
+    def reset(self, generation):
+        """
+        Remet le critere a zero au debut de l'evolution de generation.
+        """
+
+    def __call__(self, generation, gen_number):
+        """
+        Parameters
+        ----------
+        :param generation: La population qui vient d'etre evaluee.
+        :type generation: genetic.Generation
+        :param gen_number: Nombre de generations evaluees depuis le debut.
+        :type gen_number: int
+
+        Returns
+        -------
+        :return: True pour arreter l'evolution.
+        :rtype: bool
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join(
+            "%s=%r" % item for item in vars(self).items() if not item[0].startswith("_")))
+
+
+class MaxGenerations(Criterion):
+    """
+    Arrete apres nbr_generations generations.
+    """
+    name = "max_generations"
+
+    def __init__(self, nbr_generations):
+        assert nbr_generations > 0, "'nbr_generations' must be positive."
+        self.nbr_generations = nbr_generations
+
+    def __call__(self, generation, gen_number):
+        return gen_number >= self.nbr_generations
+
+
+class UnderThreshold(Criterion):
+    """
+    Arrete quand il ne reste que tolerated_ind_percentage % des individus
+    hors du rayon accepted_radius (le critere de type_simu 1).
+    """
+    name = "under_threshold"
+
+    def __init__(self, tolerated_ind_percentage=10):
+        self.tolerated_ind_percentage = tolerated_ind_percentage
+
+    def __call__(self, generation, gen_number):
+        individuals_under_threshold = np.sum(~(generation.scores > 1/generation.accepted_radius))
+        return individuals_under_threshold <= self.tolerated_ind_percentage*generation.nbr_individuals/100
+
+
+class Plateau(Criterion):
+    """
+    Arrete quand le meilleur score n'a pas progresse de plus de min_delta
+    pendant patience generations.
+    """
+    name = "plateau"
+
+    def __init__(self, patience=10, min_delta=0.0):
+        assert patience > 0, "'patience' must be positive."
+        self.patience = patience
+        self.min_delta = min_delta
+        self.reset(None)
+
+    def reset(self, generation):
+        self._best = -np.inf
+        self._stalled = 0 # Generations sans progres.
+
+    def __call__(self, generation, gen_number):
+        best = np.nanmax(generation.scores)
+        if best > self._best + self.min_delta:
+            self._best, self._stalled = best, 0
+        else:
+            self._stalled += 1
+        return self._stalled >= self.patience
+
+
+class DiversityCollapse(Criterion):
+    """
+    Arrete quand les genomes sont presque tous identiques: l'ecart type
+    de chaque parametre dans la population, en moyenne, passe sous min_std.
+    """
+    name = "diversity"
+
+    def __init__(self, min_std=1e-3):
+        self.min_std = min_std
+
+    def __call__(self, generation, gen_number):
+        return generation.biases.std(axis=0).mean() < self.min_std
+
+
+class WallClock(Criterion):
+    """
+    Arrete apres seconds secondes d'evolution.
+    """
+    name = "wall_clock"
+
+    def __init__(self, seconds):
+        assert seconds > 0, "'seconds' must be positive."
+        self.seconds = seconds
+        self.reset(None)
+
+    def reset(self, generation):
+        self._start = time.monotonic()
+
+    def __call__(self, generation, gen_number):
+        return time.monotonic() - self._start >= self.seconds
+
+    def __getstate__(self): # Le temps ecoule survit a un point de reprise.
+        return dict(vars(self), _start=time.monotonic() - self._start)
+
+    def __setstate__(self, state):
+        vars(self).update(state, _start=time.monotonic() - state["_start"])
+
+
+class EvaluationBudget(Criterion):
+    """
+    Arrete quand max_evaluations individus ont ete simules ou testes
+    (les resultats pris dans les caches ne comptent pas).
+    """
+    name = "evaluation_budget"
+
+    def __init__(self, max_evaluations):
+        assert max_evaluations > 0, "'max_evaluations' must be positive."
+        self.max_evaluations = max_evaluations
+        self._start = 0
+
+    def reset(self, generation):
+        self._start = generation.nbr_evaluations # Celles d'avant l'evolution ne comptent pas.
+
+    def __call__(self, generation, gen_number):
+        return generation.nbr_evaluations - self._start >= self.max_evaluations
+
+
+def first(criteria, generation, gen_number):
+    """
+    |=============================================|
+    | Nom du premier critere qui demande l'arret. |
+    |=============================================|
+
+    * Tous les criteres sont appeles, pour que leur etat soit a jour.
+
+    Returns
+    -------
+    :return: Le nom du critere, None pour continuer.
+    :rtype: str
+    """
+    fired = [criterion.name for criterion in criteria if criterion(generation, gen_number)]
+    return fired[0] if fired else None
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+"""
+|================================================|
+| Binary store of a run, read by memory mapping. |
+|================================================|
+
+* One .npy file per quantity (scores, biases, trajectories...), the first
+axis having one row per individual of every generation.
+* The files are preallocated and their capacity doubles when they are full.
+* INDEX_FILE maps each generation to its rows, only the rows listed
+there are valid: it is written after the arrays are flushed.
+"""
+
+import csv
+import os
+
+import numpy as np
+
+
+INDEX_FILE = "index.csv"
+INDEX_COLUMNS = ["generation", "start", "stop"]
+
+
+class RunStore:
+    """
+    |========================================|
+    | Ajoute les generations d'une evolution |
+    | dans des fichiers .npy.                |
+    |========================================|
+    """
+    def __init__(self, directory, capacity=1024, *, keep=None):
+        """
+        Parameters
+        ----------
+        :param directory: Repertoire du stockage, son contenu est remplace.
+        :type directory: str
+        :param capacity: Nombre de lignes reservees au depart dans chaque fichier.
+        :type capacity: int
+        :param keep: Pour continuer une evolution, le nombre de lignes gardees du
+            stockage existant (RunStore.nbr_rows a ce moment). None pour le remplacer.
+        :type keep: int
+        """
+        assert isinstance(capacity, int), \
+            "'capacity' must be of type int. Not %s." \
+            % type(capacity).__name__
+        assert capacity > 0, "'capacity' must be positive."
+
+        self.directory = directory
+        self.capacity = capacity
+        self.arrays = {} # Nom -> np.memmap.
+        self.nbr_rows = 0
+        os.makedirs(directory, exist_ok=True)
+        if keep is not None:
+            self._reopen(keep)
+            return
+        for fname in os.listdir(directory): # Reste d'une execution precedente.
+            if fname.endswith(".npy") or fname == INDEX_FILE:
+                os.remove(os.path.join(directory, fname))
+        with open(os.path.join(directory, INDEX_FILE), "w", newline="") as file:
+            csv.writer(file).writerow(INDEX_COLUMNS)
+
+    def _reopen(self, keep):
+        """
+        Reprend un stockage existant, les generations apres la ligne keep sont oubliees.
+        """
+        with open(os.path.join(self.directory, INDEX_FILE), newline="") as file:
+            index = [row for row in csv.reader(file)][1:]
+        with open(os.path.join(self.directory, INDEX_FILE), "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(INDEX_COLUMNS)
+            writer.writerows(row for row in index if int(row[2]) <= keep)
+        for fname in os.listdir(self.directory):
+            if fname.endswith(".npy"):
+                self.arrays[fname[:-4]] = np.load(os.path.join(self.directory, fname), mmap_mode="r+")
+        if self.arrays:
+            self.capacity = min(len(array) for array in self.arrays.values())
+        self.nbr_rows = keep
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".npy")
+
+    def _create(self, name, shape, dtype):
+        """
+        Cree le fichier name.npy de self.capacity lignes, rempli de NaN si possible.
+        """
+        array = np.lib.format.open_memmap(self._path(name), mode="w+",
+                                          dtype=dtype, shape=(self.capacity,) + shape)
+        if np.issubdtype(dtype, np.floating):
+            array[:] = np.nan
+        self.arrays[name] = array
+
+    def _grow(self, nbr_rows):
+        """
+        Double la capacite jusqu'a pouvoir contenir nbr_rows lignes.
+        """
+        capacity = self.capacity
+        while capacity < nbr_rows:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        for name, old in list(self.arrays.items()):
+            tmp = self._path(name) + ".tmp"
+            array = np.lib.format.open_memmap(tmp, mode="w+",
+                                              dtype=old.dtype, shape=(capacity,) + old.shape[1:])
+            array[:self.nbr_rows] = old[:self.nbr_rows]
+            if np.issubdtype(old.dtype, np.floating):
+                array[self.nbr_rows:] = np.nan
+            array.flush()
+            del old, self.arrays[name]
+            os.replace(tmp, self._path(name))
+            self.arrays[name] = np.load(self._path(name), mmap_mode="r+")
+        self.capacity = capacity
+
+    def append(self, gen_number, **arrays):
+        """
+        |=====================================|
+        | Ajoute les lignes d'une generation. |
+        |=====================================|
+
+        Parameters
+        ----------
+        :param gen_number: Le numero de la generation.
+        :type gen_number: int
+        :key arrays: Un tableau par grandeur, le premier axe etant celui des individus.
+            Les grandeurs sont creees au premier appel, tous les appels
+            doivent donner les memes.
+
+        Returns
+        -------
+        :return: Les numeros des lignes de la generation, start et stop.
+        :rtype: (int, int)
+        """
+        arrays = {name: np.asarray(array) for name, array in arrays.items()}
+        nbr_individuals = {len(array) for array in arrays.values()}
+        assert len(nbr_individuals) == 1, "All arrays must have one row per individual."
+        assert not self.arrays or set(arrays) == set(self.arrays), \
+            "The stored quantities can not change during a run."
+        start = self.nbr_rows
+        stop = start + nbr_individuals.pop()
+
+        self._grow(stop)
+        for name, array in arrays.items():
+            if name not in self.arrays:
+                self._create(name, array.shape[1:], array.dtype)
+            self.arrays[name][start:stop] = array
+            self.arrays[name].flush()
+
+        # L'index en dernier: une generation interrompue n'y est pas.
+        with open(os.path.join(self.directory, INDEX_FILE), "a", newline="") as file:
+            csv.writer(file).writerow([gen_number, start, stop])
+        self.nbr_rows = stop
+        return start, stop
+
+    def close(self):
+        """
+        Ecrit ce qui reste et ferme les fichiers.
+        """
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RunReader:
+    """
+    |=========================================|
+    | Acces a une evolution enregistree par   |
+    | RunStore, sans tout charger en memoire. |
+    |=========================================|
+    """
+    def __init__(self, directory):
+        """
+        Parameters
+        ----------
+        :param directory: Le repertoire donne a RunStore.
+        :type directory: str
+        """
+        self.directory = directory
+        self.index = {} # Generation -> (start, stop).
+        with open(os.path.join(directory, INDEX_FILE), newline="") as file:
+            for row in csv.DictReader(file):
+                self.index[int(row["generation"])] = (int(row["start"]), int(row["stop"]))
+        self.arrays = {fname[:-4]: np.load(os.path.join(directory, fname), mmap_mode="r")
+                       for fname in sorted(os.listdir(directory)) if fname.endswith(".npy")}
+
+    @property
+    def generations(self):
+        """
+        Les numeros des generations enregistrees.
+        """
+        return list(self.index)
+
+    def generation(self, gen_number):
+        """
+        |========================================|
+        | Toutes les grandeurs d'une generation. |
+        |========================================|
+
+        Returns
+        -------
+        :return: Pour chaque grandeur, une vue en lecture seule sur le fichier,
+            le premier axe etant celui des individus.
+        :rtype: dict
+        """
+        start, stop = self.index[gen_number]
+        return {name: array[start:stop] for name, array in self.arrays.items()}
+
+    def individual(self, gen_number, ind_number):
+        """
+        Toutes les grandeurs d'un individu, :seealso: RunReader.generation
+        """
+        start, stop = self.index[gen_number]
+        assert 0 <= ind_number < stop - start, "Unknown individual %d." % ind_number
+        return {name: array[start + ind_number] for name, array in self.arrays.items()}
+
+    def __getitem__(self, name):
+        """
+        Les lignes valides d'une grandeur pour toute l'evolution.
+        """
+        return self.arrays[name][:max((stop for _, stop in self.index.values()), default=0)]
+
+
+def downsample(trajectories, nbr_points):
+    """
+    |==============================================|
+    | Trajectoires reechantillonnees a nbr_points. |
+    |==============================================|
+
+    Parameters
+    ----------
+    :param trajectories: Pour chaque individu, les listes des points x, y.
+        :seealso: genetic.Generation.move_simulation
+    :type trajectories: list
+    :param nbr_points: Nombre de points gardes par trajectoire, les trajectoires plus
+        courtes sont completees par des NaN.
+    :type nbr_points: int
+
+    Returns
+    -------
+    :return: Tableau de forme (nbr_individuals, nbr_points, 2).
+    :rtype: np.ndarray
+    """
+    result = np.full((len(trajectories), nbr_points, 2), np.nan)
+    for i, (x, y) in enumerate(trajectories):
+        points = np.column_stack((x, y)) if len(x) else np.empty((0, 2))
+        if len(points) > nbr_points: # Points regulierement espaces, le dernier est garde.
+            points = points[np.linspace(0, len(points) - 1, nbr_points).round().astype(int)]
+        result[i, :len(points)] = points
+    return result
+
+
+def from_csv(csv_path, directory):
+    """
+    |=========================================|
+    | Convertit un data_simu.csv en RunStore. |
+    |=========================================|
+
+    * Le csv ne contient que les consignes, elles sont enregistrees
+    sous le nom commands, de forme (nbr_individuals, nbr_portions, nbr_outputs).
+    * La colonne individuals_under_threshold de type_simu 1
+    devient une grandeur par individu, NaN sauf sur le dernier.
+
+    Parameters
+    ----------
+    :param csv_path: Le fichier ecrit par genetic.Generation.save_score.
+    :type csv_path: str
+    :param directory: Repertoire du stockage cree.
+    :type directory: str
+
+    Returns
+    -------
+    :return: Le lecteur du stockage cree.
+    :rtype: RunReader
+    """
+    with open(csv_path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        genes = [name for name in header if name.startswith("Gene_")]
+        nbr_portions = len({name.split("roue_")[0] for name in genes})
+        with_threshold = header[-1] == "individuals_under_threshold"
+
+        with RunStore(directory) as store:
+            def append(gen_number, rows):
+                commands = np.array([row[3:3+len(genes)] for row in rows], dtype=float)
+                arrays = {"scores": np.array([row[2] or np.nan for row in rows], dtype=float),
+                          "commands": commands.reshape(len(rows), nbr_portions, -1)}
+                if with_threshold:
+                    arrays["individuals_under_threshold"] = np.array(
+                        [row[3+len(genes)] if len(row) > 3+len(genes) else np.nan for row in rows], dtype=float)
+                store.append(gen_number, **arrays)
+
+            rows, gen_number = [], None
+            for row in reader:
+                if row == header: # Entete d'une execution ajoutee au meme fichier.
+                    continue
+                if row[0] != gen_number and rows:
+                    append(int(gen_number), rows)
+                    rows = []
+                gen_number = row[0]
+                rows.append(row)
+            if rows:
+                append(int(gen_number), rows)
+    return RunReader(directory)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+"""
+|==========================================|
+| Parallel and resumable parameter sweeps. |
+|==========================================|
+
+* A sweep is a list of configurations, each one being the keyword
+arguments of a Generation.
+* The configurations run concurrently, each in its own process.
+* A configuration whose directory holds the DONE_FILE is complete and is
+skipped, so an interrupted sweep starts again where it stopped.
+* Each configuration seeds the random generators with its own seed, derived
+from the sweep seed and its number: the results do not depend on the
+process that runs it nor on the order of the configurations.
+"""
+
+import concurrent.futures
+import csv
+import itertools
+import os
+import random
+import shutil
+import time
+
+import numpy as np
+
+import genetic as gen
+
+
+DONE_FILE = "termine.csv" # Ecrit a la fin d'une configuration.
+SUMMARY_COLUMNS = ["simulation_counter", "nbr_individuals", "mutation_factor",
+                   "portion_duration", "nbr_portions", "accepted_radius",
+                   "generations", "individuals_under_threshold", "threshold_reached",
+                   "stop_reason", "seed", "duration"]
+
+
+def grid(**parameters):
+    """
+    |================================================|
+    | Every combination of the values of parameters. |
+    |================================================|
+
+    >>> grid(nbr_individuals=[10, 20], mutation_factor=[0.05])
+    [{'nbr_individuals': 10, 'mutation_factor': 0.05}, {'nbr_individuals': 20, 'mutation_factor': 0.05}]
+
+    Parameters
+    ----------
+    :key parameters: Liste des valeurs de chaque parametre de Generation.
+
+    Returns
+    -------
+    :return: Les configurations, une par combinaison.
+    :rtype: list
+    """
+    names = list(parameters)
+    return [dict(zip(names, values)) for values in itertools.product(*parameters.values())]
+
+
+def configuration_seed(seed, simulation_counter):
+    """
+    La graine d'une configuration, :seealso: run_sweep
+    """
+    return int(np.random.SeedSequence([seed, simulation_counter]).generate_state(1)[0])
+
+
+def _directory(configuration, type_simu, simulation_counter):
+    """
+    Repertoire des resultats d'une configuration, :seealso: genetic.directory
+    """
+    names = ("nbr_individuals", "mutation_factor", "portion_duration", "nbr_portions",
+             "coord_arrivee", "accepted_radius")
+    return gen.directory(type_simu, simulation_counter,
+                         **{name: configuration[name] for name in names if name in configuration})
+
+
+def _run(configuration, simulation_counter, seed, settings):
+    """
+    |=========================================|
+    | Simule une configuration jusqu'au bout. |
+    |=========================================|
+
+    Returns
+    -------
+    :return: La ligne du tableau de synthese.
+    :rtype: dict
+    """
+    repertoire = _directory(configuration, settings["type_simu"], simulation_counter)
+    if os.path.isdir(repertoire): # Reste d'une execution interrompue.
+        shutil.rmtree(repertoire)
+
+    # Les processus du pool heritent tous des memes generateurs.
+    random.seed(seed)
+    np.random.seed(seed)
+    configuration = dict(configuration)
+    nbr_individuals = configuration.pop("nbr_individuals")
+    mutation_factor = configuration.pop("mutation_factor")
+    generation = gen.Generation(nbr_individuals, mutation_factor, **configuration)
+
+    t_debut = time.perf_counter()
+    generations = generation.simulation(simulation_counter=simulation_counter, seed=seed, **settings)
+
+    tolerated = settings.get("tolerated_ind_percentage", 10)*nbr_individuals/100
+    under_threshold = getattr(generation, "individuals_under_threshold", "")
+    row = {
+        "simulation_counter": simulation_counter,
+        "nbr_individuals": nbr_individuals,
+        "mutation_factor": mutation_factor,
+        "portion_duration": generation.template.portion_duration,
+        "nbr_portions": generation.template.nbr_portions,
+        "accepted_radius": generation.accepted_radius,
+        "generations": generations,
+        "individuals_under_threshold": under_threshold,
+        "threshold_reached": under_threshold != "" and under_threshold <= tolerated,
+        "stop_reason": generation.stop_reason,
+        "seed": seed,
+        "duration": round(time.perf_counter() - t_debut, 3)}
+
+    with open(os.path.join(repertoire, DONE_FILE), "w") as file: # En dernier: la configuration est complete.
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerow(row)
+    return row
+
+
+def run_sweep(configurations, name, *, concurrency=None, type_simu=1, seed=0, **settings):
+    """
+    |===================================|
+    | Simule toutes les configurations. |
+    |===================================|
+
+    Parameters
+    ----------
+    :param configurations: Les arguments de chaque Generation, :seealso: grid
+        nbr_individuals et mutation_factor sont obligatoires.
+    :type configurations: list
+    :param name: Nom du balayage, donne le nom du tableau de synthese.
+    :type name: str
+    :param concurrency: Nombre maximal de configurations simulees en meme temps,
+        None pour le nombre de coeurs.
+    :type concurrency: int
+    :param type_simu: :seealso: Generation.simulation
+    :param seed: Graine du balayage, celle de chaque configuration en est tiree
+        avec son numero. :seealso: configuration_seed
+    :type seed: int
+    :key settings: Autres arguments de Generation.simulation.
+
+    Returns
+    -------
+    :return: Le chemin du tableau de synthese, une ligne par configuration
+        avec le nombre de generations pour atteindre le seuil.
+    :rtype: str
+    """
+    assert concurrency is None or concurrency > 0, "'concurrency' must be positive."
+    settings["type_simu"] = type_simu
+
+    rows = {}
+    pending = []
+    for simulation_counter, configuration in enumerate(configurations):
+        done = os.path.join(_directory(configuration, type_simu, simulation_counter), DONE_FILE)
+        if os.path.exists(done):
+            with open(done) as file:
+                rows[simulation_counter] = next(csv.DictReader(file))
+            print(f"Simu {simulation_counter} : deja terminee.")
+        else:
+            pending.append(simulation_counter)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(_run, configurations[simulation_counter], simulation_counter,
+                                   configuration_seed(seed, simulation_counter), settings):
+                   simulation_counter for simulation_counter in pending}
+        for future in concurrent.futures.as_completed(futures):
+            rows[futures[future]] = future.result()
+            print(f"Simu {futures[future]} : terminee.")
+
+    summary = os.path.join("simulation_data", f"sweep_{name}.csv")
+    os.makedirs("simulation_data", exist_ok=True)
+    with open(summary, "w") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows[simulation_counter] for simulation_counter in sorted(rows))
+    return summary
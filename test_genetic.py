@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+"""
+|=========================================|
+| Tests of the copies of genes, run with: |
+| python -m pytest test_genetic.py        |
+|=========================================|
+"""
+
+import gc
+import random
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import genetic as gen
+
+
+def nbr_classes():
+    """
+    Nombre de classes vivantes.
+    """
+    gc.collect()
+    return sum(isinstance(o, type) for o in gc.get_objects())
+
+
+def test_copy_does_not_create_classes():
+    """
+    Reproduire la population par l'API objet, (parent1 + parent2).mute(facteur),
+    pendant 500 generations ne cree ni classe ni memoire.
+    """
+    individus = [gen.Individual(2, 10) for _ in range(50)]
+    generation = gen.Generation(50, 0.05, portion_duration=2, nbr_portions=10)
+
+    def reproduce():
+        weights = [random.random() for _ in individus]
+        return [(random.choices(individus, weights=weights)[0]
+                 + random.choices(individus, weights=weights)[0]).mute(0.05)
+                for _ in range(len(individus))]
+
+    tracemalloc.start()
+    try:
+        for numero in range(500):
+            individus = reproduce()
+            copies = [ind.copy() for ind in generation.individuals]
+            if numero == 10: # Apres la mise en route.
+                classes_debut = nbr_classes()
+                memoire_debut = tracemalloc.get_traced_memory()[0]
+        classes_fin = nbr_classes()
+        memoire_fin = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert classes_fin == classes_debut
+    assert memoire_fin < 1.1*memoire_debut
+    assert all(type(ind) is gen.Individual for ind in individus + copies)
+
+
+def test_copy_does_not_share_mutable_bias():
+    """
+    Un gene et sa copie partagent le tenseur en lecture seule, l'un ne peut pas changer l'autre.
+    """
+    original = gen.Individual(2, 10)
+    bias = original.bias.copy()
+    copie = original.copy()
+
+    with pytest.raises(ValueError):
+        copie.bias[0, 0, 0] = 2.0
+    with pytest.raises(ValueError):
+        original.bias[0, 0, 0] = 2.0
+    copie.bias = np.zeros_like(bias)
+    assert np.array_equal(original.bias, bias)
+    assert not np.array_equal(original.compile(), copie.compile())
+
+
+def test_copy_of_view_is_independent():
+    """
+    La copie d'un individu d'une generation ne suit plus la population.
+    """
+    generation = gen.Generation(4, 0.05, portion_duration=2, nbr_portions=10)
+    copie = generation.individuals[0].copy()
+    bias = copie.bias.copy()
+
+    generation.set_biases([0], np.zeros((1,) + bias.shape))
+    assert np.array_equal(copie.bias, bias)
+    copie.bias = np.ones_like(bias)
+    assert np.array_equal(generation.biases[0], np.zeros_like(bias))